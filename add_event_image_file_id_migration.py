@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Миграция для добавления поля image_file_id в таблицу events
+В поле сохраняется file_id изображения в Telegram, чтобы не загружать его по URL при каждой отправке
+"""
+
+import sys
+from database.models import engine
+from database.migrations import add_column_if_missing
+
+def run_migration():
+    """Запуск миграции для добавления поля image_file_id"""
+    print("🚀 Запуск миграции для добавления поля image_file_id в таблицу events...")
+    
+    try:
+        with engine.connect() as connection:
+            add_column_if_missing(connection, 'events', 'image_file_id', 'VARCHAR(255)')
+            connection.commit()
+            
+            print("✅ Миграция успешно выполнена!")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Ошибка при выполнении миграции: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Миграция для добавления индекса (event_datetime, id) в таблицу events
+По индексу /api/events выбирает страницы по курсору без OFFSET
+"""
+
+import sys
+from sqlalchemy import text
+from database.models import engine
+
+def run_migration():
+    """Запуск миграции для индекса списка мероприятий"""
+    print("🚀 Запуск миграции для индекса списка мероприятий...")
+    
+    try:
+        with engine.connect() as connection:
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_events_datetime_id "
+                "ON events (event_datetime, id)"
+            ))
+            connection.commit()
+            
+            print("✅ Миграция успешно выполнена! Индекс ix_events_datetime_id создан")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Ошибка при выполнении миграции: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Миграция для добавления поля version в таблицу events
+По версии бот понимает, что закэшированная карточка мероприятия устарела
+"""
+
+import sys
+from database.models import engine
+from database.migrations import add_column_if_missing
+
+def run_migration():
+    """Запуск миграции для добавления поля version"""
+    print("🚀 Запуск миграции для добавления поля version в таблицу events...")
+    
+    try:
+        with engine.connect() as connection:
+            add_column_if_missing(connection, 'events', 'version', 'INTEGER NOT NULL DEFAULT 1')
+            connection.commit()
+            
+            print("✅ Миграция успешно выполнена!")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Ошибка при выполнении миграции: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Миграция для добавления счетчика registered_count в таблицу events
+Добавляет колонку (если ее нет) и заполняет ее по существующим регистрациям
+"""
+
+import sys
+from database.models import engine, backfill_registered_count
+from database.migrations import add_column_if_missing
+
+def run_migration():
+    """Запуск миграции для добавления поля registered_count"""
+    print("🚀 Запуск миграции для добавления поля registered_count в таблицу events...")
+    
+    try:
+        with engine.connect() as connection:
+            add_column_if_missing(connection, 'events', 'registered_count', 'INTEGER NOT NULL DEFAULT 0')
+            
+            # Пересчитываем счетчик по фактическим регистрациям
+            print("🔄 Пересчет registered_count по существующим регистрациям...")
+            backfill_registered_count(connection)
+            connection.commit()
+            
+            print("✅ Миграция успешно выполнена!")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Ошибка при выполнении миграции: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
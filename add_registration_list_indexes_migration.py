@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Миграция для добавления индексов списка регистраций
+(registration_time, id) и (event_id, registration_time, id) в таблице registrations
+"""
+
+import sys
+from sqlalchemy import text
+from database.models import engine
+
+INDEXES = {
+    'ix_registrations_time_id': '(registration_time, id)',
+    'ix_registrations_event_time_id': '(event_id, registration_time, id)',
+}
+
+def run_migration():
+    """Запуск миграции для индексов списка регистраций"""
+    print("🚀 Запуск миграции для индексов списка регистраций...")
+    
+    try:
+        with engine.connect() as connection:
+            for name, columns in INDEXES.items():
+                connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON registrations {columns}"))
+            connection.commit()
+            
+            print(f"✅ Миграция успешно выполнена! Индексы созданы: {', '.join(INDEXES)}")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Ошибка при выполнении миграции: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
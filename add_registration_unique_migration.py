@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Миграция для добавления уникального индекса (user_id, event_id) в таблицу registrations
+Перед созданием индекса удаляет повторные регистрации и пересчитывает registered_count
+"""
+
+import sys
+from sqlalchemy import text
+from database.models import engine, backfill_registered_count
+
+def run_migration():
+    """Запуск миграции для уникальности регистраций"""
+    print("🚀 Запуск миграции для уникального индекса регистраций...")
+    
+    try:
+        with engine.connect() as connection:
+            # Удаляем дубли, оставляя самую раннюю регистрацию
+            result = connection.execute(text("""
+                DELETE FROM registrations
+                WHERE id NOT IN (
+                    SELECT MIN(id) FROM registrations GROUP BY user_id, event_id
+                )
+            """))
+            if result.rowcount:
+                print(f"🧹 Удалено повторных регистраций: {result.rowcount}")
+            
+            connection.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_registrations_user_event "
+                "ON registrations (user_id, event_id)"
+            ))
+            
+            # Счетчик мог учитывать удаленные дубли
+            backfill_registered_count(connection)
+            connection.commit()
+            
+            print("✅ Миграция успешно выполнена! Индекс uq_registrations_user_event создан")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Ошибка при выполнении миграции: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Миграция для добавления поля updated_at в таблицы users, events и registrations
+По нему /api/changes отдает внешним системам только измененные строки
+Таблица tombstones (отметки об удалении) создается init_db
+"""
+
+import sys
+from datetime import datetime
+from sqlalchemy import text
+from database.models import engine, init_db
+from database.migrations import add_column_if_missing
+
+# Таблица -> колонка, из которой заполняется updated_at существующих строк
+TABLES = {
+    'users': 'registration_date',
+    'events': None,
+    'registrations': 'registration_time',
+}
+
+def run_migration():
+    """Запуск миграции для добавления поля updated_at"""
+    print("🚀 Запуск миграции для добавления поля updated_at...")
+    
+    try:
+        init_db()
+        with engine.connect() as connection:
+            now = datetime.utcnow()
+            for table, source in TABLES.items():
+                add_column_if_missing(connection, table, 'updated_at', 'TIMESTAMP')
+                
+                fill = f"COALESCE({source}, :now)" if source else ":now"
+                result = connection.execute(
+                    text(f"UPDATE {table} SET updated_at = {fill} WHERE updated_at IS NULL"),
+                    {'now': now}
+                )
+                if result.rowcount:
+                    print(f"🔄 {table}: заполнено updated_at для {result.rowcount} строк")
+                
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_updated_at_id ON {table} (updated_at, id)"
+                ))
+            connection.commit()
+            
+            print("✅ Миграция успешно выполнена!")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Ошибка при выполнении миграции: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
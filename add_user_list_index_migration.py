@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Миграция для добавления индекса (registration_date, id) в таблицу users
+По индексу веб-интерфейс выбирает страницы списка пользователей без OFFSET
+"""
+
+import sys
+from sqlalchemy import text
+from database.models import engine
+
+def run_migration():
+    """Запуск миграции для индекса списка пользователей"""
+    print("🚀 Запуск миграции для индекса списка пользователей...")
+    
+    try:
+        with engine.connect() as connection:
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_users_registration_date_id "
+                "ON users (registration_date, id)"
+            ))
+            connection.commit()
+            
+            print("✅ Миграция успешно выполнена! Индекс ix_users_registration_date_id создан")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Ошибка при выполнении миграции: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -28,9 +28,8 @@ def run_bot():
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         
-        # Запускаем бота
-        bot.scheduler.start()
-        bot.app.run_polling()
+        # Запускаем бота (планировщик стартует в post_init)
+        bot.run()
     except Exception as e:
         logger.error(f"Ошибка запуска бота: {e}")
 
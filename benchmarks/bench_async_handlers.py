@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Пропускная способность обработчиков бота при N одновременных обновлениях
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_async_handlers --concurrency 1,10,50,100 --query-delay-ms 20
+
+--query-delay-ms имитирует медленный запрос к БД: задержка добавляется в потоке
+драйвера, поэтому при асинхронном слое остальные обновления продолжают обрабатываться.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import configure_environment, seed_users_and_events, summarize
+
+configure_environment()
+
+from sqlalchemy import event as sa_event  # noqa: E402
+from database.models import async_engine  # noqa: E402
+from bot.telegram_bot import TelegramBot  # noqa: E402
+from bot.user_cache import user_profile_cache  # noqa: E402
+from benchmarks.fakes import CallRecorder, make_command_update, handle_update  # noqa: E402
+
+
+class QueryCounter:
+    """Число SQL-запросов к БД"""
+    
+    def __init__(self):
+        self.count = 0
+        sa_event.listen(async_engine.sync_engine, 'before_cursor_execute', self._on_execute)
+    
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def install_query_delay(delay):
+    """Искусственная задержка каждого SQL-запроса"""
+    @sa_event.listens_for(async_engine.sync_engine, 'before_cursor_execute')
+    def _delay(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(delay)
+
+
+async def run_round(bot, queries, telegram_ids, concurrency):
+    recorder = CallRecorder()
+    latencies = []
+    queries_before = queries.count
+    
+    async def one(telegram_id):
+        started = time.perf_counter()
+        await handle_update(bot.events_command, make_command_update(recorder, telegram_id, "/events"))
+        latencies.append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(one(telegram_ids[i % len(telegram_ids)]) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    
+    result = {
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 4),
+        'updates_per_s': round(concurrency / elapsed, 1),
+        'api_calls': recorder.count(),
+        'queries_per_update': round((queries.count - queries_before) / concurrency, 2),
+        'user_cache_hit_rate': user_profile_cache.stats()['hit_rate']
+    }
+    result.update(summarize(latencies))
+    return result
+
+
+async def main_async(args):
+    telegram_ids = seed_users_and_events(users=args.users, events=args.events)
+    if args.query_delay_ms:
+        install_query_delay(args.query_delay_ms / 1000)
+    
+    bot = TelegramBot()
+    queries = QueryCounter()
+    results = []
+    for concurrency in args.concurrency:
+        results.append(await run_round(bot, queries, telegram_ids, concurrency))
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--events', type=int, default=10)
+    parser.add_argument('--concurrency', type=lambda v: [int(x) for x in v.split(',')], default=[1, 10, 50, 100])
+    parser.add_argument('--query-delay-ms', type=float, default=0.0)
+    args = parser.parse_args()
+    
+    for result in asyncio.run(main_async(args)):
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
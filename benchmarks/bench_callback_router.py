@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Стоимость разбора нажатия кнопки в зависимости от числа типов кнопок
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_callback_router --routes 8,32,128,512 --iterations 100000
+
+chain - прежняя схема: цепочка data.startswith(...) и повторный разбор data.split("_")
+в обработчике, худший случай (совпадает последний префикс). router - CallbackCodec +
+CallbackRouter: один разбор и поиск по словарю. Время - на одно нажатие, без Bot API.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from bot.callbacks import CallbackCodec, CallbackRouter
+
+
+async def noop_handler(query, context, *args):
+    pass
+
+
+class NullQuery:
+    """callback query без обращений к Telegram"""
+    __slots__ = ('data',)
+    
+    def __init__(self, data):
+        self.data = data
+    
+    async def answer(self, *args, **kwargs):
+        pass
+
+
+def build_router(routes):
+    codec = CallbackCodec()
+    router = CallbackRouter(codec)
+    for i in range(routes):
+        name = f"action{i}"
+        codec.register(name, f"x{i}", int, legacy_prefix=f"{name}_")
+        router.add(name, noop_handler)
+    return codec, router
+
+
+def build_chain(routes):
+    """Эквивалент прежнего button_handler с цепочкой проверок префиксов"""
+    prefixes = [f"action{i}_" for i in range(routes)]
+    
+    async def dispatch(query, context):
+        await query.answer()
+        data = query.data
+        for prefix in prefixes:
+            if data.startswith(prefix):
+                await noop_handler(query, context, int(data.split("_")[1]))
+                return True
+        return False
+    
+    return dispatch
+
+
+async def time_dispatch(dispatch, data, iterations):
+    query = NullQuery(data)
+    context = SimpleNamespace()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await dispatch(query, context)
+    return (time.perf_counter() - started) / iterations
+
+
+async def main_async(args):
+    results = []
+    for routes in args.routes:
+        codec, router = build_router(routes)
+        chain = build_chain(routes)
+        last = f"action{routes - 1}"
+        
+        chain_s = await time_dispatch(chain, f"{last}_12345", args.iterations)
+        router_s = await time_dispatch(router.dispatch, codec.encode(last, 12345), args.iterations)
+        legacy_s = await time_dispatch(router.dispatch, f"{last}_12345", args.iterations)
+        results.append({
+            'routes': routes,
+            'chain_us': round(chain_s * 1e6, 3),
+            'router_us': round(router_s * 1e6, 3),
+            'router_legacy_us': round(legacy_s * 1e6, 3)
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--routes', type=lambda v: [int(x) for x in v.split(',')], default=[8, 32, 128, 512])
+    parser.add_argument('--iterations', type=int, default=100000)
+    args = parser.parse_args()
+    
+    for result in asyncio.run(main_async(args)):
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Процессорное время на /events и /my_events с кэшем карточек мероприятий и без него
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_event_cards --events 50 --iterations 200
+
+По умолчанию вся витрина помещается на одну страницу (--page-size 50), чтобы
+/events отрисовывал все мероприятия. render_* - только отрисовка уже
+загруженных мероприятий, command_* - обработчик целиком (/events - из снимка
+мероприятий, /my_events - с запросом к БД).
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import configure_environment, seed_users_and_events, summarize
+
+configure_environment()
+
+from config import Config  # noqa: E402
+from database.models import Event, Registration, User, SessionLocal, async_engine  # noqa: E402
+from bot.event_cards import EventCardCache  # noqa: E402
+from bot.telegram_bot import TelegramBot  # noqa: E402
+from benchmarks.fakes import CallRecorder, make_command_update, handle_update  # noqa: E402
+
+
+def seed_registrations(telegram_id):
+    """Регистрация пользователя на все мероприятия"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.telegram_id == telegram_id).one()
+        db.add_all([Registration(user_id=user.id, event_id=event.id) for event in db.query(Event).all()])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def load_events(bot):
+    """Мероприятия из снимка бота - те же, что отрисовывает /events"""
+    await bot.upcoming_events.refresh()
+    return await bot.upcoming_events.get()
+
+
+def measure(iterations, step):
+    """Процессорное время на одну итерацию"""
+    samples = []
+    for _ in range(iterations):
+        started = time.process_time()
+        step()
+        samples.append(time.process_time() - started)
+    return summarize(samples)
+
+
+async def measure_async(iterations, step):
+    samples = []
+    for _ in range(iterations):
+        started = time.process_time()
+        await step()
+        samples.append(time.process_time() - started)
+    return summarize(samples)
+
+
+async def run_mode(bot, cache, events, telegram_id, iterations):
+    bot.event_cards = cache
+    recorder = CallRecorder()
+    
+    result = {'cache': cache.max_size > 0}
+    result['render_events_cpu'] = measure(
+        iterations, lambda: bot._render_events_page(events, 0, 'Europe/Moscow')
+    )
+    result['command_events_cpu'] = await measure_async(
+        iterations, lambda: handle_update(bot.events_command, make_command_update(recorder, telegram_id, "/events"))
+    )
+    result['command_my_events_cpu'] = await measure_async(
+        iterations, lambda: handle_update(bot.my_events_command, make_command_update(recorder, telegram_id, "/my_events"))
+    )
+    result['cache_stats'] = cache.stats()
+    return result
+
+
+async def main_async(args):
+    telegram_ids = seed_users_and_events(users=1, events=args.events)
+    seed_registrations(telegram_ids[0])
+    
+    bot = TelegramBot()
+    events = await load_events(bot)
+    results = [
+        await run_mode(bot, EventCardCache(max_size=0), events, telegram_ids[0], args.iterations),
+        await run_mode(bot, EventCardCache(max_size=args.events * 4), events, telegram_ids[0], args.iterations)
+    ]
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=50)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+    
+    Config.EVENTS_PAGE_SIZE = args.page_size
+    
+    for result in asyncio.run(main_async(args)):
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
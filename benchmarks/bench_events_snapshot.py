@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Латентность /events из снимка мероприятий и с чтением из БД на каждый запрос
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_events_snapshot --events 50 --requests 2000 --query-delay-ms 5
+
+Режим db - снимок с max_age=0, то есть запрос мероприятий на каждое обновление
+(поведение до снимка). Профили пользователей прогреваются заранее, поэтому в
+режиме snapshot /events выполняется без запросов к БД.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import configure_environment, seed_users_and_events, summarize
+
+configure_environment()
+
+from database.models import async_engine  # noqa: E402
+from bot.telegram_bot import TelegramBot  # noqa: E402
+from bot.event_snapshot import UpcomingEvents  # noqa: E402
+from benchmarks.fakes import CallRecorder, make_command_update, handle_update  # noqa: E402
+from benchmarks.bench_async_handlers import QueryCounter, install_query_delay  # noqa: E402
+
+
+async def run_mode(bot, queries, telegram_ids, mode, requests):
+    bot.upcoming_events = UpcomingEvents(max_age=0 if mode == 'db' else 3600)
+    recorder = CallRecorder()
+    
+    # Прогрев: кэш профилей, кэш карточек и первая загрузка снимка
+    for telegram_id in telegram_ids:
+        await handle_update(bot.events_command, make_command_update(recorder, telegram_id, "/events"))
+    
+    latencies = []
+    queries_before = queries.count
+    for i in range(requests):
+        update = make_command_update(recorder, telegram_ids[i % len(telegram_ids)], "/events")
+        started = time.perf_counter()
+        await handle_update(bot.events_command, update)
+        latencies.append(time.perf_counter() - started)
+    
+    result = {
+        'mode': mode,
+        'queries_per_update': round((queries.count - queries_before) / requests, 2),
+        'snapshot_refreshes': bot.upcoming_events.stats()['refreshes']
+    }
+    result.update(summarize(latencies))
+    return result
+
+
+async def main_async(args):
+    telegram_ids = seed_users_and_events(users=args.users, events=args.events)
+    if args.query_delay_ms:
+        install_query_delay(args.query_delay_ms / 1000)
+    
+    bot = TelegramBot()
+    queries = QueryCounter()
+    results = [
+        await run_mode(bot, queries, telegram_ids, mode, args.requests)
+        for mode in ('db', 'snapshot')
+    ]
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--events', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--query-delay-ms', type=float, default=0.0)
+    args = parser.parse_args()
+    
+    for result in asyncio.run(main_async(args)):
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
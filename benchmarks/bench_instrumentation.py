@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Накладные расходы метрик: /events с METRICS_ENABLED и без, стоимость наблюдения
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_instrumentation --requests 3000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import configure_environment, seed_users_and_events, summarize
+
+configure_environment()
+
+from config import Config  # noqa: E402
+from database.models import async_engine  # noqa: E402
+from bot.telegram_bot import TelegramBot  # noqa: E402
+from bot.instrumentation import UPDATE_DURATION  # noqa: E402
+from monitoring.metrics import registry  # noqa: E402
+from benchmarks.fakes import CallRecorder, make_command_update, handle_update  # noqa: E402
+
+
+async def run_mode(bot, telegram_ids, enabled, requests):
+    Config.METRICS_ENABLED = enabled
+    recorder = CallRecorder()
+    latencies = []
+    for i in range(requests):
+        update = make_command_update(recorder, telegram_ids[i % len(telegram_ids)], "/events")
+        started = time.perf_counter()
+        await handle_update(bot.events_command, update)
+        latencies.append(time.perf_counter() - started)
+    
+    result = {'metrics_enabled': enabled}
+    result.update(summarize(latencies))
+    return result
+
+
+def observe_cost(iterations):
+    """Стоимость одного observe() гистограммы в микросекундах"""
+    Config.METRICS_ENABLED = True
+    started = time.perf_counter()
+    for i in range(iterations):
+        UPDATE_DURATION.observe(0.001 * (i % 50), 'command:bench')
+    return round((time.perf_counter() - started) / iterations * 1e6, 3)
+
+
+async def main_async(args):
+    telegram_ids = seed_users_and_events(users=args.users, events=args.events)
+    bot = TelegramBot()
+    
+    # Прогрев кэшей профилей, карточек и снимка мероприятий
+    await run_mode(bot, telegram_ids, True, len(telegram_ids))
+    
+    results = []
+    for enabled in (False, True, False, True):
+        results.append(await run_mode(bot, telegram_ids, enabled, args.requests))
+    
+    observe_us = observe_cost(100000)
+    started = time.perf_counter()
+    body = registry.render()
+    results.append({
+        'observe_us': observe_us,
+        'render_ms': round((time.perf_counter() - started) * 1000, 3),
+        'render_bytes': len(body)
+    })
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=3000)
+    args = parser.parse_args()
+    
+    for result in asyncio.run(main_async(args)):
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
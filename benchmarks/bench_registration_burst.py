@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Всплеск одновременных нажатий "Записаться" на одно мероприятие
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_registration_burst --clicks 3000 --capacity 100 --repeat 2
+
+Каждый пользователь нажимает кнопку --repeat раз. После прогона сверяется число
+регистраций в БД, счетчик registered_count и вместимость мероприятия.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+from benchmarks.common import configure_environment, seed_users_and_events, summarize
+
+configure_environment()
+
+from sqlalchemy import func  # noqa: E402
+from database.models import Event, Registration, SessionLocal, async_engine  # noqa: E402
+from bot.telegram_bot import TelegramBot  # noqa: E402
+from bot.callbacks import callbacks  # noqa: E402
+from benchmarks.fakes import CallRecorder, make_callback_update, handle_update  # noqa: E402
+
+
+async def main_async(args):
+    users = max(1, args.clicks // args.repeat)
+    telegram_ids = seed_users_and_events(users=users, events=1, max_participants=args.capacity)
+    
+    bot = TelegramBot()
+    recorder = CallRecorder()
+    latencies = []
+    
+    register_data = callbacks.encode('register', 1)
+    
+    async def click(telegram_id):
+        started = time.perf_counter()
+        await handle_update(bot.button_handler, make_callback_update(recorder, telegram_id, register_data))
+        latencies.append(time.perf_counter() - started)
+    
+    clicks = [telegram_ids[i % users] for i in range(users * args.repeat)]
+    started = time.perf_counter()
+    await asyncio.gather(*(click(telegram_id) for telegram_id in clicks))
+    elapsed = time.perf_counter() - started
+    await async_engine.dispose()
+    
+    # Классификация ответов по первой строке сообщения
+    outcomes = Counter(
+        call[2]['text'].split('\n', 1)[0]
+        for call in recorder.calls if call[0] == 'sendMessage'
+    )
+    
+    db = SessionLocal()
+    try:
+        registrations = db.query(func.count(Registration.id)).filter(Registration.event_id == 1).scalar()
+        registered_count = db.query(Event.registered_count).filter(Event.id == 1).scalar()
+    finally:
+        db.close()
+    
+    result = {
+        'clicks': len(clicks),
+        'capacity': args.capacity,
+        'elapsed_s': round(elapsed, 3),
+        'clicks_per_s': round(len(clicks) / elapsed, 1),
+        'registrations_in_db': registrations,
+        'registered_count': registered_count,
+        'oversold': registrations > args.capacity or registered_count != registrations,
+        'outcomes': dict(outcomes)
+    }
+    result.update(summarize(latencies))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clicks', type=int, default=3000)
+    parser.add_argument('--capacity', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=1, help="сколько раз каждый пользователь нажимает кнопку")
+    args = parser.parse_args()
+    
+    print(json.dumps(asyncio.run(main_async(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Время восстановления расписания напоминаний при старте бота
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_reminder_rehydration --registrations 100000 --events 1000
+
+Расписание выводится из БД одним запросом по будущим мероприятиям, поэтому время
+зависит от числа мероприятий, а не регистраций.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import configure_environment, seed_users_and_events
+
+configure_environment()
+
+
+def seed_registrations(users, events, registrations):
+    """Массовая вставка уникальных пар (пользователь, мероприятие)"""
+    from database.models import Registration, Event, SessionLocal, engine, backfill_registered_count
+    
+    per_user = max(1, registrations // users)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        rows = []
+        for user_id in range(1, users + 1):
+            for event_id in random.sample(range(1, events + 1), min(per_user, events)):
+                rows.append({'user_id': user_id, 'event_id': event_id, 'registration_time': now})
+        db.bulk_insert_mappings(Registration, rows)
+        # Мероприятия распределены на ближайшие 60 дней
+        db.bulk_update_mappings(Event, [
+            {'id': event_id, 'event_datetime': now + timedelta(days=2, minutes=event_id * 60 * 24 * 60 // events),
+             'max_participants': users}
+            for event_id in range(1, events + 1)
+        ])
+        db.commit()
+    finally:
+        db.close()
+    
+    with engine.connect() as connection:
+        backfill_registered_count(connection)
+        connection.commit()
+    return len(rows)
+
+
+async def main_async(args):
+    from bot.scheduler import NotificationScheduler, REMINDER_JOB_PREFIX
+    
+    users = max(1, args.registrations // args.per_user)
+    seed_users_and_events(users=users, events=args.events)
+    inserted = seed_registrations(users, args.events, args.registrations)
+    
+    scheduler = NotificationScheduler(bot=None)
+    scheduler.start()
+    
+    started = time.perf_counter()
+    cold = await scheduler.reconcile()
+    cold_elapsed = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    warm = await scheduler.reconcile()
+    warm_elapsed = time.perf_counter() - started
+    
+    jobs = sum(1 for job in scheduler.scheduler.get_jobs() if job.id.startswith(REMINDER_JOB_PREFIX))
+    scheduler.stop()
+    
+    return {
+        'registrations': inserted,
+        'events': args.events,
+        'reminder_jobs': jobs,
+        'startup_rehydration_ms': round(cold_elapsed * 1000, 2),
+        'startup_result': cold,
+        'periodic_reconcile_ms': round(warm_elapsed * 1000, 2),
+        'periodic_result': warm
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registrations', type=int, default=100_000)
+    parser.add_argument('--events', type=int, default=1000)
+    parser.add_argument('--per-user', type=int, default=10, help="регистраций на пользователя")
+    args = parser.parse_args()
+    
+    print(json.dumps(asyncio.run(main_async(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
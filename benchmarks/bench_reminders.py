@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Рассылка напоминаний по одному мероприятию с большим числом участников
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_reminders --seats 2000 --rate 200 --send-latency-ms 50
+
+Проверяет, что на мероприятие создается одна задача планировщика, и измеряет
+время рассылки при заданном ограничении частоты и задержке Bot API.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import configure_environment, seed_users_and_events
+
+configure_environment()
+
+
+class FakeBot:
+    """Bot с send_message через PriorityRateLimiter; сам запрос только запоминается"""
+    
+    def __init__(self, latency, rate_limiter):
+        self.latency = latency
+        self.rate_limiter = rate_limiter
+        self.sent = []
+    
+    async def _send(self, chat_id, text):
+        await asyncio.sleep(self.latency)
+        self.sent.append((chat_id, time.perf_counter()))
+        return True
+    
+    async def send_message(self, chat_id, text, rate_limit_args=None, **kwargs):
+        return await self.rate_limiter.process_request(
+            self._send, (chat_id, text), {}, 'sendMessage', {'chat_id': chat_id, 'text': text}, rate_limit_args
+        )
+
+
+class SimpleEvent:
+    def __init__(self, event_id, event_datetime):
+        self.id = event_id
+        self.event_datetime = event_datetime
+
+
+async def main_async(args):
+    from database.models import Event, Registration, SessionLocal
+    from bot.scheduler import NotificationScheduler, REMINDER_JOB_PREFIX
+    from bot.sender import PriorityRateLimiter
+    
+    seed_users_and_events(users=args.seats, events=1, max_participants=args.seats)
+    db = SessionLocal()
+    try:
+        event = db.get(Event, 1)
+        event.event_datetime = datetime.utcnow() + timedelta(days=1)
+        db.add_all([Registration(user_id=user_id, event_id=1) for user_id in range(1, args.seats + 1)])
+        db.commit()
+        db.refresh(event)
+    finally:
+        db.close()
+    
+    rate_limiter = PriorityRateLimiter()
+    await rate_limiter.initialize()
+    bot = FakeBot(args.send_latency_ms / 1000, rate_limiter)
+    scheduler = NotificationScheduler(bot)
+    scheduler.start()
+    
+    # Каждая запись вызывает add_reminder, но задача по мероприятию одна
+    planned = SimpleEvent(1, datetime.utcnow() + timedelta(days=2))
+    for _ in range(args.seats):
+        scheduler.add_reminder(planned)
+    jobs = sum(1 for job in scheduler.scheduler.get_jobs() if job.id.startswith(REMINDER_JOB_PREFIX))
+    
+    started = time.perf_counter()
+    await scheduler._send_event_reminders(1)
+    elapsed = time.perf_counter() - started
+    scheduler.stop()
+    await rate_limiter.shutdown()
+    
+    return {
+        'seats': args.seats,
+        'reminder_jobs': jobs,
+        'reminders_sent': len(bot.sent),
+        'elapsed_s': round(elapsed, 3),
+        'effective_rate_per_s': round(len(bot.sent) / elapsed, 1) if elapsed else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seats', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=None, help="SEND_GLOBAL_RATE, сообщений в секунду")
+    parser.add_argument('--send-latency-ms', type=float, default=30.0)
+    args = parser.parse_args()
+    
+    if args.rate is not None:
+        os.environ['SEND_GLOBAL_RATE'] = str(args.rate)
+    
+    print(json.dumps(asyncio.run(main_async(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
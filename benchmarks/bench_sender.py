@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Смешанная нагрузка на PriorityRateLimiter: фоновая рассылка и интерактивные ответы
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_sender --reminders 600 --interactive-rate 5 --rate 30
+
+Пока очередь напоминаний разгружается на максимально допустимой скорости,
+измеряется задержка интерактивных ответов (от постановки до отправки).
+--retry-after-every N имитирует ответ 429 на каждый N-й запрос.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.common import configure_environment, summarize
+
+configure_environment()
+
+
+class FakeApi:
+    """Имитация Bot API с задержкой и периодическими 429"""
+    
+    def __init__(self, latency, retry_after_every):
+        self.latency = latency
+        self.retry_after_every = retry_after_every
+        self.calls = 0
+    
+    async def send(self, chat_id, text):
+        from telegram.error import RetryAfter
+        
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.retry_after_every and self.calls % self.retry_after_every == 0:
+            raise RetryAfter(1)
+        return True
+
+
+async def main_async(args):
+    from bot.sender import PriorityRateLimiter, Priority
+    
+    limiter = PriorityRateLimiter()
+    await limiter.initialize()
+    api = FakeApi(args.api_latency_ms / 1000, args.retry_after_every)
+    
+    async def send(chat_id, priority):
+        started = time.perf_counter()
+        await limiter.process_request(
+            api.send, (chat_id, "text"), {}, 'sendMessage',
+            {'chat_id': chat_id}, {'priority': priority}
+        )
+        return time.perf_counter() - started
+    
+    started = time.perf_counter()
+    reminders = [
+        asyncio.create_task(send(100_000 + i, Priority.REMINDER))
+        for i in range(args.reminders)
+    ]
+    
+    interactive_latencies = []
+    interval = 1 / args.interactive_rate
+    max_depth = 0
+    while not all(task.done() for task in reminders):
+        max_depth = max(max_depth, limiter.queue_depth[Priority.REMINDER])
+        interactive_latencies.append(await send(1 + len(interactive_latencies) % 50, Priority.INTERACTIVE))
+        await asyncio.sleep(interval)
+    
+    reminder_latencies = await asyncio.gather(*reminders)
+    elapsed = time.perf_counter() - started
+    await limiter.shutdown()
+    
+    return {
+        'global_rate': limiter.global_rate,
+        'reminders': args.reminders,
+        'reminder_drain_s': round(elapsed, 2),
+        'reminder_rate_per_s': round(args.reminders / elapsed, 1),
+        'max_reminder_queue_depth': max_depth,
+        'interactive': summarize(interactive_latencies),
+        'reminder': summarize(reminder_latencies),
+        'limiter': {key: value for key, value in limiter.metrics().items() if key != 'latency_seconds'}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reminders', type=int, default=600)
+    parser.add_argument('--interactive-rate', type=float, default=5.0, help="интерактивных ответов в секунду")
+    parser.add_argument('--rate', type=float, default=None, help="SEND_GLOBAL_RATE")
+    parser.add_argument('--api-latency-ms', type=float, default=40.0)
+    parser.add_argument('--retry-after-every', type=int, default=0)
+    args = parser.parse_args()
+    
+    if args.rate is not None:
+        os.environ['SEND_GLOBAL_RATE'] = str(args.rate)
+    
+    print(json.dumps(asyncio.run(main_async(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Маршруты веб-интерфейса на базах растущего размера: латентность, запросы к БД, память
+
+База наполняется generate_bulk_data.py и дорастает до каждого размера из
+--sizes (пользователей; мероприятий в 100 раз меньше, регистраций в 10 раз
+больше - соотношения задаются флагами). Запросы выполняются через тестовый
+клиент Flask. Каждая строка вывода - JSON с результатом маршрута на размере;
+первая строка - коммит и параметры, чтобы сравнивать прогоны между коммитами.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_web_routes --sizes 1000,10000,50000 --iterations 5 > before.jsonl
+
+Результаты для сравнения - по ключу (users, route). Второй прогон на том же
+BENCH_DATABASE_URL переиспользует уже сгенерированные данные.
+
+Пиковая память - tracemalloc на отдельном запросе (без него латентность
+не искажается). Тело ответа читается по частям и не накапливается, поэтому у
+потоковых маршрутов (выгрузки, /registrations) пик показывает память сервера,
+а не размер ответа. /events/<id> запрашивается для самого популярного мероприятия.
+"""
+
+import argparse
+import base64
+import contextlib
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks.common import configure_environment, summarize
+
+configure_environment()
+
+from sqlalchemy import event as sa_event, func, select  # noqa: E402
+from config import Config  # noqa: E402
+
+# Сообщения о подключении и создании таблиц - в stderr, в stdout только JSON
+with contextlib.redirect_stdout(sys.stderr):
+    from database.models import User, Event, Registration, engine, SessionLocal, init_db  # noqa: E402
+    from web.app import create_app  # noqa: E402
+    import generate_bulk_data  # noqa: E402
+
+# Маршрут: имя в результатах и путь (event_id - самое популярное мероприятие)
+ROUTES = (
+    ('/', '/'),
+    ('/users', '/users'),
+    ('/api/users', '/api/users'),
+    ('/events', '/events'),
+    ('/events/<id>', '/events/{event_id}'),
+    ('/registrations', '/registrations'),
+    ('/api/stats', '/api/stats'),
+    ('/api/events', '/api/events'),
+    ('/api/events?cursor', '/api/events?cursor=&per_page=100'),
+    ('/api/changes', '/api/changes'),
+    ('/export/users.csv', '/export/users.csv'),
+    ('/export/registrations.ndjson', '/export/registrations.ndjson'),
+    ('/export/events/<id>/attendees.csv', '/export/events/{event_id}/attendees.csv'),
+)
+
+
+class QueryCounter:
+    """Число SQL-запросов к БД через sync engine веб-интерфейса"""
+    
+    def __init__(self):
+        self.count = 0
+        sa_event.listen(engine, 'before_cursor_execute', self._on_execute)
+    
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def table_counts():
+    db = SessionLocal()
+    try:
+        return (
+            db.scalar(select(func.count(User.id))),
+            db.scalar(select(func.count(Event.id))),
+            db.scalar(select(func.count(Registration.id)))
+        )
+    finally:
+        db.close()
+
+
+def grow_database(users, events, registrations, seed):
+    """Догенерация данных до заданного размера (вывод генератора - в stderr)"""
+    current_users, current_events, current_registrations = table_counts()
+    if current_users >= users and current_events >= events and current_registrations >= registrations:
+        return
+    args = argparse.Namespace(
+        users=max(1, users - current_users),
+        events=max(1, events - current_events),
+        registrations=max(0, registrations - current_registrations),
+        past_share=0.7,
+        skew=1.1,
+        batch_size=20_000,
+        seed=seed
+    )
+    with contextlib.redirect_stdout(sys.stderr):
+        generate_bulk_data.generate(args)
+
+
+def most_popular_event_id():
+    db = SessionLocal()
+    try:
+        return db.scalar(select(Event.id).order_by(Event.registered_count.desc()).limit(1))
+    finally:
+        db.close()
+
+
+def read_response(client, headers, path):
+    """
+    Запрос с чтением тела по частям: у потоковых ответов отрисовка идет при чтении
+    
+    Returns:
+        tuple: (код ответа, байт в теле, секунд до первой части тела)
+    """
+    started = time.perf_counter()
+    response = client.get(path, headers=headers)
+    size = 0
+    first_chunk = None
+    try:
+        for chunk in response.iter_encoded():
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - started
+            size += len(chunk)
+    finally:
+        response.close()
+    return response.status_code, size, first_chunk
+
+
+def measure_route(client, headers, queries, path, iterations):
+    # Прогрев: компиляция шаблонов и кэши SQLAlchemy
+    read_response(client, headers, path)
+    
+    latencies = []
+    first_chunks = []
+    queries_before = queries.count
+    for _ in range(iterations):
+        started = time.perf_counter()
+        status, size, first_chunk = read_response(client, headers, path)
+        latencies.append(time.perf_counter() - started)
+        first_chunks.append(first_chunk or 0)
+    queries_per_request = (queries.count - queries_before) / iterations
+    
+    tracemalloc.start()
+    try:
+        read_response(client, headers, path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    result = {
+        'status': status,
+        'bytes': size,
+        'first_chunk_ms': round(min(first_chunks) * 1000, 2),
+        'queries': round(queries_per_request, 2),
+        'peak_mb': round(peak / 1024 / 1024, 2)
+    }
+    result.update(summarize(latencies))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000', help="Число пользователей на каждом шаге")
+    parser.add_argument('--users-per-event', type=int, default=100)
+    parser.add_argument('--registrations-per-user', type=float, default=10)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--routes', default=None, help="Имена маршрутов через запятую (по умолчанию все)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    routes = ROUTES
+    if args.routes:
+        selected = set(args.routes.split(','))
+        routes = [route for route in ROUTES if route[0] in selected]
+    
+    print(json.dumps({
+        'commit': git_commit(),
+        'sizes': sizes,
+        'iterations': args.iterations,
+        'routes': [name for name, _ in routes]
+    }, ensure_ascii=False))
+    
+    with contextlib.redirect_stdout(sys.stderr):
+        init_db()
+    app = create_app()
+    client = app.test_client()
+    credentials = base64.b64encode(f"{Config.API_USERNAME}:{Config.API_PASSWORD}".encode()).decode()
+    headers = {'Authorization': f"Basic {credentials}"}
+    queries = QueryCounter()
+    
+    for step, users in enumerate(sizes):
+        events = max(1, users // args.users_per_event)
+        registrations = int(users * args.registrations_per_user)
+        grow_database(users, events, registrations, args.seed + step)
+        users, events, registrations = table_counts()
+        event_id = most_popular_event_id()
+        
+        for name, path in routes:
+            result = {
+                'users': users,
+                'events': events,
+                'registrations': registrations,
+                'route': name
+            }
+            result.update(measure_route(client, headers, queries, path.format(event_id=event_id), args.iterations))
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+    
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Общие утилиты бенчмарков: временная база данных и наполнение тестовыми данными
+
+configure_environment() нужно вызывать до импорта database.models и config,
+так как engine создается при импорте модуля.
+"""
+
+import os
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+
+
+def configure_environment(database_url=None):
+    """Настройка окружения: отдельная SQLite база и фиктивный токен бота"""
+    if database_url is None:
+        database_url = os.getenv('BENCH_DATABASE_URL')
+    if database_url is None:
+        tmp_dir = tempfile.mkdtemp(prefix='ai-community-bench-')
+        database_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('BOT_TOKEN', '123456:BENCHMARK-TOKEN')
+    return database_url
+
+
+def seed_users_and_events(users=100, events=30, max_participants=100):
+    """Создание пользователей с завершенным профилем и будущих мероприятий"""
+    from database.models import User, Event, SessionLocal, init_db
+    
+    init_db()
+    db = SessionLocal()
+    try:
+        db.bulk_insert_mappings(User, [
+            {
+                'telegram_id': 10_000 + i,
+                'username': f"user{i}",
+                'first_name': "Bench",
+                'full_name': f"Bench User {i}",
+                'company': "Benchmark Inc",
+                'role': "Engineer",
+                'ai_experience': "Иное",
+                'email': f"user{i}@example.com",
+                'is_profile_complete': 1,
+                'timezone': 'Europe/Moscow'
+            }
+            for i in range(users)
+        ])
+        now = datetime.utcnow()
+        db.bulk_insert_mappings(Event, [
+            {
+                'title': f"Мероприятие {i}",
+                'description': "Описание мероприятия для бенчмарка",
+                'event_datetime': now + timedelta(days=2, hours=i),
+                'webinar_link': f"https://zoom.us/j/{i}",
+                'max_participants': max_participants
+            }
+            for i in range(events)
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return [10_000 + i for i in range(users)]
+
+
+def percentile(values, pct):
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies):
+    """Сводка по латентностям в миллисекундах"""
+    ms = [value * 1000 for value in latencies]
+    return {
+        'count': len(ms),
+        'mean_ms': round(statistics.fmean(ms), 3) if ms else 0.0,
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(max(ms), 3) if ms else 0.0
+    }
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Локальная имитация Bot API для нагрузочных тестов бота
+
+Принимает запросы вида /bot<token>/<method> и отвечает как Telegram на методы,
+которые вызывает бот: getMe, sendMessage, sendPhoto, editMessageText,
+editMessageCaption, answerCallbackQuery (а также setWebhook/deleteWebhook/
+getUpdates). Каждый вызов записывается; задержка ответа и ответы 429 с
+retry_after настраиваются.
+
+Запуск отдельным процессом (бот - с BOT_API_BASE_URL=http://127.0.0.1:8081/bot):
+    python -m benchmarks.fake_bot_api --port 8081 --latency-ms 50 --retry-after-every 500
+
+Внутри процесса используется benchmarks/load_generator.py.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict, deque
+
+from aiohttp import web
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Fake Bot', 'username': 'fake_bot'}
+
+# Методы, возвращающие Message
+MESSAGE_METHODS = {'sendMessage', 'sendPhoto', 'editMessageText', 'editMessageCaption'}
+# Методы, возвращающие True
+TRUE_METHODS = {'answerCallbackQuery', 'setWebhook', 'deleteWebhook', 'setMyCommands'}
+
+
+class FakeBotApi:
+    """Имитация Bot API: запись вызовов, задержка и ответы 429"""
+    
+    def __init__(self, latency=0.0, jitter=0.0, retry_after_every=0, retry_after_rate=0.0,
+                 retry_after=1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        # 429 на каждый N-й вызов и/или с заданной вероятностью
+        self.retry_after_every = retry_after_every
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        
+        self.calls = Counter()
+        self.retry_after_total = 0
+        self.total = 0
+        self._message_ids = defaultdict(int)
+        # Последние callback_data из клавиатур, отправленных в чат: генератор нагрузки
+        # "нажимает" настоящие кнопки, как пользователь
+        self.buttons = defaultdict(lambda: deque(maxlen=50))
+        self._runner = None
+    
+    def build_web_app(self):
+        web_app = web.Application(client_max_size=20 * 1024 * 1024)
+        web_app.router.add_route('*', '/bot{token}/{method}', self.handle)
+        return web_app
+    
+    async def start(self, host='127.0.0.1', port=0):
+        """
+        Запуск сервера; port=0 - свободный порт
+        
+        Returns:
+            str: base_url для Application.builder().base_url()
+        """
+        self._runner = web.AppRunner(self.build_web_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}/bot"
+    
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    @staticmethod
+    async def _read_params(request):
+        if request.content_type == 'application/json':
+            return await request.json()
+        form = await request.post()
+        return {key: value for key, value in form.items() if isinstance(value, str)}
+    
+    def _should_throttle(self):
+        if self.retry_after_every and self.total % self.retry_after_every == 0:
+            return True
+        return self.retry_after_rate > 0 and self.random.random() < self.retry_after_rate
+    
+    async def handle(self, request):
+        method = request.match_info['method']
+        params = await self._read_params(request)
+        self.total += 1
+        
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.random.random() * self.jitter)
+        
+        if method != 'getMe' and self._should_throttle():
+            self.retry_after_total += 1
+            return web.json_response({
+                'ok': False,
+                'error_code': 429,
+                'description': f"Too Many Requests: retry after {self.retry_after}",
+                'parameters': {'retry_after': self.retry_after}
+            }, status=429)
+        
+        self.calls[method] += 1
+        if method == 'getMe':
+            return self._ok(BOT_USER)
+        if method == 'getUpdates':
+            return self._ok([])
+        if method in TRUE_METHODS:
+            return self._ok(True)
+        if method in MESSAGE_METHODS:
+            return self._ok(self._message(method, params))
+        return web.json_response(
+            {'ok': False, 'error_code': 404, 'description': "Not Found: method not found"},
+            status=404
+        )
+    
+    @staticmethod
+    def _ok(result):
+        return web.json_response({'ok': True, 'result': result})
+    
+    def _message(self, method, params):
+        """Message в ответ на отправку или редактирование"""
+        chat_id = int(params.get('chat_id') or 0)
+        self._remember_buttons(chat_id, params.get('reply_markup'))
+        
+        if method.startswith('edit'):
+            message_id = int(params.get('message_id') or 0)
+        else:
+            self._message_ids[chat_id] += 1
+            message_id = self._message_ids[chat_id]
+        
+        message = {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': BOT_USER
+        }
+        if method == 'sendPhoto':
+            # Как Telegram: file_id загруженного изображения для повторной отправки
+            message['photo'] = [{
+                'file_id': f"fake-file-{chat_id}-{message_id}",
+                'file_unique_id': f"fake-{chat_id}-{message_id}",
+                'width': 640,
+                'height': 360
+            }]
+            message['caption'] = params.get('caption', '')
+        else:
+            message['text'] = params.get('text') or params.get('caption') or ''
+        return message
+    
+    def _remember_buttons(self, chat_id, reply_markup):
+        if not reply_markup:
+            return
+        if isinstance(reply_markup, str):
+            reply_markup = json.loads(reply_markup)
+        for row in reply_markup.get('inline_keyboard', []):
+            for button in row:
+                if 'callback_data' in button:
+                    self.buttons[chat_id].append(button['callback_data'])
+    
+    def stats(self):
+        return {
+            'requests': self.total,
+            'retry_after': self.retry_after_total,
+            'calls': dict(self.calls)
+        }
+
+
+async def serve(args):
+    api = FakeBotApi(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        retry_after_every=args.retry_after_every,
+        retry_after_rate=args.retry_after_rate,
+        retry_after=args.retry_after
+    )
+    base_url = await api.start(args.host, args.port)
+    print(f"Fake Bot API: BOT_API_BASE_URL={base_url}")
+    try:
+        while True:
+            await asyncio.sleep(args.report_every)
+            print(json.dumps(api.stats(), ensure_ascii=False))
+    finally:
+        await api.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--retry-after-every', type=int, default=0)
+    parser.add_argument('--retry-after-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--report-every', type=float, default=10.0)
+    args = parser.parse_args()
+    
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
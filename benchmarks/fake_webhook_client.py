@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Локальная имитация Telegram, отправляющая обновления на webhook-приёмник
+
+Запуск из корня проекта:
+    # Против запущенного бота в режиме BOT_MODE=webhook
+    python -m benchmarks.fake_webhook_client --url http://localhost:8443/telegram/webhook --secret $WEBHOOK_SECRET_TOKEN
+
+    # Самопроверка: приёмник поднимается в этом же процессе, обработчики не запускаются
+    python -m benchmarks.fake_webhook_client --self-test --updates 5000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import configure_environment, summarize
+
+configure_environment()
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+from telegram.ext import Application  # noqa: E402
+from config import Config  # noqa: E402
+from bot.webhook import WebhookReceiver, SECRET_TOKEN_HEADER  # noqa: E402
+
+
+def make_update_payload(update_id, telegram_id, text="/events"):
+    """JSON обновления в формате Bot API"""
+    payload = {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': telegram_id, 'type': 'private'},
+            'from': {'id': telegram_id, 'is_bot': False, 'first_name': 'Load'},
+            'text': text
+        }
+    }
+    if text.startswith('/'):
+        payload['message']['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return payload
+
+
+async def post_updates(url, secret, updates, concurrency):
+    """Отправка обновлений с ограничением параллельности"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+    headers = {SECRET_TOKEN_HEADER: secret} if secret else {}
+    
+    async with aiohttp.ClientSession() as session:
+        async def post(update_id):
+            async with semaphore:
+                started = time.perf_counter()
+                payload = make_update_payload(update_id, 10_000 + update_id % 1000)
+                async with session.post(url, json=payload, headers=headers) as response:
+                    await response.read()
+                    statuses[response.status] = statuses.get(response.status, 0) + 1
+                latencies.append(time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(post(update_id) for update_id in range(1, updates + 1)))
+        elapsed = time.perf_counter() - started
+    
+    result = {
+        'updates': updates,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'updates_per_s': round(updates / elapsed, 1),
+        'statuses': statuses
+    }
+    result.update(summarize(latencies))
+    return result
+
+
+async def start_receiver(application, secret_token):
+    """Приёмник на свободном локальном порту: (runner, адрес webhook)"""
+    receiver = WebhookReceiver(application, secret_token=secret_token, path='/telegram/webhook')
+    runner = web.AppRunner(receiver.build_web_app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/telegram/webhook"
+
+
+async def self_test(args):
+    """Приёмник в этом же процессе: проверка секрета и пропускной способности приёма"""
+    application = Application.builder().token(Config.BOT_TOKEN).build()
+    
+    # Приёмник без настроенного секрета отклоняет все обновления, с заголовком и без
+    runner, url = await start_receiver(application, secret_token=None)
+    try:
+        unconfigured = [await post_updates(url, secret, 10, 10) for secret in (None, 'any-secret')]
+    finally:
+        await runner.cleanup()
+    
+    runner, url = await start_receiver(application, secret_token='self-test-secret')
+    try:
+        rejected = await post_updates(url, 'wrong-secret', 10, 10)
+        result = await post_updates(url, 'self-test-secret', args.updates, args.concurrency)
+    finally:
+        await runner.cleanup()
+    
+    result['rejected_with_wrong_secret'] = rejected['statuses'].get(403, 0)
+    result['rejected_without_configured_secret'] = sum(item['statuses'].get(403, 0) for item in unconfigured)
+    result['queued'] = application.update_queue.qsize()
+    if result['rejected_with_wrong_secret'] != 10 or result['rejected_without_configured_secret'] != 20:
+        raise SystemExit(f"Приёмник принял обновление без верного секрета: {json.dumps(result, ensure_ascii=False)}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="адрес webhook-приёмника")
+    parser.add_argument('--secret', default=None)
+    parser.add_argument('--updates', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--self-test', action='store_true')
+    args = parser.parse_args()
+    
+    if args.self_test:
+        result = asyncio.run(self_test(args))
+    elif args.url:
+        result = asyncio.run(post_updates(args.url, args.secret, args.updates, args.concurrency))
+    else:
+        parser.error("укажите --url или --self-test")
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Заглушки объектов python-telegram-bot для прогона обработчиков TelegramBot без Telegram
+"""
+
+import asyncio
+import functools
+import time
+from types import SimpleNamespace
+
+
+class CallRecorder:
+    """Общий журнал исходящих вызовов Bot API"""
+    
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = []
+    
+    async def record(self, method, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls.append((method, time.perf_counter(), kwargs))
+        photo = []
+        if method == 'sendPhoto':
+            # Как Telegram: в ответе на отправку фото приходит file_id загруженного файла
+            photo = [SimpleNamespace(file_id=f"file-{len(self.calls)}")]
+        return SimpleNamespace(message_id=len(self.calls), photo=photo)
+    
+    def count(self, method=None):
+        if method is None:
+            return len(self.calls)
+        return sum(1 for call in self.calls if call[0] == method)
+
+
+class FakeMessage:
+    def __init__(self, recorder, chat_id, text=""):
+        self.recorder = recorder
+        self.chat_id = chat_id
+        self.text = text
+    
+    async def reply_text(self, text, **kwargs):
+        return await self.recorder.record('sendMessage', chat_id=self.chat_id, text=text, **kwargs)
+    
+    async def reply_photo(self, photo, **kwargs):
+        return await self.recorder.record('sendPhoto', chat_id=self.chat_id, photo=photo, **kwargs)
+
+
+class FakeCallbackQuery:
+    def __init__(self, recorder, chat_id, data):
+        self.recorder = recorder
+        self.chat_id = chat_id
+        self.data = data
+        self.from_user = make_user(chat_id)
+        self.message = FakeMessage(recorder, chat_id)
+    
+    async def answer(self, *args, **kwargs):
+        return await self.recorder.record('answerCallbackQuery', chat_id=self.chat_id)
+    
+    async def edit_message_text(self, text, **kwargs):
+        return await self.recorder.record('editMessageText', chat_id=self.chat_id, text=text, **kwargs)
+    
+    async def edit_message_caption(self, caption=None, **kwargs):
+        return await self.recorder.record('editMessageCaption', chat_id=self.chat_id, caption=caption, **kwargs)
+
+
+def make_user(telegram_id):
+    """Telegram-пользователь с минимальным набором полей"""
+    return SimpleNamespace(
+        id=telegram_id,
+        username=f"user{telegram_id}",
+        first_name="Bench",
+        last_name=str(telegram_id)
+    )
+
+
+def make_command_update(recorder, telegram_id, text=""):
+    """Update с текстовым сообщением (команда или ввод)"""
+    return SimpleNamespace(
+        effective_user=make_user(telegram_id),
+        effective_chat=SimpleNamespace(id=telegram_id),
+        message=FakeMessage(recorder, telegram_id, text),
+        callback_query=None
+    )
+
+
+def make_callback_update(recorder, telegram_id, data):
+    """Update с нажатием inline-кнопки"""
+    return SimpleNamespace(
+        effective_user=make_user(telegram_id),
+        effective_chat=SimpleNamespace(id=telegram_id),
+        message=None,
+        callback_query=FakeCallbackQuery(recorder, telegram_id, data)
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _context_class():
+    # Импорт откладывается: database.models нельзя импортировать до configure_environment()
+    from bot.middleware import UnitOfWorkContextMixin
+    
+    class FakeContext(UnitOfWorkContextMixin, SimpleNamespace):
+        """Контекст обработчика: db и пользователь берутся из update_unit_of_work, как в BotContext"""
+    
+    return FakeContext
+
+
+def make_context(args=None):
+    return _context_class()(args=args or [], user_data={}, chat_data={}, bot_data={})
+
+
+async def handle_update(handler, update, context=None):
+    """Вызов обработчика так же, как в UnitOfWorkApplication: одна сессия на обновление"""
+    from bot.middleware import update_unit_of_work
+    async with update_unit_of_work(update):
+        await handler(update, context if context is not None else make_context())
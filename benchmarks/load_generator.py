@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Синтетическая нагрузка на бота: настоящие обработчики против имитации Bot API
+
+Бот собирается как в продакшне (TelegramBot, PTB Application, ограничитель
+отправки, unit of work), но запросы к Bot API уходят в benchmarks/fake_bot_api.py.
+Виртуальные пользователи выполняют сценарии и нажимают кнопки из клавиатур,
+которые бот действительно отправил:
+- browse: /events и переход на следующую страницу
+- register: /events и запись на мероприятие
+- cancel: /my_events и отмена регистрации
+- start: регистрация нового пользователя (/start, ответы, выбор опыта с ИИ, email)
+
+Запуск из корня проекта:
+    python -m benchmarks.load_generator --updates 5000 --concurrency 50 \\
+        --mix browse=50,register=25,cancel=10,start=15 --api-latency-ms 30 --retry-after-every 500
+
+--max-p99-ms задает порог: при его превышении процесс завершается с кодом 1
+(проверка регрессий перед деплоем).
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.common import configure_environment, seed_users_and_events, summarize
+
+configure_environment()
+
+from telegram import Update  # noqa: E402
+from config import Config  # noqa: E402
+from database.models import async_engine  # noqa: E402
+from bot.telegram_bot import TelegramBot  # noqa: E402
+from bot.instrumentation import UPDATE_ERRORS, update_label  # noqa: E402
+from benchmarks.fake_bot_api import FakeBotApi  # noqa: E402
+from benchmarks.fake_webhook_client import make_update_payload  # noqa: E402
+
+# Telegram ID пользователей, которые проходят регистрацию в сценарии start
+NEW_USER_ID_BASE = 900_000
+
+
+def make_callback_payload(update_id, telegram_id, data):
+    """JSON нажатия inline-кнопки в формате Bot API"""
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': {'id': telegram_id, 'is_bot': False, 'first_name': 'Load'},
+            'chat_instance': str(telegram_id),
+            'data': data,
+            'message': {
+                'message_id': 1,
+                'date': int(time.time()),
+                'chat': {'id': telegram_id, 'type': 'private'},
+                'text': ''
+            }
+        }
+    }
+
+
+class LoadGenerator:
+    """Виртуальные пользователи, отправляющие обновления в Application бота"""
+    
+    def __init__(self, bot, api, telegram_ids, mix, seed=None):
+        self.bot = bot
+        self.api = api
+        self.telegram_ids = telegram_ids
+        self.scenarios = list(mix)
+        self.weights = [mix[name] for name in self.scenarios]
+        self.random = random.Random(seed)
+        self.latencies = defaultdict(list)
+        self.scenario_counts = defaultdict(int)
+        self.updates = 0
+        self._update_ids = itertools.count(1)
+        self._new_user_ids = itertools.count(NEW_USER_ID_BASE)
+    
+    async def send(self, payload):
+        """Обработка одного обновления тем же путем, что и в продакшне"""
+        update = Update.de_json(payload, self.bot.app.bot)
+        started = time.perf_counter()
+        await self.bot.app.process_update(update)
+        self.latencies[update_label(update)].append(time.perf_counter() - started)
+        self.updates += 1
+    
+    async def message(self, telegram_id, text):
+        await self.send(make_update_payload(next(self._update_ids), telegram_id, text))
+    
+    async def click(self, telegram_id, prefix):
+        """Нажатие случайной кнопки с callback_data, начинающимся с prefix"""
+        buttons = [data for data in self.api.buttons[telegram_id] if data.startswith(prefix)]
+        if not buttons:
+            return False
+        await self.send(make_callback_payload(next(self._update_ids), telegram_id, self.random.choice(buttons)))
+        return True
+    
+    async def browse(self, telegram_id):
+        self.api.buttons[telegram_id].clear()
+        await self.message(telegram_id, "/events")
+        await self.click(telegram_id, '1p:')
+    
+    async def register(self, telegram_id):
+        self.api.buttons[telegram_id].clear()
+        await self.message(telegram_id, "/events")
+        await self.click(telegram_id, '1r:')
+    
+    async def cancel(self, telegram_id):
+        self.api.buttons[telegram_id].clear()
+        await self.message(telegram_id, "/my_events")
+        await self.click(telegram_id, '1c:')
+    
+    async def start(self, telegram_id):
+        # Регистрацию проходит новый пользователь, а не выбранный из существующих
+        telegram_id = next(self._new_user_ids)
+        await self.message(telegram_id, "/start")
+        await self.message(telegram_id, f"Load User {telegram_id}")
+        await self.message(telegram_id, "Load Inc")
+        await self.message(telegram_id, "Engineer")
+        if await self.click(telegram_id, '1a:'):
+            await self.message(telegram_id, f"user{telegram_id}@example.com")
+    
+    async def run(self, total_updates, concurrency):
+        async def virtual_user():
+            while self.updates < total_updates:
+                scenario = self.random.choices(self.scenarios, self.weights)[0]
+                self.scenario_counts[scenario] += 1
+                await getattr(self, scenario)(self.random.choice(self.telegram_ids))
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, weight = part.split('=')
+        if name not in ('browse', 'register', 'cancel', 'start'):
+            raise argparse.ArgumentTypeError(f"Неизвестный сценарий: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+async def main_async(args):
+    telegram_ids = seed_users_and_events(users=args.users, events=args.events, max_participants=args.capacity)
+    
+    api = FakeBotApi(
+        latency=args.api_latency_ms / 1000,
+        jitter=args.api_jitter_ms / 1000,
+        retry_after_every=args.retry_after_every,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    Config.BOT_API_BASE_URL = await api.start()
+    if args.send_rate:
+        # Лимиты Telegram ограничили бы пропускную способность, а не обработчики
+        Config.SEND_GLOBAL_RATE = args.send_rate
+        Config.SEND_PER_CHAT_RATE = args.send_rate
+    
+    bot = TelegramBot()
+    await bot.app.initialize()
+    await bot.app.post_init(bot.app)
+    try:
+        generator = LoadGenerator(bot, api, telegram_ids, args.mix, seed=args.seed)
+        elapsed = await generator.run(args.updates, args.concurrency)
+    finally:
+        await bot.app.post_shutdown(bot.app)
+        await bot.app.shutdown()
+        await api.stop()
+        await async_engine.dispose()
+    
+    all_latencies = [value for values in generator.latencies.values() for value in values]
+    overall = {
+        'updates': generator.updates,
+        'concurrency': args.concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'updates_per_s': round(generator.updates / elapsed, 1),
+        'scenarios': dict(generator.scenario_counts),
+        'errors': int(UPDATE_ERRORS.total()),
+        'api': api.stats(),
+        'sender_retry_after': bot.rate_limiter.metrics()['retry_after_total']
+    }
+    overall.update(summarize(all_latencies))
+    
+    per_update = []
+    for label, values in sorted(generator.latencies.items()):
+        result = {'update': label}
+        result.update(summarize(values))
+        per_update.append(result)
+    return overall, per_update
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--capacity', type=int, default=200)
+    parser.add_argument('--updates', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('browse=50,register=25,cancel=10,start=15'))
+    parser.add_argument('--api-latency-ms', type=float, default=0.0)
+    parser.add_argument('--api-jitter-ms', type=float, default=0.0)
+    parser.add_argument('--retry-after-every', type=int, default=0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--send-rate', type=float, default=10000,
+                        help="Лимит отправки в секунду (глобальный и на чат); 0 - лимиты из Config")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--max-p99-ms', type=float, default=None)
+    args = parser.parse_args()
+    
+    overall, per_update = asyncio.run(main_async(args))
+    print(json.dumps(overall, ensure_ascii=False))
+    for result in per_update:
+        print(json.dumps(result, ensure_ascii=False))
+    
+    if args.max_p99_ms is not None and overall['p99_ms'] > args.max_p99_ms:
+        print(f"p99 {overall['p99_ms']} ms превышает порог {args.max_p99_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Формат callback_data inline-кнопок и маршрутизация нажатий
+
+Кнопка кодируется как "<версия формата><код типа>[:<аргумент>...]", например
+"1r:42" - запись на мероприятие 42. Типы кнопок регистрируются один раз в
+CallbackCodec: код, типы аргументов и префикс старого формата ("register_42"),
+по которому разбираются кнопки в уже отправленных сообщениях.
+
+CallbackRouter декодирует данные один раз и находит обработчик по словарю,
+поэтому стоимость разбора не растет с числом типов кнопок.
+"""
+
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ограничение Telegram на размер callback_data в байтах
+CALLBACK_DATA_LIMIT = 64
+# Текущая версия формата - первый символ callback_data
+CODEC_VERSION = "1"
+ARG_SEPARATOR = ":"
+
+class CallbackDataError(ValueError):
+    """Некорректные или неизвестные данные кнопки"""
+
+class CallbackType:
+    """Тип кнопки: имя, короткий код и типы аргументов (int или str)"""
+    __slots__ = ('name', 'code', 'arg_types', 'legacy_prefix')
+    
+    def __init__(self, name: str, code: str, arg_types: tuple, legacy_prefix: Optional[str] = None):
+        self.name = name
+        self.code = code
+        self.arg_types = arg_types
+        self.legacy_prefix = legacy_prefix
+    
+    def __repr__(self):
+        return f"<CallbackType {self.name} ({self.code})>"
+
+class CallbackCodec:
+    """Реестр типов кнопок с кодированием и проверкой callback_data"""
+    
+    def __init__(self):
+        self._by_name: dict[str, CallbackType] = {}
+        self._by_code: dict[str, CallbackType] = {}
+        # Префиксы старого формата, длинные первыми ("events_page_" раньше "events_")
+        self._legacy: list[CallbackType] = []
+    
+    def register(self, name: str, code: str, *arg_types, legacy_prefix: Optional[str] = None) -> CallbackType:
+        """Регистрация типа кнопки"""
+        if name in self._by_name or code in self._by_code:
+            raise ValueError(f"Тип кнопки {name} ({code}) уже зарегистрирован")
+        if ARG_SEPARATOR in code or not code:
+            raise ValueError(f"Недопустимый код типа кнопки: {code!r}")
+        for arg_type in arg_types:
+            if arg_type not in (int, str):
+                raise ValueError(f"Неподдерживаемый тип аргумента кнопки {name}: {arg_type}")
+        
+        callback_type = CallbackType(name, code, tuple(arg_types), legacy_prefix)
+        self._by_name[name] = callback_type
+        self._by_code[code] = callback_type
+        if legacy_prefix:
+            self._legacy.append(callback_type)
+            self._legacy.sort(key=lambda item: len(item.legacy_prefix), reverse=True)
+        return callback_type
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+    
+    def encode(self, name: str, *args) -> str:
+        """callback_data для кнопки; проверяет аргументы и размер"""
+        callback_type = self._by_name.get(name)
+        if callback_type is None:
+            raise CallbackDataError(f"Неизвестный тип кнопки: {name}")
+        if len(args) != len(callback_type.arg_types):
+            raise CallbackDataError(f"Кнопка {name} ожидает {len(callback_type.arg_types)} аргумент(ов), получено {len(args)}")
+        
+        parts = [CODEC_VERSION + callback_type.code]
+        for value, arg_type in zip(args, callback_type.arg_types):
+            if arg_type is int:
+                if not isinstance(value, int) or isinstance(value, bool):
+                    raise CallbackDataError(f"Аргумент кнопки {name} должен быть целым числом: {value!r}")
+            elif not isinstance(value, str) or ARG_SEPARATOR in value:
+                raise CallbackDataError(f"Недопустимый строковый аргумент кнопки {name}: {value!r}")
+            parts.append(str(value))
+        
+        data = ARG_SEPARATOR.join(parts)
+        if len(data.encode('utf-8')) > CALLBACK_DATA_LIMIT:
+            raise CallbackDataError(f"callback_data длиннее {CALLBACK_DATA_LIMIT} байт: {data!r}")
+        return data
+    
+    def decode(self, data: str) -> tuple[CallbackType, tuple]:
+        """Тип кнопки и аргументы, приведенные к типам"""
+        if not data:
+            raise CallbackDataError("Пустые данные кнопки")
+        
+        if data[0] == CODEC_VERSION:
+            code, *raw_args = data[1:].split(ARG_SEPARATOR)
+            callback_type = self._by_code.get(code)
+            if callback_type is None:
+                raise CallbackDataError(f"Неизвестный код кнопки: {data!r}")
+        elif data[0].isdigit():
+            raise CallbackDataError(f"Неподдерживаемая версия формата кнопки: {data!r}")
+        else:
+            callback_type, raw_args = self._decode_legacy(data)
+        
+        if len(raw_args) != len(callback_type.arg_types):
+            raise CallbackDataError(f"Неверное число аргументов кнопки: {data!r}")
+        
+        args = []
+        for raw, arg_type in zip(raw_args, callback_type.arg_types):
+            if arg_type is int:
+                digits = raw[1:] if raw.startswith('-') else raw
+                if not (digits.isascii() and digits.isdigit()):
+                    raise CallbackDataError(f"Ожидалось целое число в данных кнопки: {data!r}")
+                args.append(int(raw))
+            else:
+                args.append(raw)
+        return callback_type, tuple(args)
+    
+    def _decode_legacy(self, data: str) -> tuple[CallbackType, list]:
+        """Разбор старого формата "<префикс><аргумент>" из ранее отправленных сообщений"""
+        for callback_type in self._legacy:
+            if data.startswith(callback_type.legacy_prefix):
+                rest = data[len(callback_type.legacy_prefix):]
+                return callback_type, [rest] if rest or callback_type.arg_types else []
+        raise CallbackDataError(f"Неизвестные данные кнопки: {data!r}")
+
+# Обработчик: handler(query, context, *args)
+CallbackHandler = Callable[..., Awaitable[None]]
+
+class CallbackRouter:
+    """Вызов обработчика по типу кнопки"""
+    
+    def __init__(self, codec: CallbackCodec):
+        self.codec = codec
+        self._routes: dict[str, tuple[CallbackHandler, bool]] = {}
+    
+    def add(self, name: str, handler: CallbackHandler, answer: bool = True):
+        """
+        Привязка обработчика к типу кнопки
+        
+        answer=False - обработчик сам отвечает на callback query (например, всплывающим уведомлением)
+        """
+        if name not in self.codec:
+            raise ValueError(f"Тип кнопки {name} не зарегистрирован")
+        self._routes[name] = (handler, answer)
+    
+    async def dispatch(self, query, context) -> bool:
+        """
+        Обработка нажатия
+        
+        Returns:
+            bool: False, если данные кнопки не распознаны
+        """
+        try:
+            callback_type, args = self.codec.decode(query.data)
+            handler, answer = self._routes[callback_type.name]
+        except (CallbackDataError, KeyError) as e:
+            logger.warning(f"Необработанное нажатие кнопки {query.data!r}: {e}")
+            await query.answer()
+            return False
+        
+        if answer:
+            await query.answer()
+        await handler(query, context, *args)
+        return True
+
+# Типы кнопок бота. Коды не переиспользуются: кнопки остаются в истории чатов
+callbacks = CallbackCodec()
+callbacks.register('register', 'r', int, legacy_prefix='register_')
+callbacks.register('cancel', 'c', int, legacy_prefix='cancel_')
+callbacks.register('full', 'f', int, legacy_prefix='full_')
+callbacks.register('events_page', 'p', int, legacy_prefix='events_page_')
+callbacks.register('events_noop', 'n', legacy_prefix='events_noop')
+callbacks.register('ai_exp', 'a', str, legacy_prefix='ai_exp_')
+callbacks.register('timezone', 't', str, legacy_prefix='timezone_')
+callbacks.register('edit', 'e', str, legacy_prefix='edit_')
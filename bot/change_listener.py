@@ -0,0 +1,215 @@
+"""
+Подписка бота на изменения из других процессов (см. database/changes.py)
+
+ChangeListener читает новые записи change_log после последней прочитанной и
+вызывает подписчиков темы одним списком изменений. В PostgreSQL чтение
+запускается уведомлением LISTEN, а опрос раз в LISTEN_FALLBACK_POLL_SECONDS
+страхует от потери соединения. В SQLite журнал опрашивается каждые
+CHANGE_POLL_SECONDS.
+
+Параллельные транзакции фиксируют записи не в порядке id: запись с меньшим id
+может стать видимой после записи с большим. Поэтому каждый опрос перечитывает
+еще и окно последних CHANGE_REPLAY_SECONDS по created_at, а уже доставленные id
+пропускает. Окно должно превышать самую долгую пишущую транзакцию веб-интерфейса.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import delete, func, or_, select
+from config import Config
+from database.models import ChangeRecord, AsyncSessionLocal, async_engine
+from database.changes import CHANGE_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+# Подписчик: handler(changes) - строки журнала одной темы по возрастанию id
+ChangeHandler = Callable[[list], Awaitable[None]]
+
+class ChangeListener:
+    """Доставка изменений из change_log подписчикам бота"""
+    
+    # Опрос журнала при активном LISTEN - на случай пропущенного уведомления
+    LISTEN_FALLBACK_POLL_SECONDS = 60
+    # Старые записи журнала удаляются не чаще, чем раз в этот интервал (секунды)
+    PRUNE_INTERVAL = 3600
+    
+    def __init__(self, poll_interval: float, retention: timedelta, replay_window: timedelta):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        # Окно повторного чтения: записи, которые могли зафиксироваться позже более новых
+        self.replay_window = replay_window
+        self.delivered = 0
+        self._subscribers: dict[str, list[ChangeHandler]] = defaultdict(list)
+        self._last_id = 0
+        # Наибольший created_at среди прочитанных и id прочитанных записей внутри окна
+        self._watermark: Optional[datetime] = None
+        self._seen: dict[int, datetime] = {}
+        self._last_prune = 0.0
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._listen_connection = None
+    
+    @property
+    def listening(self) -> bool:
+        return self._listen_connection is not None
+    
+    def subscribe(self, topic: str, handler: ChangeHandler):
+        """Подписка на тему изменений"""
+        self._subscribers[topic].append(handler)
+    
+    async def start(self):
+        """Запуск на event loop бота: изменения до запуска не доставляются"""
+        async with AsyncSessionLocal() as db:
+            self._last_id = await db.scalar(select(func.coalesce(func.max(ChangeRecord.id), 0)))
+            self._watermark = await db.scalar(select(func.max(ChangeRecord.created_at)))
+            if self._watermark is not None:
+                # Записи окна уже учтены в данных, загруженных при запуске
+                result = await db.execute(
+                    select(ChangeRecord.id, ChangeRecord.created_at)
+                    .where(ChangeRecord.created_at >= self._watermark - self.replay_window)
+                )
+                self._seen = dict(result.all())
+        
+        if async_engine.dialect.name == 'postgresql':
+            await self._listen()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Подписка на изменения запущена ({'LISTEN' if self.listening else 'опрос журнала'})")
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self._close_listen_connection()
+    
+    async def _listen(self):
+        """Отдельное соединение с LISTEN на канал изменений"""
+        connection = None
+        try:
+            connection = await async_engine.connect()
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            await driver_connection.add_listener(CHANGE_CHANNEL, self._on_notify)
+            driver_connection.add_termination_listener(self._on_listen_terminated)
+        except Exception as e:
+            logger.warning(f"LISTEN недоступен, изменения читаются опросом журнала: {e}")
+            if connection is not None:
+                with suppress(Exception):
+                    await connection.close()
+            return
+        self._listen_connection = connection
+    
+    def _on_notify(self, connection, pid, channel, payload):
+        self._wakeup.set()
+    
+    def _on_listen_terminated(self, connection):
+        logger.warning("Соединение LISTEN закрыто, переход на опрос журнала")
+        self._listen_connection = None
+        self._wakeup.set()
+    
+    async def _close_listen_connection(self):
+        connection, self._listen_connection = self._listen_connection, None
+        if connection is not None:
+            with suppress(Exception):
+                await connection.close()
+    
+    async def _run(self):
+        while True:
+            if not self.listening and async_engine.dialect.name == 'postgresql':
+                await self._listen()
+            
+            interval = self.LISTEN_FALLBACK_POLL_SECONDS if self.listening else self.poll_interval
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            self._wakeup.clear()
+            
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Ошибка чтения журнала изменений: {e}")
+    
+    async def poll(self) -> int:
+        """
+        Чтение новых записей журнала и вызов подписчиков
+        
+        Returns:
+            int: Количество прочитанных записей
+        """
+        condition = ChangeRecord.id > self._last_id
+        if self._watermark is not None:
+            condition = or_(condition, ChangeRecord.created_at >= self._watermark - self.replay_window)
+        
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(
+                    ChangeRecord.id, ChangeRecord.topic, ChangeRecord.entity_id,
+                    ChangeRecord.action, ChangeRecord.created_at
+                )
+                .where(condition)
+                .order_by(ChangeRecord.id.asc())
+            )
+            changes = [change for change in result.all() if change.id not in self._seen]
+            await self._prune(db)
+        
+        if not changes:
+            return 0
+        self._remember(changes)
+        
+        by_topic = defaultdict(list)
+        for change in changes:
+            by_topic[change.topic].append(change)
+        
+        for topic, topic_changes in by_topic.items():
+            for handler in self._subscribers.get(topic, ()):
+                try:
+                    await handler(topic_changes)
+                except Exception as e:
+                    logger.error(f"Ошибка обработки изменений {topic}: {e}")
+        
+        self.delivered += len(changes)
+        return len(changes)
+    
+    def _remember(self, changes: list):
+        """Отметка доставленных записей и сдвиг окна"""
+        self._last_id = max(self._last_id, changes[-1].id)
+        newest = max(change.created_at for change in changes)
+        if self._watermark is None or newest > self._watermark:
+            self._watermark = newest
+        
+        for change in changes:
+            self._seen[change.id] = change.created_at
+        # Записи старше окна больше не перечитываются - их id можно забыть
+        horizon = self._watermark - self.replay_window
+        self._seen = {change_id: created_at for change_id, created_at in self._seen.items() if created_at >= horizon}
+    
+    async def _prune(self, db):
+        """Удаление записей старше retention"""
+        now = time.monotonic()
+        if now - self._last_prune < self.PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        
+        await db.execute(delete(ChangeRecord).where(ChangeRecord.created_at < datetime.utcnow() - self.retention))
+        await db.commit()
+    
+    def stats(self) -> dict:
+        return {
+            'last_id': self._last_id,
+            'replay_window_ids': len(self._seen),
+            'delivered': self.delivered,
+            'listening': self.listening
+        }
+
+def create_change_listener() -> ChangeListener:
+    """Подписка с интервалами из Config"""
+    return ChangeListener(
+        poll_interval=Config.CHANGE_POLL_SECONDS,
+        retention=timedelta(hours=Config.CHANGE_LOG_RETENTION_HOURS),
+        replay_window=timedelta(seconds=Config.CHANGE_REPLAY_SECONDS)
+    )
@@ -0,0 +1,74 @@
+"""
+Кэш отрисованных карточек мероприятий
+
+Ключ карточки - (ID мероприятия, версия, часовой пояс, зарегистрирован ли пользователь).
+При редактировании в веб-интерфейсе версия мероприятия увеличивается, поэтому
+устаревшие карточки больше не запрашиваются и вытесняются по LRU. Кроме того,
+бот сбрасывает карточки по уведомлениям об изменениях из веб-интерфейса
+(bot/change_listener.py) - так освобождается место и после удаления мероприятия.
+
+Кэш используется только на event loop бота (обработчики и подписка на изменения),
+поэтому обходится без блокировок.
+"""
+
+from collections import OrderedDict
+from config import Config
+
+class EventCard:
+    """Неизменяемая часть карточки: текст и кнопки-ссылки"""
+    __slots__ = ('text', 'buttons')
+    
+    def __init__(self, text: str, buttons: tuple = ()):
+        self.text = text
+        self.buttons = buttons
+
+class EventCardCache:
+    """LRU-кэш карточек; max_size=0 отключает кэширование"""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cards: "OrderedDict[tuple, EventCard]" = OrderedDict()
+    
+    def __len__(self):
+        return len(self._cards)
+    
+    def get_or_render(self, event, user_timezone: str, registered: bool, render) -> EventCard:
+        """Карточка из кэша или результат render(event, user_timezone, registered)"""
+        key = (event.id, event.version, user_timezone, registered)
+        card = self._cards.get(key)
+        if card is not None:
+            self._cards.move_to_end(key)
+            self.hits += 1
+            return card
+        self.misses += 1
+        
+        card = render(event, user_timezone, registered)
+        if self.max_size > 0:
+            self._cards[key] = card
+            while len(self._cards) > self.max_size:
+                self._cards.popitem(last=False)
+        return card
+    
+    def invalidate(self, event_id: int):
+        """Удаление всех карточек мероприятия"""
+        for key in [key for key in self._cards if key[0] == event_id]:
+            del self._cards[key]
+    
+    def clear(self):
+        self._cards.clear()
+    
+    def stats(self) -> dict:
+        return {
+            'size': len(self._cards),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+# Общий кэш процесса
+event_card_cache = EventCardCache(Config.EVENT_CARD_CACHE_SIZE)
+
+def invalidate_event_card(event_id: int):
+    """Сброс карточек мероприятия после его изменения или удаления"""
+    event_card_cache.invalidate(event_id)
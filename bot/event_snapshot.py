@@ -0,0 +1,136 @@
+"""
+Снимок ближайших мероприятий в памяти процесса бота
+
+Каталог мероприятий меняется несколько раз в день, а /events вызывается
+постоянно. UpcomingEvents держит неизменяемый снимок будущих мероприятий
+(EventView) вместе с числом занятых мест и отдает его без запросов к БД.
+Снимок перечитывается по интервалу (EVENTS_SNAPSHOT_REFRESH_SECONDS) или по
+явному refresh(); прошедшие мероприятия отсекаются при каждом чтении.
+Записи, сделанные через бота, обновляют счетчик мест в снимке сразу.
+"""
+
+import asyncio
+import logging
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select
+from config import Config
+from database.models import Event, AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+class EventView:
+    """Неизменяемая копия мероприятия, не связанная с сессией"""
+    __slots__ = (
+        'id', 'version', 'title', 'description', 'event_datetime', 'webinar_link',
+        'image_url', 'max_participants', 'registered_count'
+    )
+    
+    def __init__(self, event, registered_count: Optional[int] = None):
+        self.id = event.id
+        self.version = event.version
+        self.title = event.title
+        self.description = event.description
+        self.event_datetime = event.event_datetime
+        self.webinar_link = event.webinar_link
+        self.image_url = event.image_url
+        self.max_participants = event.max_participants
+        self.registered_count = event.registered_count if registered_count is None else registered_count
+    
+    @property
+    def available_spots(self):
+        """Количество доступных мест"""
+        return self.max_participants - (self.registered_count or 0)
+    
+    @property
+    def is_full(self):
+        """Проверка заполненности мероприятия"""
+        return (self.registered_count or 0) >= self.max_participants
+    
+    def __repr__(self):
+        return f"<EventView {self.id} - {self.title}>"
+
+class EventsSnapshot:
+    """Мероприятия по возрастанию даты на момент загрузки"""
+    __slots__ = ('events', 'starts', 'loaded_at')
+    
+    def __init__(self, events: tuple, loaded_at: float):
+        self.events = events
+        self.starts = tuple(event.event_datetime for event in events)
+        self.loaded_at = loaded_at
+    
+    def upcoming(self, now: datetime) -> tuple:
+        """Мероприятия, которые еще не начались"""
+        return self.events[bisect_right(self.starts, now):]
+
+class UpcomingEvents:
+    """Снимок будущих мероприятий с периодическим обновлением"""
+    
+    def __init__(self, max_age: float):
+        # Снимок старше max_age секунд перечитывается при следующем обращении
+        self.max_age = max_age
+        self.refreshes = 0
+        self._snapshot: Optional[EventsSnapshot] = None
+        self._lock = asyncio.Lock()
+    
+    async def get(self) -> tuple:
+        """Будущие мероприятия по возрастанию даты"""
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - snapshot.loaded_at > self.max_age:
+            snapshot = await self.refresh(min_loaded_at=snapshot.loaded_at if snapshot else None)
+        return snapshot.upcoming(datetime.utcnow())
+    
+    async def refresh(self, min_loaded_at: Optional[float] = None) -> EventsSnapshot:
+        """
+        Перечитать снимок из БД
+        
+        min_loaded_at - снимок, который вызывающий считает устаревшим: если за время
+        ожидания блокировки его уже заменили, повторного запроса не будет
+        """
+        async with self._lock:
+            current = self._snapshot
+            if min_loaded_at is not None and current is not None and current.loaded_at > min_loaded_at:
+                return current
+            
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(Event)
+                    .where(Event.event_datetime > datetime.utcnow())
+                    .order_by(Event.event_datetime.asc())
+                )
+                events = tuple(EventView(event) for event in result.scalars())
+            
+            self._snapshot = EventsSnapshot(events, time.monotonic())
+            self.refreshes += 1
+            logger.debug(f"Снимок мероприятий обновлен: {len(events)} шт.")
+            return self._snapshot
+    
+    def update_registered_count(self, event_id: int, registered_count: int):
+        """Новое число занятых мест после записи или отмены через бота"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return
+        
+        events = tuple(
+            EventView(event, registered_count) if event.id == event_id else event
+            for event in snapshot.events
+        )
+        # Время загрузки сохраняется: остальные данные снимка не стали свежее
+        self._snapshot = EventsSnapshot(events, snapshot.loaded_at)
+    
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            'events': len(snapshot.events) if snapshot else 0,
+            'age_s': round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+            'refreshes': self.refreshes
+        }
+
+def create_upcoming_events() -> UpcomingEvents:
+    """
+    Снимок для бота: max_age с запасом больше интервала фонового обновления,
+    чтобы в штатном режиме /events не ждал запроса к БД
+    """
+    return UpcomingEvents(max_age=Config.EVENTS_SNAPSHOT_REFRESH_SECONDS * 2)
@@ -0,0 +1,140 @@
+"""
+Метрики бота: латентность обработки обновлений и вызовов Bot API
+
+Обновление измеряется целиком в update_unit_of_work (bot/middleware.py): время,
+число запросов к БД и время в БД, необработанные ошибки. Метка update - тип
+обновления: "command:<имя>" для зарегистрированных команд, "callback:<тип>"
+для кнопок из bot/callbacks.py, "message" для текста. Неизвестные команды и
+кнопки сводятся к "command:unknown" / "callback:unknown", чтобы пользователи не
+могли раздуть число рядов метрик.
+
+Вызовы Bot API измеряет PriorityRateLimiter (bot/sender.py) - без ожидания в
+очереди ограничителя. Маршрут /metrics отдается приёмником webhook, а в режиме
+polling - отдельным HTTP-сервером на METRICS_PORT.
+"""
+
+import hmac
+import logging
+import time
+from contextlib import contextmanager
+from aiohttp import BasicAuth, web
+from config import Config
+from monitoring.metrics import CONTENT_TYPE, QUERY_COUNT_BUCKETS, registry, measure_queries
+from bot.callbacks import callbacks, CallbackDataError
+
+logger = logging.getLogger(__name__)
+
+UPDATE_DURATION = registry.histogram(
+    'bot_update_duration_seconds', 'Время обработки обновления Telegram', ('update',)
+)
+UPDATE_ERRORS = registry.counter(
+    'bot_update_errors_total', 'Обновления, завершившиеся необработанным исключением', ('update',)
+)
+UPDATE_DB_QUERIES = registry.histogram(
+    'bot_update_db_queries', 'Запросов к БД на одно обновление', ('update',), buckets=QUERY_COUNT_BUCKETS
+)
+UPDATE_DB_TIME = registry.histogram(
+    'bot_update_db_seconds', 'Время запросов к БД на одно обновление', ('update',)
+)
+API_DURATION = registry.histogram(
+    'bot_api_request_duration_seconds', 'Длительность вызова Bot API без ожидания в очереди', ('method',)
+)
+API_ERRORS = registry.counter(
+    'bot_api_errors_total', 'Ошибки вызовов Bot API', ('method', 'error')
+)
+
+# Команды, зарегистрированные в Application (метки update для остальных - unknown)
+_known_commands: set = set()
+
+def track_commands(commands):
+    """Имена команд для меток update"""
+    _known_commands.update(commands)
+
+def update_label(update) -> str:
+    """Тип обновления для метки update"""
+    query = getattr(update, 'callback_query', None)
+    if query is not None:
+        try:
+            callback_type, _ = callbacks.decode(query.data or '')
+        except CallbackDataError:
+            return 'callback:unknown'
+        return f"callback:{callback_type.name}"
+    
+    message = getattr(update, 'message', None)
+    text = getattr(message, 'text', None) if message is not None else None
+    if text is None:
+        return 'other'
+    if text.startswith('/'):
+        command = text[1:].split(maxsplit=1)[0].split('@', 1)[0].lower() if len(text) > 1 else ''
+        return f"command:{command if command in _known_commands else 'unknown'}"
+    return 'message'
+
+class UpdateMeasurement:
+    """Результат обработки обновления, который выставляет вызывающий"""
+    __slots__ = ('failed',)
+    
+    def __init__(self):
+        self.failed = False
+
+@contextmanager
+def measure_update(update):
+    """
+    Измерение обработки обновления; вызывающий выставляет measurement.failed,
+    если обработчик завершился ошибкой, перехваченной Application
+    """
+    measurement = UpdateMeasurement()
+    started = time.perf_counter()
+    with measure_queries() as stats:
+        try:
+            yield measurement
+        except BaseException:
+            measurement.failed = True
+            raise
+        finally:
+            label = update_label(update)
+            UPDATE_DURATION.observe(time.perf_counter() - started, label)
+            UPDATE_DB_QUERIES.observe(stats.queries, label)
+            UPDATE_DB_TIME.observe(stats.db_time, label)
+            if measurement.failed:
+                UPDATE_ERRORS.inc(label)
+
+def observe_api_call(method: str, duration: float, error: BaseException = None):
+    """Вызов Bot API: длительность и ошибка (класс исключения)"""
+    API_DURATION.observe(duration, method)
+    if error is not None:
+        API_ERRORS.inc(method, type(error).__name__)
+
+def _is_authorized(request) -> bool:
+    """Basic-авторизация /metrics теми же учетными данными, что и API веб-интерфейса"""
+    header = request.headers.get('Authorization')
+    if not header:
+        return False
+    try:
+        auth = BasicAuth.decode(header)
+    except ValueError:
+        return False
+    return (
+        hmac.compare_digest(auth.login.encode(), Config.API_USERNAME.encode())
+        and hmac.compare_digest(auth.password.encode(), Config.API_PASSWORD.encode())
+    )
+
+async def handle_metrics(request):
+    """GET /metrics в формате Prometheus"""
+    if not _is_authorized(request):
+        return web.Response(status=401, headers={'WWW-Authenticate': 'Basic realm="metrics"'})
+    return web.Response(body=registry.render().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+async def start_metrics_server(port: int):
+    """
+    HTTP-сервер с /metrics для режима polling
+    
+    Returns:
+        web.AppRunner: остановка - await runner.cleanup()
+    """
+    web_app = web.Application()
+    web_app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(web_app)
+    await runner.setup()
+    await web.TCPSite(runner, Config.WEB_HOST, port).start()
+    logger.info(f"Метрики бота доступны на {Config.WEB_HOST}:{port}/metrics")
+    return runner
@@ -0,0 +1,153 @@
+"""
+Одна сессия БД на обновление Telegram (unit of work)
+
+UnitOfWorkApplication перед обработкой обновления открывает AsyncSession и
+один раз определяет текущего пользователя - из кэша профилей, а при промахе
+запросом к БД. Обработчики получают context.db, context.user_profile
+(UserProfile, только для чтения) и await context.get_db_user() - ORM-объект
+для изменений. После обработки изменения фиксируются, а если обработчик
+завершился исключением - откатываются.
+
+Сессия хранится в contextvar задачи обновления, поэтому обработчики должны
+выполняться в ней же (block=True - по умолчанию в python-telegram-bot).
+"""
+
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from telegram import Update
+from telegram.ext import Application, CallbackContext
+from database.models import User, AsyncSessionLocal
+from bot.user_cache import UserProfile, user_profile_cache
+from bot.instrumentation import measure_update
+
+logger = logging.getLogger(__name__)
+
+class UpdateUnitOfWork:
+    """Сессия и пользователь текущего обновления"""
+    __slots__ = ('db', 'profile', 'user', 'failed')
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.profile: Optional[UserProfile] = None
+        # ORM-объект пользователя: загружен при промахе кэша или по запросу обработчика
+        self.user: Optional[User] = None
+        # Обработчик завершился ошибкой - изменения откатываются
+        self.failed = False
+    
+    async def resolve(self, telegram_id: int):
+        """Профиль пользователя из кэша или из БД"""
+        self.profile = user_profile_cache.get(telegram_id)
+        if self.profile is not None:
+            return
+        
+        self.user = await self.db.scalar(select(User).where(User.telegram_id == telegram_id))
+        if self.user is not None:
+            self.profile = UserProfile(self.user)
+            user_profile_cache.put(self.profile)
+    
+    async def get_user(self) -> Optional[User]:
+        if self.user is None and self.profile is not None:
+            self.user = await self.db.get(User, self.profile.id)
+        return self.user
+    
+    def user_changed(self, user: User):
+        """Пользователь изменен и зафиксирован: сброс записи в кэше"""
+        user_profile_cache.invalidate(user.telegram_id)
+        self.user = user
+        self.profile = UserProfile(user)
+
+_current_unit: ContextVar[Optional[UpdateUnitOfWork]] = ContextVar('update_unit_of_work', default=None)
+
+def current_unit_of_work() -> Optional[UpdateUnitOfWork]:
+    """Unit of work обрабатываемого обновления (None вне обработки)"""
+    return _current_unit.get()
+
+@asynccontextmanager
+async def update_unit_of_work(update):
+    """Сессия на время обработки обновления: commit при успехе, rollback при ошибке"""
+    # Время, запросы к БД и ошибки обновления попадают в метрики (bot/instrumentation.py)
+    with measure_update(update) as measurement:
+        db = AsyncSessionLocal()
+        unit = UpdateUnitOfWork(db)
+        token = _current_unit.set(unit)
+        
+        try:
+            telegram_user = getattr(update, 'effective_user', None)
+            if telegram_user is not None:
+                await unit.resolve(telegram_user.id)
+            
+            yield unit
+            
+            if unit.failed:
+                measurement.failed = True
+                await db.rollback()
+            else:
+                try:
+                    await db.commit()
+                except SQLAlchemyError as e:
+                    logger.error(f"Ошибка фиксации изменений обновления: {e}")
+                    measurement.failed = True
+                    await db.rollback()
+        except BaseException:
+            await db.rollback()
+            raise
+        finally:
+            _current_unit.reset(token)
+            await db.close()
+
+class UnitOfWorkContextMixin:
+    """Доступ к сессии и пользователю текущего обновления из контекста обработчика"""
+    __slots__ = ()
+    
+    @staticmethod
+    def _unit() -> UpdateUnitOfWork:
+        unit = _current_unit.get()
+        if unit is None:
+            raise RuntimeError("Сессия БД доступна только во время обработки обновления")
+        return unit
+    
+    @property
+    def db(self) -> AsyncSession:
+        return self._unit().db
+    
+    @property
+    def user_profile(self) -> Optional[UserProfile]:
+        """Профиль пользователя бота или None, если он еще не зарегистрирован"""
+        return self._unit().profile
+    
+    async def get_db_user(self) -> Optional[User]:
+        """ORM-объект пользователя в сессии обновления - для изменений"""
+        return await self._unit().get_user()
+    
+    def user_changed(self, user: User):
+        """Вызывается после commit изменений пользователя"""
+        self._unit().user_changed(user)
+
+class BotContext(UnitOfWorkContextMixin, CallbackContext):
+    """CallbackContext с доступом к сессии и пользователю текущего обновления"""
+
+class UnitOfWorkApplication(Application):
+    """Application, оборачивающий обработку каждого обновления в update_unit_of_work"""
+    
+    async def process_update(self, update: object) -> None:
+        if not isinstance(update, Update):
+            await super().process_update(update)
+            return
+        
+        async with update_unit_of_work(update):
+            await super().process_update(update)
+
+async def rollback_on_error(update: object, context: CallbackContext) -> None:
+    """
+    Обработчик ошибок Application: python-telegram-bot перехватывает исключения
+    обработчиков, поэтому откат помечается здесь
+    """
+    unit = _current_unit.get()
+    if unit is not None:
+        unit.failed = True
+    logger.error("Ошибка при обработке обновления", exc_info=context.error)
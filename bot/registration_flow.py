@@ -1,6 +1,8 @@
 from enum import Enum
 from typing import Dict, Any
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from bot.state_store import FlowState, StateStore, create_state_store
+from bot.callbacks import callbacks
 
 class RegistrationStep(Enum):
     """Шаги процесса регистрации"""
@@ -24,15 +26,12 @@ class AIExperienceOption(Enum):
 class RegistrationFlow:
     """Управление процессом регистрации пользователей"""
     
-    def __init__(self):
-        self.user_states: Dict[int, Dict[str, Any]] = {}
+    def __init__(self, user_states: StateStore = None):
+        self.user_states = user_states or create_state_store('registration')
     
-    def start_registration(self, user_id: int) -> tuple[str, InlineKeyboardMarkup]:
+    async def start_registration(self, user_id: int) -> tuple[str, InlineKeyboardMarkup]:
         """Начало процесса регистрации"""
-        self.user_states[user_id] = {
-            'step': RegistrationStep.FULL_NAME,
-            'data': {}
-        }
+        await self.user_states.set(user_id, FlowState(RegistrationStep.FULL_NAME.value))
         
         message = "👋 Добро пожаловать в AI Community!\n\n"
         message += "Для завершения регистрации нам нужно узнать немного о вас.\n\n"
@@ -40,51 +39,54 @@ class RegistrationFlow:
         
         return message, None
     
-    def process_step(self, user_id: int, text: str) -> tuple[str, InlineKeyboardMarkup]:
+    async def process_step(self, user_id: int, text: str) -> tuple[str, InlineKeyboardMarkup]:
         """Обработка текущего шага регистрации"""
-        if user_id not in self.user_states:
+        state = await self.user_states.get(user_id)
+        if state is None:
             return "Произошла ошибка. Начните регистрацию заново с /start", None
         
-        state = self.user_states[user_id]
-        current_step = state['step']
+        current_step = RegistrationStep(state.step)
         
         if current_step == RegistrationStep.FULL_NAME:
-            return self._process_full_name(user_id, text)
+            result = self._process_full_name(state, text)
         elif current_step == RegistrationStep.COMPANY:
-            return self._process_company(user_id, text)
+            result = self._process_company(state, text)
         elif current_step == RegistrationStep.ROLE:
-            return self._process_role(user_id, text)
+            result = self._process_role(state, text)
         elif current_step == RegistrationStep.AI_EXPERIENCE:
-            return self._process_ai_experience(user_id, text)
+            result = self._process_ai_experience(state, text)
         elif current_step == RegistrationStep.EMAIL:
-            return self._process_email(user_id, text)
+            result = self._process_email(state, text)
+        else:
+            return "Неизвестный шаг регистрации", None
         
-        return "Неизвестный шаг регистрации", None
+        await self.user_states.set(user_id, state)
+        return result
     
-    def _process_full_name(self, user_id: int, text: str) -> tuple[str, InlineKeyboardMarkup]:
+    def _process_full_name(self, state: FlowState, text: str) -> tuple[str, InlineKeyboardMarkup]:
         """Обработка ввода полного имени"""
-        self.user_states[user_id]['data']['full_name'] = text
-        self.user_states[user_id]['step'] = RegistrationStep.COMPANY
+        state.data['full_name'] = text
+        state.step = RegistrationStep.COMPANY.value
         
         message = f"Спасибо, {text}! 👋\n\n"
         message += "В какой компании вы работаете?"
         
         return message, None
     
-    def _process_company(self, user_id: int, text: str) -> tuple[str, InlineKeyboardMarkup]:
+    def _process_company(self, state: FlowState, text: str) -> tuple[str, InlineKeyboardMarkup]:
         """Обработка ввода компании"""
-        self.user_states[user_id]['data']['company'] = text
-        self.user_states[user_id]['step'] = RegistrationStep.ROLE
+        state.data['company'] = text
+        state.step = RegistrationStep.ROLE.value
         
         message = f"Компания: {text} ✅\n\n"
         message += "В какой роли вы там работаете?"
         
         return message, None
     
-    def _process_role(self, user_id: int, text: str) -> tuple[str, InlineKeyboardMarkup]:
+    def _process_role(self, state: FlowState, text: str) -> tuple[str, InlineKeyboardMarkup]:
         """Обработка ввода роли"""
-        self.user_states[user_id]['data']['role'] = text
-        self.user_states[user_id]['step'] = RegistrationStep.AI_EXPERIENCE
+        state.data['role'] = text
+        state.step = RegistrationStep.AI_EXPERIENCE.value
         
         message = f"Роль: {text} ✅\n\n"
         message += "Что ближе вас описывает?\n\n"
@@ -94,27 +96,20 @@ class RegistrationFlow:
         for option in AIExperienceOption:
             keyboard.append([InlineKeyboardButton(
                 option.value,
-                callback_data=f"ai_exp_{option.name}"
+                callback_data=callbacks.encode('ai_exp', option.name)
             )])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
         return message, reply_markup
     
-    def _process_ai_experience(self, user_id: int, text: str) -> tuple[str, InlineKeyboardMarkup]:
+    def _process_ai_experience(self, state: FlowState, text: str) -> tuple[str, InlineKeyboardMarkup]:
         """Обработка выбора опыта с ИИ"""
         # Этот метод будет вызываться через callback
         return "Ошибка обработки", None
     
-    def process_ai_experience_callback(self, user_id: int, callback_data: str) -> tuple[str, InlineKeyboardMarkup]:
-        """Обработка выбора опыта с ИИ через callback"""
+    async def process_ai_experience_callback(self, user_id: int, ai_exp_option: str) -> tuple[str, InlineKeyboardMarkup]:
+        """Обработка выбора опыта с ИИ через callback (ai_exp_option - имя AIExperienceOption)"""
         try:
-            # callback_data имеет формат "ai_exp_OPTION_NAME"
-            if not callback_data.startswith("ai_exp_"):
-                raise ValueError(f"Неверный формат callback_data: {callback_data}")
-            
-            # Убираем префикс "ai_exp_" и получаем полное имя опции
-            ai_exp_option = callback_data[7:]  # Убираем "ai_exp_"
-            
             # Ищем соответствующую опцию
             option = None
             for exp_option in AIExperienceOption:
@@ -125,8 +120,13 @@ class RegistrationFlow:
             if option is None:
                 raise ValueError(f"Неизвестная опция: {ai_exp_option}")
             
-            self.user_states[user_id]['data']['ai_experience'] = option.value
-            self.user_states[user_id]['step'] = RegistrationStep.EMAIL
+            state = await self.user_states.get(user_id)
+            if state is None:
+                raise KeyError(user_id)
+            
+            state.data['ai_experience'] = option.value
+            state.step = RegistrationStep.EMAIL.value
+            await self.user_states.set(user_id, state)
             
             message = f"Опыт с ИИ: {option.value} ✅\n\n"
             
@@ -138,21 +138,21 @@ class RegistrationFlow:
             return message, None
             
         except (KeyError, IndexError, ValueError) as e:
-            print(f"Ошибка обработки callback: {callback_data}, ошибка: {e}")
+            print(f"Ошибка обработки callback: {ai_exp_option}, ошибка: {e}")
             return "Ошибка обработки выбора. Попробуйте еще раз.", None
     
-    def _process_email(self, user_id: int, text: str) -> tuple[str, InlineKeyboardMarkup]:
+    def _process_email(self, state: FlowState, text: str) -> tuple[str, InlineKeyboardMarkup]:
         """Обработка ввода email"""
         # Простая валидация email
         if '@' not in text or '.' not in text:
             return "Пожалуйста, введите корректный email адрес:", None
         
-        self.user_states[user_id]['data']['email'] = text
-        self.user_states[user_id]['step'] = RegistrationStep.COMPLETE
+        state.data['email'] = text
+        state.step = RegistrationStep.COMPLETE.value
         
         message = "🎉 Регистрация завершена!\n\n"
         message += "Ваш профиль:\n"
-        data = self.user_states[user_id]['data']
+        data = state.data
         message += f"👤 Имя: {data['full_name']}\n"
         message += f"🏢 Компания: {data['company']}\n"
         message += f"💼 Роль: {data['role']}\n"
@@ -165,23 +165,24 @@ class RegistrationFlow:
         
         return message, None
     
-    def get_user_data(self, user_id: int) -> Dict[str, Any]:
+    async def get_user_data(self, user_id: int) -> Dict[str, Any]:
         """Получение данных пользователя из состояния"""
-        if user_id in self.user_states:
-            return self.user_states[user_id]['data']
+        state = await self.user_states.get(user_id)
+        if state is not None:
+            return state.data
         return {}
     
-    def clear_user_state(self, user_id: int):
+    async def clear_user_state(self, user_id: int):
         """Очистка состояния пользователя"""
-        if user_id in self.user_states:
-            del self.user_states[user_id]
+        await self.user_states.delete(user_id)
     
-    def is_user_registering(self, user_id: int) -> bool:
+    async def is_user_registering(self, user_id: int) -> bool:
         """Проверка, находится ли пользователь в процессе регистрации"""
-        return user_id in self.user_states
+        return await self.user_states.contains(user_id)
     
-    def is_registration_complete(self, user_id: int) -> bool:
+    async def is_registration_complete(self, user_id: int) -> bool:
         """Проверка, завершена ли регистрация"""
-        if user_id not in self.user_states:
+        state = await self.user_states.get(user_id)
+        if state is None:
             return False
-        return self.user_states[user_id]['step'] == RegistrationStep.COMPLETE 
\ No newline at end of file
+        return state.step == RegistrationStep.COMPLETE.value 
\ No newline at end of file
@@ -1,70 +1,250 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta
-from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.date import DateTrigger
-import asyncio
+from apscheduler.triggers.interval import IntervalTrigger
+import pytz
+from sqlalchemy import func, select, update
+from config import Config
+from bot.sender import Priority
+from database.models import User, Event, Registration, AsyncSessionLocal
 
 logger = logging.getLogger(__name__)
 
+# За сколько до мероприятия отправляется напоминание
+REMINDER_OFFSET = timedelta(days=1)
+
+REMINDER_JOB_PREFIX = "event_reminder_"
+RECONCILE_JOB_ID = "reminder_reconcile"
+
 class NotificationScheduler:
+    """
+    Напоминания о мероприятиях: одна задача на мероприятие, а не на каждого участника.
+    
+    Задачи выполняются на event loop бота (AsyncIOScheduler). При срабатывании
+    список участников читается из БД порциями, поэтому учитываются все записи и
+    отмены, сделанные после планирования.
+    
+    Само расписание выводится из БД: напоминание нужно каждому будущему мероприятию
+    с участниками и пустым events.reminder_sent_at. reconcile() строит его одним
+    запросом при старте и периодически сверяет с переносами и удалениями.
+    """
+    
     def __init__(self, bot):
         self.bot = bot
-        self.scheduler = BackgroundScheduler()
+        # Время мероприятий хранится в UTC без tzinfo. Триггерам оно передается с
+        # timezone=pytz.utc: наивное время APScheduler считает локальным временем хоста
+        self.scheduler = AsyncIOScheduler(timezone=pytz.utc)
+        self.batch_size = Config.REMINDER_BATCH_SIZE
+        self._send_semaphore = asyncio.Semaphore(Config.REMINDER_CONCURRENCY)
         
     def start(self):
-        """Запуск планировщика"""
+        """Запуск планировщика (вызывается из работающего event loop бота)"""
         self.scheduler.start()
+        self.scheduler.add_job(
+            func=self.reconcile,
+            trigger=IntervalTrigger(seconds=Config.REMINDER_RECONCILE_SECONDS),
+            id=RECONCILE_JOB_ID,
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1
+        )
         logger.info("Планировщик напоминаний запущен")
     
     def stop(self):
         """Остановка планировщика"""
-        self.scheduler.shutdown()
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
         logger.info("Планировщик напоминаний остановлен")
     
-    def add_reminder(self, user_id, event):
-        """Добавить напоминание за день до мероприятия"""
-        reminder_time = event.event_datetime - timedelta(days=1)
+    @staticmethod
+    def _job_id(event_id):
+        return f"{REMINDER_JOB_PREFIX}{event_id}"
+    
+    def add_reminder(self, event):
+        """Запланировать напоминание по мероприятию, если оно еще не запланировано"""
+        if self.scheduler.get_job(self._job_id(event.id)) is not None:
+            return
+        self.schedule_event_reminder(event.id, event.event_datetime)
+    
+    def schedule_event_reminder(self, event_id, event_datetime, catch_up=False):
+        """
+        Запланировать (или перенести) напоминание за день до мероприятия
+        
+        Args:
+            catch_up (bool): Если время напоминания уже прошло, а мероприятие еще нет -
+                отправить сразу (например, бот был остановлен в момент напоминания).
+                Вызывающий отвечает за то, что к этому времени у мероприятия были участники
+        """
+        now = datetime.utcnow()
+        reminder_time = event_datetime - REMINDER_OFFSET
         
         # Проверяем, что напоминание не в прошлом
-        if reminder_time > datetime.utcnow():
-            job_id = f"reminder_{user_id}_{event.id}"
-            
-            self.scheduler.add_job(
-                func=self._send_reminder,
-                trigger=DateTrigger(run_date=reminder_time),
-                args=[user_id, event],
-                id=job_id,
-                replace_existing=True
+        if reminder_time <= now:
+            if not catch_up or event_datetime <= now:
+                return
+            # Без run_date задача выполняется сразу: не может попасть в прошлое
+            # и быть отброшена как пропущенная (misfire_grace_time)
+            reminder_time = None
+        
+        self.scheduler.add_job(
+            func=self._send_event_reminders,
+            trigger=DateTrigger(run_date=reminder_time, timezone=pytz.utc),
+            args=[event_id],
+            id=self._job_id(event_id),
+            replace_existing=True,
+            misfire_grace_time=3600
+        )
+        logger.info(f"Напоминание по мероприятию {event_id} запланировано на {reminder_time or 'сейчас'}")
+    
+    def remove_event_reminder(self, event_id):
+        """Удалить напоминание по мероприятию"""
+        job = self.scheduler.get_job(self._job_id(event_id))
+        if job is not None:
+            job.remove()
+            logger.info(f"Напоминание по мероприятию {event_id} удалено")
+    
+    async def reconcile(self):
+        """
+        Сверка расписания с БД одним запросом по будущим мероприятиям
+        
+        Используется при старте (восстановление после перезапуска) и периодически:
+        добавляет недостающие задачи, переносит задачи перенесенных мероприятий и
+        удаляет задачи удаленных, прошедших и оставшихся без участников мероприятий.
+        
+        Прошедшее напоминание досылается, только если к его времени у мероприятия
+        уже были участники (бот был остановлен или пропустил задачу). Если первая
+        запись сделана меньше чем за сутки до начала, напоминания нет - так же,
+        как в add_reminder.
+        """
+        started = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(
+                    Event.id, Event.event_datetime,
+                    func.min(Registration.registration_time).label('first_registration')
+                )
+                .join(Registration, Registration.event_id == Event.id)
+                .where(
+                    Event.event_datetime > started,
+                    Event.reminder_sent_at.is_(None),
+                    Event.registered_count > 0
+                )
+                .group_by(Event.id, Event.event_datetime)
             )
-            
-            logger.info(f"Напоминание добавлено для пользователя {user_id} на {reminder_time}")
+            pending = {row.id: (row.event_datetime, row.first_registration) for row in result}
+        
+        scheduled = {}
+        for job in self.scheduler.get_jobs():
+            if job.id.startswith(REMINDER_JOB_PREFIX):
+                scheduled[int(job.id[len(REMINDER_JOB_PREFIX):])] = job
+        
+        added = moved = removed = 0
+        for event_id, job in scheduled.items():
+            if event_id not in pending:
+                job.remove()
+                removed += 1
+        
+        for event_id, (event_datetime, first_registration) in pending.items():
+            job = scheduled.get(event_id)
+            expected = event_datetime - REMINDER_OFFSET
+            if job is not None and job.next_run_time is not None:
+                if job.next_run_time.astimezone(pytz.utc).replace(tzinfo=None) == expected or expected <= started:
+                    continue
+                moved += 1
+            elif expected <= started and first_registration > expected:
+                # Напоминание прошло до первой записи - досылать нечего
+                continue
+            else:
+                added += 1
+            self.schedule_event_reminder(event_id, event_datetime, catch_up=True)
+        
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        logger.info(
+            f"Расписание напоминаний сверено за {elapsed:.3f} с: "
+            f"мероприятий {len(pending)}, добавлено {added}, перенесено {moved}, удалено {removed}"
+        )
+        return {'pending': len(pending), 'added': added, 'moved': moved, 'removed': removed}
     
-    def remove_reminder(self, user_id, event_id):
-        """Удалить напоминание"""
-        job_id = f"reminder_{user_id}_{event_id}"
-        try:
-            self.scheduler.remove_job(job_id)
-            logger.info(f"Напоминание удалено для пользователя {user_id}")
-        except Exception as e:
-            logger.warning(f"Не удалось удалить напоминание: {e}")
+    @staticmethod
+    def _format_reminder(event):
+        message = f"⏰ Напоминание о мероприятии!\n\n"
+        message += f"📅 {event.title}\n"
+        message += f"🕐 Завтра в {event.event_datetime.strftime('%H:%M')}\n"
+        message += f"📝 {event.description}\n\n"
+        
+        if event.webinar_link:
+            message += f"🔗 Ссылка на мероприятие: {event.webinar_link}\n\n"
+        
+        message += "Не забудьте принять участие!"
+        return message
     
-    def _send_reminder(self, user_id, event):
-        """Отправить напоминание пользователю"""
-        try:
-            message = f"⏰ Напоминание о мероприятии!\n\n"
-            message += f"📅 {event.title}\n"
-            message += f"🕐 Завтра в {event.event_datetime.strftime('%H:%M')}\n"
-            message += f"📝 {event.description}\n\n"
-            
-            if event.webinar_link:
-                message += f"🔗 Ссылка на мероприятие: {event.webinar_link}\n\n"
-            
-            message += "Не забудьте принять участие!"
-            
-            # Отправка сообщения
-            asyncio.create_task(self.bot.send_message(chat_id=user_id, text=message))
+    async def _send_event_reminders(self, event_id):
+        """Отправить напоминание всем текущим участникам мероприятия"""
+        async with AsyncSessionLocal() as db:
+            event = await db.get(Event, event_id)
+        
+        if event is None:
+            logger.info(f"Мероприятие {event_id} удалено - напоминание не отправляется")
+            return
+        
+        # Мероприятие могли перенести после планирования задачи
+        if event.event_datetime - REMINDER_OFFSET > datetime.utcnow() + timedelta(minutes=1):
+            self.schedule_event_reminder(event.id, event.event_datetime)
+            return
+        
+        # Отмечаем рассылку до отправки: при нескольких процессах бота ее выполнит только один
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Event)
+                .where(Event.id == event_id, Event.reminder_sent_at.is_(None))
+                .values(reminder_sent_at=datetime.utcnow())
+            )
+            await db.commit()
+        if result.rowcount == 0:
+            logger.info(f"Напоминание по мероприятию {event_id} уже разослано")
+            return
+        
+        message = self._format_reminder(event)
+        sent = 0
+        last_registration_id = 0
+        
+        while True:
+            # Участники читаются порциями по возрастанию ID регистрации (keyset)
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(Registration.id, User.telegram_id)
+                    .join(User, Registration.user_id == User.id)
+                    .where(
+                        Registration.event_id == event_id,
+                        Registration.id > last_registration_id
+                    )
+                    .order_by(Registration.id)
+                    .limit(self.batch_size)
+                )
+                batch = result.all()
             
-            logger.info(f"Напоминание отправлено пользователю {user_id}")
+            if not batch:
+                break
             
-        except Exception as e:
-            logger.error(f"Ошибка при отправке напоминания: {e}") 
\ No newline at end of file
+            last_registration_id = batch[-1].id
+            results = await asyncio.gather(*(self._send_reminder(row.telegram_id, message) for row in batch))
+            sent += sum(results)
+        
+        logger.info(f"Напоминания по мероприятию {event_id} отправлены: {sent}")
+    
+    async def _send_reminder(self, chat_id, message):
+        """Отправить напоминание пользователю"""
+        async with self._send_semaphore:
+            try:
+                # Частоту и повторы при RetryAfter обеспечивает PriorityRateLimiter бота
+                await self.bot.send_message(
+                    chat_id=chat_id,
+                    text=message,
+                    rate_limit_args={'priority': Priority.REMINDER}
+                )
+                return True
+            except Exception as e:
+                logger.error(f"Ошибка при отправке напоминания пользователю {chat_id}: {e}")
+                return False
@@ -0,0 +1,211 @@
+"""
+Центральное ограничение исходящих запросов к Bot API с приоритетами
+
+PriorityRateLimiter подключается к PTB Application через builder().rate_limiter(),
+поэтому через него проходят все вызовы: reply_text, reply_photo, edit_message_text,
+answer_callback_query и рассылки. Ограничения:
+- глобальное - SEND_GLOBAL_RATE запросов в секунду (token bucket);
+- на чат - SEND_PER_CHAT_RATE в секунду для личных чатов и 20 в минуту для групп;
+- RetryAfter от Telegram приостанавливает все отправки на указанное время.
+
+Приоритет задается через rate_limit_args={'priority': Priority.REMINDER} в методах
+ExtBot; без него запрос считается интерактивным ответом пользователю.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from enum import IntEnum
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from config import Config
+from bot.instrumentation import observe_api_call
+
+logger = logging.getLogger(__name__)
+
+# Лимит Telegram для групп: 20 сообщений в минуту
+GROUP_CHAT_RATE = 20 / 60
+
+class Priority(IntEnum):
+    """Очереди отправки: меньшее значение обслуживается раньше"""
+    INTERACTIVE = 0
+    REMINDER = 1
+    BULK = 2
+
+class TokenBucket:
+    """Token bucket с резервированием: reserve() возвращает, сколько ждать до отправки"""
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+    
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+class PriorityRateLimiter(BaseRateLimiter):
+    """Ограничитель запросов Bot API с очередями приоритетов и метриками"""
+    
+    def __init__(self, global_rate=None, per_chat_rate=None, per_chat_burst=None, max_retries=None):
+        self.global_rate = global_rate or Config.SEND_GLOBAL_RATE
+        self.per_chat_rate = per_chat_rate or Config.SEND_PER_CHAT_RATE
+        self.per_chat_burst = per_chat_burst or Config.SEND_PER_CHAT_BURST
+        self.max_retries = Config.SEND_MAX_RETRIES if max_retries is None else max_retries
+        
+        self._global_bucket = TokenBucket(self.global_rate, self.global_rate)
+        self._chat_buckets = {}
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._paused_until = 0.0
+        self._dispatcher = None
+        
+        # Метрики
+        self.queue_depth = {priority: 0 for priority in Priority}
+        self.sent_total = {priority: 0 for priority in Priority}
+        self.failed_total = {priority: 0 for priority in Priority}
+        self.retry_after_total = 0
+        self._latencies = {priority: deque(maxlen=1000) for priority in Priority}
+    
+    async def initialize(self):
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+    
+    async def shutdown(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+    
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) > 10000:
+                # Полные (давно не использованные) корзины не влияют на лимиты - удаляем
+                self._prune_chat_buckets()
+            is_group = isinstance(chat_id, str) or (isinstance(chat_id, int) and chat_id < 0)
+            if is_group:
+                bucket = TokenBucket(GROUP_CHAT_RATE, 1)
+            else:
+                bucket = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+    
+    def _prune_chat_buckets(self):
+        now = time.monotonic()
+        idle = [
+            chat_id for chat_id, bucket in self._chat_buckets.items()
+            if bucket.tokens + (now - bucket.updated_at) * bucket.rate >= bucket.capacity
+        ]
+        for chat_id in idle:
+            del self._chat_buckets[chat_id]
+    
+    async def _dispatch(self):
+        """Выдача разрешений на отправку в порядке приоритета с глобальным лимитом"""
+        loop = asyncio.get_running_loop()
+        while True:
+            while not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            
+            pause = self._paused_until - loop.time()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            
+            delay = self._global_bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+            
+            # Выдаем разрешение самому приоритетному живому запросу
+            while self._waiters:
+                _, _, future = heapq.heappop(self._waiters)
+                if not future.done():
+                    future.set_result(None)
+                    break
+    
+    async def _acquire(self, priority, chat_id):
+        if chat_id is not None:
+            delay = self._chat_bucket(chat_id).reserve()
+            if delay:
+                await asyncio.sleep(delay)
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        self._wakeup.set()
+        await future
+    
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        priority = Priority.INTERACTIVE
+        if isinstance(rate_limit_args, dict):
+            priority = Priority(rate_limit_args.get('priority', Priority.INTERACTIVE))
+        
+        chat_id = data.get('chat_id')
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        
+        if self._dispatcher is None:
+            await self.initialize()
+        
+        self.queue_depth[priority] += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                await self._acquire(priority, chat_id)
+                call_started = loop.time()
+                try:
+                    result = await callback(*args, **kwargs)
+                except RetryAfter as e:
+                    observe_api_call(endpoint, loop.time() - call_started, e)
+                    self.retry_after_total += 1
+                    # Telegram просит паузу - останавливаем все отправки
+                    self._paused_until = max(self._paused_until, loop.time() + e.retry_after + 0.1)
+                    if attempt == self.max_retries:
+                        logger.error(f"Превышен лимит Telegram после {self.max_retries} повторов ({endpoint})")
+                        raise
+                    logger.warning(f"RetryAfter {e.retry_after} с для {endpoint}, повтор")
+                    continue
+                except Exception as e:
+                    observe_api_call(endpoint, loop.time() - call_started, e)
+                    raise
+                
+                observe_api_call(endpoint, loop.time() - call_started)
+                self.sent_total[priority] += 1
+                self._latencies[priority].append(loop.time() - started)
+                return result
+        except Exception:
+            self.failed_total[priority] += 1
+            raise
+        finally:
+            self.queue_depth[priority] -= 1
+    
+    def metrics(self):
+        """Снимок метрик: глубина очередей, отправлено, задержка (p50/p99, секунды)"""
+        latency = {}
+        for priority, values in self._latencies.items():
+            ordered = sorted(values)
+            if ordered:
+                latency[priority.name.lower()] = {
+                    'p50': ordered[len(ordered) // 2],
+                    'p99': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+                }
+        return {
+            'queue_depth': {priority.name.lower(): depth for priority, depth in self.queue_depth.items()},
+            'sent_total': {priority.name.lower(): count for priority, count in self.sent_total.items()},
+            'failed_total': {priority.name.lower(): count for priority, count in self.failed_total.items()},
+            'retry_after_total': self.retry_after_total,
+            'latency_seconds': latency
+        }
@@ -0,0 +1,160 @@
+"""
+Хранилища состояния пошаговых диалогов (регистрация, редактирование профиля)
+
+FlowState - компактная запись состояния (__slots__). Бэкенды:
+- InMemoryStateStore: в памяти процесса, с TTL и ограничением размера (LRU)
+- DatabaseStateStore: таблица flow_states, переживает перезапуск и общая для
+  нескольких процессов бота
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete
+from config import Config
+from database.models import FlowStateRecord, AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+class FlowState:
+    """Состояние пользователя в диалоге: текущий шаг и собранные данные"""
+    __slots__ = ('step', 'data', 'touched_at')
+    
+    def __init__(self, step: str, data: Optional[dict] = None, touched_at: Optional[float] = None):
+        self.step = step
+        self.data = data if data is not None else {}
+        self.touched_at = touched_at if touched_at is not None else time.time()
+    
+    def __repr__(self):
+        return f"<FlowState {self.step} {self.data}>"
+
+class StateStore:
+    """Интерфейс хранилища состояний; ключ - Telegram ID пользователя"""
+    
+    def __init__(self, namespace: str, ttl: int):
+        self.namespace = namespace
+        self.ttl = ttl
+    
+    async def get(self, user_id: int) -> Optional[FlowState]:
+        raise NotImplementedError
+    
+    async def set(self, user_id: int, state: FlowState):
+        raise NotImplementedError
+    
+    async def delete(self, user_id: int):
+        raise NotImplementedError
+    
+    async def contains(self, user_id: int) -> bool:
+        return await self.get(user_id) is not None
+
+class InMemoryStateStore(StateStore):
+    """Состояния в памяти процесса с вытеснением по TTL и размеру"""
+    
+    def __init__(self, namespace: str, ttl: int, max_size: int):
+        super().__init__(namespace, ttl)
+        self.max_size = max_size
+        self._states: "OrderedDict[int, FlowState]" = OrderedDict()
+    
+    def __len__(self):
+        return len(self._states)
+    
+    def _is_expired(self, state: FlowState, now: float) -> bool:
+        return now - state.touched_at > self.ttl
+    
+    async def get(self, user_id: int) -> Optional[FlowState]:
+        state = self._states.get(user_id)
+        if state is None:
+            return None
+        if self._is_expired(state, time.time()):
+            del self._states[user_id]
+            return None
+        return state
+    
+    async def set(self, user_id: int, state: FlowState):
+        now = time.time()
+        state.touched_at = now
+        self._states[user_id] = state
+        self._states.move_to_end(user_id)
+        self._evict(now)
+    
+    async def delete(self, user_id: int):
+        self._states.pop(user_id, None)
+    
+    def _evict(self, now: float):
+        """Удаление просроченных записей и самых старых сверх лимита"""
+        # Записи упорядочены по времени последнего изменения: просроченные - в начале
+        while self._states:
+            user_id, state = next(iter(self._states.items()))
+            if not self._is_expired(state, now) and len(self._states) <= self.max_size:
+                break
+            del self._states[user_id]
+
+class DatabaseStateStore(StateStore):
+    """Состояния в таблице flow_states"""
+    
+    # Просроченные строки удаляются не чаще, чем раз в этот интервал (секунды)
+    PURGE_INTERVAL = 600
+    
+    def __init__(self, namespace: str, ttl: int):
+        super().__init__(namespace, ttl)
+        self._last_purge = 0.0
+    
+    async def get(self, user_id: int) -> Optional[FlowState]:
+        async with AsyncSessionLocal() as db:
+            record = await db.get(FlowStateRecord, (self.namespace, user_id))
+            if record is None:
+                return None
+            if record.updated_at < datetime.utcnow() - timedelta(seconds=self.ttl):
+                await db.delete(record)
+                await db.commit()
+                return None
+            return FlowState(record.step, json.loads(record.data or '{}'))
+    
+    async def set(self, user_id: int, state: FlowState):
+        state.touched_at = time.time()
+        async with AsyncSessionLocal() as db:
+            await db.merge(FlowStateRecord(
+                namespace=self.namespace,
+                user_id=user_id,
+                step=state.step,
+                data=json.dumps(state.data, ensure_ascii=False),
+                updated_at=datetime.utcnow()
+            ))
+            await db.commit()
+        await self._maybe_purge()
+    
+    async def delete(self, user_id: int):
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(FlowStateRecord).where(
+                    FlowStateRecord.namespace == self.namespace,
+                    FlowStateRecord.user_id == user_id
+                )
+            )
+            await db.commit()
+    
+    async def _maybe_purge(self):
+        now = time.time()
+        if now - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    delete(FlowStateRecord).where(
+                        FlowStateRecord.namespace == self.namespace,
+                        FlowStateRecord.updated_at < datetime.utcnow() - timedelta(seconds=self.ttl)
+                    )
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Не удалось удалить просроченные состояния: {e}")
+
+def create_state_store(namespace: str) -> StateStore:
+    """Создание хранилища по настройке Config.STATE_STORE_BACKEND"""
+    if Config.STATE_STORE_BACKEND == 'database':
+        return DatabaseStateStore(namespace, ttl=Config.STATE_TTL_SECONDS)
+    return InMemoryStateStore(namespace, ttl=Config.STATE_TTL_SECONDS, max_size=Config.STATE_MAX_ENTRIES)
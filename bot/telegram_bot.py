@@ -1,17 +1,40 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
-from sqlalchemy.orm import Session
-from database.models import User, Event, Registration, get_db
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import select
+from sqlalchemy import update as sql_update  # имя update занято параметром обработчиков
+from sqlalchemy.orm import joinedload
+from database.models import User, Event, Registration
+from database.registrations import register_user_for_event, RegistrationOutcome
 from config import Config
 from bot.scheduler import NotificationScheduler
+from bot.sender import PriorityRateLimiter
 from bot.registration_flow import RegistrationFlow
+from bot.state_store import FlowState, create_state_store
+from bot.event_cards import EventCard, event_card_cache, invalidate_event_card
+from bot.callbacks import CallbackRouter, callbacks
+from bot.middleware import BotContext, UnitOfWorkApplication, rollback_on_error
+from bot.user_cache import user_profile_cache
+from bot.event_snapshot import create_upcoming_events
+from bot.change_listener import create_change_listener
+from database.changes import TOPIC_EVENT
+from database.models import async_engine
+from monitoring.metrics import registry, track_queries
+from bot.instrumentation import track_commands, start_metrics_server
 import urllib.parse
 import pytz
 
 logger = logging.getLogger(__name__)
 
+EVENTS_SNAPSHOT_JOB_ID = "events_snapshot_refresh"
+
+# Сколько символов описания показывать в списке мероприятий
+EVENT_DESCRIPTION_PREVIEW = 300
+
 def convert_to_user_timezone(event_datetime, user_timezone='UTC'):
     """
     Конвертирует время мероприятия в часовой пояс пользователя
@@ -87,11 +110,81 @@ class TelegramBot:
         self.bot_token = Config.BOT_TOKEN
         if not self.bot_token:
             raise ValueError("BOT_TOKEN не установлен в переменных окружения")
-        self.app = Application.builder().token(self.bot_token).build()
+        # Все исходящие запросы к Bot API проходят через общий ограничитель с приоритетами
+        self.rate_limiter = PriorityRateLimiter()
+        builder = Application.builder()
+        if Config.BOT_API_BASE_URL:
+            builder.base_url(Config.BOT_API_BASE_URL)
+        self.app = (
+            builder
+            .token(self.bot_token)
+            # Сессия БД и пользователь загружаются один раз на обновление (bot/middleware.py)
+            .application_class(UnitOfWorkApplication)
+            .context_types(ContextTypes(context=BotContext))
+            .rate_limiter(self.rate_limiter)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
         self.scheduler = NotificationScheduler(self.app.bot)
         self.registration_flow = RegistrationFlow()
+        # Состояния редактирования профиля: шаг - редактируемое поле, в данных - ID пользователя в БД
+        self.edit_states = create_state_store('profile_edit')
+        # Отрисованные карточки мероприятий (общий кэш процесса, сбрасывается по уведомлениям об изменениях)
+        self.event_cards = event_card_cache
+        # Снимок ближайших мероприятий: /events отвечает без запросов к БД
+        self.upcoming_events = create_upcoming_events()
+        # Изменения мероприятий в веб-интерфейсе (другой процесс)
+        self.changes = create_change_listener()
+        self.changes.subscribe(TOPIC_EVENT, self._on_events_changed)
+        # Метрики: запросы к БД на обновление и счетчики self.metrics() в /metrics
+        track_queries(async_engine.sync_engine)
+        registry.register_collector('bot', self.metrics)
+        self._metrics_runner = None
         self.setup_handlers()
         
+    async def _post_init(self, application):
+        """Запуск фоновых задач на event loop бота"""
+        self.scheduler.start()
+        # Восстановление расписания напоминаний после перезапуска
+        await self.scheduler.reconcile()
+        await self.upcoming_events.refresh()
+        self.scheduler.scheduler.add_job(
+            func=self.upcoming_events.refresh,
+            trigger=IntervalTrigger(seconds=Config.EVENTS_SNAPSHOT_REFRESH_SECONDS),
+            id=EVENTS_SNAPSHOT_JOB_ID,
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1
+        )
+        await self.changes.start()
+        # В режиме webhook /metrics отдает приёмник обновлений (bot/webhook.py)
+        if Config.BOT_MODE != 'webhook' and Config.METRICS_PORT:
+            self._metrics_runner = await start_metrics_server(Config.METRICS_PORT)
+    
+    async def _post_shutdown(self, application):
+        if self._metrics_runner is not None:
+            await self._metrics_runner.cleanup()
+        await self.changes.stop()
+        self.scheduler.stop()
+    
+    async def _on_events_changed(self, changes):
+        """Мероприятия изменены в веб-интерфейсе: сброс карточек, снимка /events и сверка напоминаний"""
+        for change in changes:
+            invalidate_event_card(change.entity_id)
+        await self.upcoming_events.refresh()
+        await self.scheduler.reconcile()
+    
+    def metrics(self):
+        """Счетчики бота: отправка в Bot API, кэши, снимок мероприятий и уведомления об изменениях"""
+        return {
+            'sender': self.rate_limiter.metrics(),
+            'event_cards': self.event_cards.stats(),
+            'user_cache': user_profile_cache.stats(),
+            'upcoming_events': self.upcoming_events.stats(),
+            'changes': self.changes.stats()
+        }
+    
     def setup_handlers(self):
         """Настройка обработчиков команд"""
         # Команды
@@ -102,26 +195,42 @@ class TelegramBot:
         self.app.add_handler(CommandHandler("profile", self.profile_command))
         self.app.add_handler(CommandHandler("edit_profile", self.edit_profile_command))
         self.app.add_handler(CommandHandler("timezone", self.timezone_command))
+        track_commands(
+            command
+            for handler in self.app.handlers[0] if isinstance(handler, CommandHandler)
+            for command in handler.commands
+        )
         
-        # Callback handlers
+        # Callback handlers: тип кнопки определяется по callback_data, см. bot/callbacks.py
+        self.callback_router = CallbackRouter(callbacks)
+        self.callback_router.add('register', self.handle_registration)
+        self.callback_router.add('cancel', self.handle_cancellation)
+        self.callback_router.add('full', self.handle_event_full, answer=False)
+        self.callback_router.add('events_page', self.handle_events_page)
+        self.callback_router.add('events_noop', self.handle_noop)
+        self.callback_router.add('ai_exp', self.handle_ai_experience_selection)
+        self.callback_router.add('timezone', self.handle_timezone_selection)
+        self.callback_router.add('edit', self.handle_profile_edit_selection)
         self.app.add_handler(CallbackQueryHandler(self.button_handler))
         
         # Текстовые сообщения
         self.app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
         
-    async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # Необработанные исключения: откат изменений обновления и запись в лог
+        self.app.add_error_handler(rollback_on_error)
+        
+    async def start_command(self, update: Update, context: BotContext):
         """Обработка команды /start"""
         user = update.effective_user
         chat_id = update.effective_chat.id
         
-        # Проверяем, зарегистрирован ли пользователь
-        db = next(get_db())
+        # Проверяем, зарегистрирован ли пользователь (профиль из кэша или БД, см. bot/middleware.py)
         try:
-            existing_user = db.query(User).filter(User.telegram_id == user.id).first()
+            existing_user = context.user_profile
             
             if not existing_user:
                 # Начинаем процесс регистрации
-                message, reply_markup = self.registration_flow.start_registration(user.id)
+                message, reply_markup = await self.registration_flow.start_registration(user.id)
                 await update.message.reply_text(message, reply_markup=reply_markup)
             else:
                 if existing_user.is_profile_complete:
@@ -133,10 +242,7 @@ class TelegramBot:
                     message = "Добро пожаловать обратно! 👋\n\n"
                     message += "Ваша регистрация не была завершена. Давайте продолжим:\n\n"
                     message += "Как вас зовут? (полное имя)"
-                    self.registration_flow.user_states[user.id] = {
-                        'step': self.registration_flow.RegistrationStep.FULL_NAME,
-                        'data': {}
-                    }
+                    await self.registration_flow.start_registration(user.id)
                 
                 await update.message.reply_text(message)
                 
@@ -144,17 +250,12 @@ class TelegramBot:
             logger.error(f"Ошибка при проверке пользователя: {e}")
             message = "Произошла ошибка. Попробуйте позже."
             await update.message.reply_text(message)
-        finally:
-            db.close()
     
-    async def events_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def events_command(self, update: Update, context: BotContext):
         """Показать список доступных мероприятий"""
-        user = update.effective_user
-        db = next(get_db())
-        
         try:
             # Проверяем, зарегистрирован ли пользователь и завершен ли профиль
-            user_obj = db.query(User).filter(User.telegram_id == user.id).first()
+            user_obj = context.user_profile
             if not user_obj:
                 await update.message.reply_text("Вы не зарегистрированы. Используйте /start")
                 return
@@ -163,114 +264,164 @@ class TelegramBot:
                 await update.message.reply_text("Ваш профиль не завершен. Используйте /start для завершения регистрации.")
                 return
             
-            # Получаем будущие мероприятия
-            events = db.query(Event).filter(Event.event_datetime > datetime.utcnow()).order_by(Event.event_datetime.asc()).all()
+            events = await self.upcoming_events.get()
             
             if not events:
                 await update.message.reply_text("В данный момент нет доступных мероприятий.")
                 return
             
-            # Отправляем заголовочное сообщение
-            await update.message.reply_text("🗓 **Доступные мероприятия:**", parse_mode='Markdown')
-            
-            # Отправляем каждое мероприятие отдельным сообщением
-            for i, event in enumerate(events, 1):
-                # Конвертируем время в часовой пояс пользователя
-                event_date = convert_to_user_timezone(event.event_datetime, getattr(user_obj, 'timezone', 'UTC') or 'UTC')
-                spots_left = event.available_spots
-                
-                # Формируем сообщение для мероприятия
-                message = f"📅 **{event.title}**\n\n"
-                
-                # Добавляем описание, если есть
-                if event.description:
-                    message += f"📝 {event.description}\n\n"
-                
-                message += f"🕐 **Дата и время:** {event_date}\n"
-                message += f"👥 **Свободных мест:** {spots_left}\n"
-                
-                # Добавляем ссылку на мероприятие, если есть
-                if event.webinar_link:
-                    message += f"🔗 **Ссылка:** [Присоединиться к мероприятию]({event.webinar_link})\n"
-                
-                # Генерируем ссылку на Google Calendar
-                calendar_link = generate_google_calendar_link(
-                    event_title=event.title,
-                    event_datetime=event.event_datetime,
-                    description=event.description or "",
-                    location=event.webinar_link or ""
-                )
-                
-                # Создаем кнопки для мероприятия
-                keyboard = []
-                
-                # Главная кнопка - регистрация
-                if not event.is_full:
-                    keyboard.append([InlineKeyboardButton(
-                        f"✅ Записаться на мероприятие",
-                        callback_data=f"register_{event.id}"
-                    )])
-                else:
-                    keyboard.append([InlineKeyboardButton(
-                        "❌ МЕРОПРИЯТИЕ ЗАПОЛНЕНО",
-                        callback_data=f"full_{event.id}"
-                    )])
-                
-                # Дополнительные кнопки
-                additional_buttons = []
-                
-                # Кнопка календаря
-                additional_buttons.append(InlineKeyboardButton(
-                    "📅 Добавить в календарь",
-                    url=calendar_link
-                ))
-                
-                # Кнопка ссылки на мероприятие (если есть)
-                if event.webinar_link:
-                    additional_buttons.append(InlineKeyboardButton(
-                        "🔗 Ссылка на мероприятие",
-                        url=event.webinar_link
-                    ))
-                
-                # Добавляем дополнительные кнопки (по 1-2 в ряд)
-                if len(additional_buttons) == 1:
-                    keyboard.append(additional_buttons)
-                else:
-                    keyboard.append(additional_buttons)
-                
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                # Отправляем сообщение для мероприятия
-                if event.image_url:
-                    # Если есть изображение, отправляем фото с подписью
-                    await update.message.reply_photo(
-                        photo=event.image_url,
-                        caption=message,
-                        reply_markup=reply_markup,
-                        parse_mode='Markdown'
-                    )
-                else:
-                    # Если нет изображения, отправляем обычное текстовое сообщение
-                    await update.message.reply_text(
-                        message, 
-                        reply_markup=reply_markup, 
-                        parse_mode='Markdown',
-                        disable_web_page_preview=True
-                    )
+            # Одно сообщение с постраничной навигацией вместо сообщения на каждое мероприятие
+            message, reply_markup, preview = self._render_events_page(events, 0, user_obj.timezone or 'UTC')
+            await update.message.reply_text(
+                message,
+                reply_markup=reply_markup,
+                parse_mode='Markdown',
+                disable_web_page_preview=not preview
+            )
             
         except Exception as e:
             logger.error(f"Ошибка при получении мероприятий: {e}")
             await update.message.reply_text("Произошла ошибка при загрузке мероприятий.")
-        finally:
-            db.close()
     
-    async def my_events_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    def _render_event_card(self, event, user_timezone, registered):
+        """
+        Неизменяемая часть карточки мероприятия (кэшируется в self.event_cards)
+        
+        Счетчик мест, номер в списке и кнопки регистрации/отмены сюда не входят -
+        они меняются без изменения версии мероприятия.
+        """
+        # Конвертируем время в часовой пояс пользователя
+        event_date = convert_to_user_timezone(event.event_datetime, user_timezone)
+        
+        # Генерируем ссылку на Google Calendar
+        calendar_link = generate_google_calendar_link(
+            event_title=event.title,
+            event_datetime=event.event_datetime,
+            description=event.description or "",
+            location=event.webinar_link or ""
+        )
+        
+        if registered:
+            # Полная карточка для "Мои регистрации"
+            text = f"📅 **{event.title}**\n\n"
+            if event.description:
+                text += f"📝 {event.description}\n\n"
+            text += f"🕐 **Дата и время:** {event_date}\n"
+            if event.webinar_link:
+                text += f"🔗 **Ссылка:** [Присоединиться к мероприятию]({event.webinar_link})\n"
+            
+            buttons = [InlineKeyboardButton("📅 Добавить в календарь", url=calendar_link)]
+            if event.webinar_link:
+                buttons.append(InlineKeyboardButton("🔗 Ссылка на мероприятие", url=event.webinar_link))
+            return EventCard(text, tuple(buttons))
+        
+        # Краткая карточка для списка мероприятий
+        text = f"📅 **{event.title}**\n"
+        if event.description:
+            description = event.description
+            if len(description) > EVENT_DESCRIPTION_PREVIEW:
+                description = description[:EVENT_DESCRIPTION_PREVIEW].rstrip() + "…"
+            text += f"📝 {description}\n"
+        text += f"🕐 **Дата и время:** {event_date}\n"
+        if event.webinar_link:
+            text += f"🔗 **Ссылка:** [Присоединиться к мероприятию]({event.webinar_link})\n"
+        return EventCard(text, (InlineKeyboardButton("📅 В календарь", url=calendar_link),))
+    
+    def _render_events_page(self, events, page, user_timezone):
+        """
+        Формирование страницы списка мероприятий
+        
+        Returns:
+            tuple: (текст, клавиатура, показывать ли превью ссылки)
+        """
+        page_size = Config.EVENTS_PAGE_SIZE
+        pages = (len(events) + page_size - 1) // page_size
+        page = max(0, min(page, pages - 1))
+        page_events = events[page * page_size:(page + 1) * page_size]
+        
+        message = ""
+        preview = False
+        # Для одиночной карточки изображение показывается через превью скрытой ссылки
+        if len(page_events) == 1 and page_events[0].image_url:
+            message += f"[\u200b]({page_events[0].image_url})"
+            preview = True
+        
+        message += "🗓 **Доступные мероприятия:**"
+        if pages > 1:
+            message += f" (стр. {page + 1}/{pages})"
+        message += "\n\n"
+        
+        keyboard = []
+        for number, event in enumerate(page_events, page * page_size + 1):
+            card = self.event_cards.get_or_render(event, user_timezone, False, self._render_event_card)
+            
+            message += f"{number}. {card.text}"
+            message += f"👥 **Свободных мест:** {event.available_spots}\n\n"
+            
+            # Кнопки мероприятия: регистрация и календарь в один ряд
+            if not event.is_full:
+                register_button = InlineKeyboardButton(
+                    f"✅ Записаться ({number})",
+                    callback_data=callbacks.encode('register', event.id)
+                )
+            else:
+                register_button = InlineKeyboardButton(
+                    f"❌ Заполнено ({number})",
+                    callback_data=callbacks.encode('full', event.id)
+                )
+            keyboard.append([register_button, *card.buttons])
+        
+        # Навигация по страницам
+        if pages > 1:
+            navigation = []
+            if page > 0:
+                navigation.append(InlineKeyboardButton("◀️", callback_data=callbacks.encode('events_page', page - 1)))
+            navigation.append(InlineKeyboardButton(f"{page + 1}/{pages}", callback_data=callbacks.encode('events_noop')))
+            if page < pages - 1:
+                navigation.append(InlineKeyboardButton("▶️", callback_data=callbacks.encode('events_page', page + 1)))
+            keyboard.append(navigation)
+        
+        return message, InlineKeyboardMarkup(keyboard), preview
+    
+    async def handle_events_page(self, query, context, page):
+        """Переключение страницы списка мероприятий (редактирование сообщения на месте)"""
+        try:
+            user_obj = context.user_profile
+            if not user_obj:
+                await query.edit_message_text("Вы не зарегистрированы. Используйте /start")
+                return
+            
+            # Та же проверка, что в events_command: старая клавиатура не обходит ее
+            if not user_obj.is_profile_complete:
+                await query.edit_message_text("Ваш профиль не завершен. Используйте /start для завершения регистрации.")
+                return
+            
+            events = await self.upcoming_events.get()
+            if not events:
+                await query.edit_message_text("В данный момент нет доступных мероприятий.")
+                return
+            
+            message, reply_markup, preview = self._render_events_page(events, page, user_obj.timezone or 'UTC')
+            await query.edit_message_text(
+                message,
+                reply_markup=reply_markup,
+                parse_mode='Markdown',
+                disable_web_page_preview=not preview
+            )
+            
+        except BadRequest as e:
+            # Повторное нажатие на ту же страницу: содержимое не изменилось
+            if "not modified" not in str(e):
+                logger.error(f"Ошибка при переключении страницы мероприятий: {e}")
+        except Exception as e:
+            logger.error(f"Ошибка при переключении страницы мероприятий: {e}")
+    
+    async def my_events_command(self, update: Update, context: BotContext):
         """Показать мои регистрации"""
-        user = update.effective_user
-        db = next(get_db())
+        db = context.db
         
         try:
-            user_obj = db.query(User).filter(User.telegram_id == user.id).first()
+            user_obj = context.user_profile
             if not user_obj:
                 await update.message.reply_text("Вы не зарегистрированы. Используйте /start")
                 return
@@ -280,10 +431,17 @@ class TelegramBot:
                 return
             
             # Получаем активные регистрации (только на будущие мероприятия)
-            registrations = db.query(Registration).join(Event).filter(
-                Registration.user_id == user_obj.id,
-                Event.event_datetime > datetime.utcnow()
-            ).order_by(Event.event_datetime.asc()).all()
+            result = await db.execute(
+                select(Registration)
+                .join(Event)
+                .options(joinedload(Registration.event))
+                .where(
+                    Registration.user_id == user_obj.id,
+                    Event.event_datetime > datetime.utcnow()
+                )
+                .order_by(Event.event_datetime.asc())
+            )
+            registrations = result.scalars().all()
             
             if not registrations:
                 await update.message.reply_text("У вас нет активных регистраций на мероприятия.")
@@ -292,72 +450,38 @@ class TelegramBot:
             # Отправляем заголовочное сообщение
             await update.message.reply_text("📋 **Ваши регистрации:**", parse_mode='Markdown')
             
+            user_timezone = user_obj.timezone or 'UTC'
+            
             # Отправляем каждое мероприятие отдельным сообщением
             for reg in registrations:
                 event = reg.event
                 if not event:  # Проверяем, что мероприятие существует
                     continue
-                    
-                # Конвертируем время в часовой пояс пользователя
-                event_date = convert_to_user_timezone(event.event_datetime, getattr(user_obj, 'timezone', 'UTC') or 'UTC')
+                
+                card = self.event_cards.get_or_render(event, user_timezone, True, self._render_event_card)
                 reg_date = reg.registration_time.strftime("%d.%m.%Y %H:%M")
                 
                 # Формируем сообщение для мероприятия
-                message = f"📅 **{event.title}**\n\n"
-                
-                # Добавляем описание, если есть
-                if event.description:
-                    message += f"📝 {event.description}\n\n"
-                
-                message += f"🕐 **Дата и время:** {event_date}\n"
-                message += f"✅ **Зарегистрирован:** {reg_date}\n"
-                
-                # Добавляем ссылку на мероприятие, если есть
-                if event.webinar_link:
-                    message += f"🔗 **Ссылка:** [Присоединиться к мероприятию]({event.webinar_link})\n"
-                
-                # Генерируем ссылку на Google Calendar для кнопки
-                calendar_link = generate_google_calendar_link(
-                    event_title=event.title,
-                    event_datetime=event.event_datetime,
-                    description=event.description or "",
-                    location=event.webinar_link or ""
-                )
-                
-                # Создаем кнопки для мероприятия
-                keyboard = []
-                
-                # Дополнительные кнопки
-                event_buttons = []
-                
-                # Кнопка "Добавить в календарь"
-                event_buttons.append(InlineKeyboardButton(
-                    "📅 Добавить в календарь",
-                    url=calendar_link
-                ))
-                
-                # Кнопка ссылки на мероприятие (если есть)
-                if event.webinar_link:
-                    event_buttons.append(InlineKeyboardButton(
-                        "🔗 Ссылка на мероприятие",
-                        url=event.webinar_link
-                    ))
+                message = card.text + f"✅ **Зарегистрирован:** {reg_date}\n"
                 
-                keyboard.append(event_buttons)
-                
-                # Кнопка отмены регистрации
-                keyboard.append([InlineKeyboardButton(
-                    "❌ Отменить регистрацию",
-                    callback_data=f"cancel_{reg.id}"
-                )])
+                # Кнопки календаря и ссылки, ниже - отмена регистрации
+                keyboard = [
+                    list(card.buttons),
+                    [InlineKeyboardButton(
+                        "❌ Отменить регистрацию",
+                        callback_data=callbacks.encode('cancel', reg.id)
+                    )]
+                ]
                 
                 reply_markup = InlineKeyboardMarkup(keyboard)
                 
                 # Отправляем сообщение для мероприятия
                 if event.image_url:
                     # Если есть изображение, отправляем фото с подписью
-                    await update.message.reply_photo(
-                        photo=event.image_url,
+                    await self._send_event_photo(
+                        db,
+                        update.message,
+                        event,
                         caption=message,
                         reply_markup=reply_markup,
                         parse_mode='Markdown'
@@ -374,10 +498,35 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"Ошибка при получении регистраций: {e}")
             await update.message.reply_text("Произошла ошибка при загрузке ваших регистраций.")
-        finally:
-            db.close()
     
-    async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def _send_event_photo(self, db, message, event, **kwargs):
+        """
+        Отправка изображения мероприятия
+        
+        После первой отправки по URL сохраняется file_id из ответа Telegram, и
+        дальше изображение отправляется по нему, без повторного скачивания.
+        """
+        if event.image_file_id:
+            try:
+                return await message.reply_photo(photo=event.image_file_id, **kwargs)
+            except BadRequest as e:
+                logger.warning(f"Не удалось отправить изображение мероприятия {event.id} по file_id: {e}")
+        
+        image_url = event.image_url
+        sent = await message.reply_photo(photo=image_url, **kwargs)
+        if sent.photo:
+            file_id = sent.photo[-1].file_id
+            # URL мог измениться в веб-интерфейсе, пока шла отправка
+            await db.execute(
+                sql_update(Event)
+                .where(Event.id == event.id, Event.image_url == image_url)
+                .values(image_file_id=file_id)
+            )
+            await db.commit()
+            event.image_file_id = file_id
+        return sent
+    
+    async def help_command(self, update: Update, context: BotContext):
         """Команда помощи"""
         help_text = """
 🤖 AI Community Bot - Помощь
@@ -405,74 +554,60 @@ class TelegramBot:
         """
         await update.message.reply_text(help_text)
     
-    async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def button_handler(self, update: Update, context: BotContext):
         """Обработка нажатий кнопок"""
-        query = update.callback_query
-        await query.answer()
-        
-        data = query.data
-        user = update.effective_user
-        
-        if data.startswith("register_"):
-            await self.handle_registration(query, user, data)
-        elif data.startswith("cancel_"):
-            await self.handle_cancellation(query, user, data)
-        elif data.startswith("full_"):
-            await query.edit_message_text("Это мероприятие уже заполнено!")
-        elif data.startswith("ai_exp_"):
-            await self.handle_ai_experience_selection(query, user, data)
-        elif data.startswith("timezone_"):
-            await self.handle_timezone_selection(query, user, data)
-        elif data.startswith("edit_"):
-            await self.handle_profile_edit_selection(query, user, data)
-    
-    async def handle_registration(self, query, user, data):
+        await self.callback_router.dispatch(update.callback_query, context)
+    
+    async def handle_event_full(self, query, context, event_id):
+        """Нажатие на заполненное мероприятие: список остается на месте, отвечаем всплывающим уведомлением"""
+        await query.answer("Это мероприятие уже заполнено!", show_alert=True)
+    
+    async def handle_noop(self, query, context):
+        """Кнопка без действия (номер страницы)"""
+    
+    async def handle_registration(self, query, context, event_id):
         """Обработка регистрации на мероприятие"""
-        event_id = int(data.split("_")[1])
-        db = next(get_db())
+        db = context.db
+        user_obj = context.user_profile
         
+        # Ответ отправляется отдельным сообщением, чтобы список мероприятий остался на месте
         try:
-            user_obj = db.query(User).filter(User.telegram_id == user.id).first()
             if not user_obj:
-                await query.edit_message_text("Вы не зарегистрированы. Используйте /start")
+                await query.message.reply_text("Вы не зарегистрированы. Используйте /start")
                 return
+            # Читаем до записи: при отказе register_user_for_event откатывает транзакцию
+            user_timezone = user_obj.timezone or 'UTC'
             
-            event = db.query(Event).filter(Event.id == event_id).first()
-            if not event:
-                await query.edit_message_text("Мероприятие не найдено.")
-                return
+            # Запись одной транзакцией: место занимается атомарно, дубли отсекает уникальный индекс
+            outcome, event = await register_user_for_event(db, query.from_user.id, event_id)
             
-            # Проверка, не зарегистрирован ли уже
-            existing_reg = db.query(Registration).filter(
-                Registration.user_id == user_obj.id,
-                Registration.event_id == event_id
-            ).first()
+            if outcome == RegistrationOutcome.USER_NOT_FOUND:
+                await query.message.reply_text("Вы не зарегистрированы. Используйте /start")
+                return
             
-            if existing_reg:
-                await query.edit_message_text("Вы уже зарегистрированы на это мероприятие!")
+            if outcome == RegistrationOutcome.EVENT_NOT_FOUND:
+                await query.message.reply_text("Мероприятие не найдено.")
                 return
             
-            if event.is_full:
-                await query.edit_message_text("К сожалению, мероприятие уже заполнено.")
+            if outcome == RegistrationOutcome.ALREADY_REGISTERED:
+                await query.message.reply_text("Вы уже зарегистрированы на это мероприятие!")
                 return
             
-            # Создание регистрации
-            registration = Registration(
-                user_id=user_obj.id,
-                event_id=event_id
-            )
-            db.add(registration)
-            db.commit()
+            if outcome == RegistrationOutcome.EVENT_FULL:
+                await query.message.reply_text("К сожалению, мероприятие уже заполнено.")
+                return
             
             # Добавление напоминания
-            self.scheduler.add_reminder(user.id, event)
+            self.scheduler.add_reminder(event)
+            # Счетчик мест в снимке /events - из строки, возвращенной записью
+            self.upcoming_events.update_registered_count(event.id, event.registered_count)
             
             message = f"✅ Вы успешно зарегистрированы на мероприятие!\n\n"
             message += f"📅 {event.title}\n"
             # Конвертируем время в часовой пояс пользователя
-            event_date = convert_to_user_timezone(event.event_datetime, getattr(user_obj, 'timezone', 'UTC') or 'UTC')
+            event_date = convert_to_user_timezone(event.event_datetime, user_timezone)
             message += f"🕐 {event_date}\n"
-            message += f"👥 Осталось мест: {event.available_spots - 1}\n"
+            message += f"👥 Осталось мест: {event.max_participants - event.registered_count}\n"
             
             # Добавляем ссылку на мероприятие, если она есть
             if event.webinar_link:
@@ -495,28 +630,29 @@ class TelegramBot:
             )]]
             
             reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text(message, reply_markup=reply_markup)
+            await query.message.reply_text(message, reply_markup=reply_markup)
             
         except Exception as e:
             logger.error(f"Ошибка при регистрации: {e}")
-            await query.edit_message_text("Произошла ошибка при регистрации.")
-        finally:
-            db.close()
+            await query.message.reply_text("Произошла ошибка при регистрации.")
     
-    async def handle_cancellation(self, query, user, data):
+    async def handle_cancellation(self, query, context, registration_id):
         """Обработка отмены регистрации"""
-        registration_id = int(data.split("_")[1])
-        db = next(get_db())
+        db = context.db
         
         try:
-            registration = db.query(Registration).filter(Registration.id == registration_id).first()
+            registration = await db.get(Registration, registration_id, options=[joinedload(Registration.event)])
             if not registration:
                 await query.edit_message_text("Регистрация не найдена.")
                 return
             
-            event_title = registration.event.title
-            db.delete(registration)
-            db.commit()
+            event = registration.event
+            event_title = event.title
+            # Слушатель after_delete уменьшает счетчик в БД, ORM-объект мероприятия его не видит
+            registered_count = event.registered_count - 1
+            await db.delete(registration)
+            await db.commit()
+            self.upcoming_events.update_registered_count(event.id, registered_count)
             
             message = f"❌ Регистрация отменена!\n\n"
             message += f"Мероприятие: {event_title}\n"
@@ -527,16 +663,13 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"Ошибка при отмене регистрации: {e}")
             await query.edit_message_text("Произошла ошибка при отмене регистрации.")
-        finally:
-            db.close()
     
-    async def handle_timezone_selection(self, query, user, data):
+    async def handle_timezone_selection(self, query, context, timezone_name):
         """Обработка выбора часового пояса"""
-        timezone_name = data.split("_", 1)[1]  # Получаем название часового пояса
-        db = next(get_db())
+        db = context.db
         
         try:
-            user_obj = db.query(User).filter(User.telegram_id == user.id).first()
+            user_obj = await context.get_db_user()
             if not user_obj:
                 await query.edit_message_text("Вы не зарегистрированы. Используйте /start")
                 return
@@ -550,7 +683,8 @@ class TelegramBot:
             
             # Обновляем часовой пояс пользователя
             user_obj.timezone = timezone_name
-            db.commit()
+            await db.commit()
+            context.user_changed(user_obj)
             
             # Получаем текущее время в выбранном часовом поясе для демонстрации
             user_tz = pytz.timezone(timezone_name)
@@ -566,28 +700,17 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"Ошибка при выборе часового пояса: {e}")
             await query.edit_message_text("Произошла ошибка при настройке часового пояса.")
-        finally:
-            db.close()
     
-    async def handle_profile_edit_selection(self, query, user, data):
+    async def handle_profile_edit_selection(self, query, context, field):
         """Обработка выбора поля для редактирования профиля"""
-        field = data.split("_", 1)[1]  # Получаем название поля
-        db = next(get_db())
-        
         try:
-            user_obj = db.query(User).filter(User.telegram_id == user.id).first()
+            user_obj = context.user_profile
             if not user_obj:
                 await query.edit_message_text("Вы не зарегистрированы. Используйте /start")
                 return
             
             # Сохраняем состояние редактирования для пользователя
-            if not hasattr(self, 'edit_states'):
-                self.edit_states = {}
-            
-            self.edit_states[user.id] = {
-                'field': field,
-                'user_id': user_obj.id
-            }
+            await self.edit_states.set(query.from_user.id, FlowState(field, {'user_id': user_obj.id}))
             
             # Определяем сообщение в зависимости от поля
             field_messages = {
@@ -604,15 +727,15 @@ class TelegramBot:
                 # Для опыта с ИИ показываем кнопки выбора
                 keyboard = [
                     [
-                        InlineKeyboardButton("Новичок", callback_data="ai_exp_novice"),
-                        InlineKeyboardButton("Начинающий", callback_data="ai_exp_beginner")
+                        InlineKeyboardButton("Новичок", callback_data=callbacks.encode('ai_exp', 'novice')),
+                        InlineKeyboardButton("Начинающий", callback_data=callbacks.encode('ai_exp', 'beginner'))
                     ],
                     [
-                        InlineKeyboardButton("Средний", callback_data="ai_exp_intermediate"),
-                        InlineKeyboardButton("Продвинутый", callback_data="ai_exp_advanced")
+                        InlineKeyboardButton("Средний", callback_data=callbacks.encode('ai_exp', 'intermediate')),
+                        InlineKeyboardButton("Продвинутый", callback_data=callbacks.encode('ai_exp', 'advanced'))
                     ],
                     [
-                        InlineKeyboardButton("Эксперт", callback_data="ai_exp_expert")
+                        InlineKeyboardButton("Эксперт", callback_data=callbacks.encode('ai_exp', 'expert'))
                     ]
                 ]
                 reply_markup = InlineKeyboardMarkup(keyboard)
@@ -624,21 +747,17 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"Ошибка при выборе поля для редактирования: {e}")
             await query.edit_message_text("Произошла ошибка при редактировании профиля.")
-        finally:
-            db.close()
     
-    async def handle_profile_edit_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def handle_profile_edit_input(self, update: Update, context: BotContext, edit_state: FlowState):
         """Обработка ввода нового значения для редактирования профиля"""
         user = update.effective_user
         text = update.message.text
-        edit_state = self.edit_states[user.id]
-        field = edit_state['field']
-        user_id = edit_state['user_id']
+        field = edit_state.step
         
-        db = next(get_db())
+        db = context.db
         
         try:
-            user_obj = db.query(User).filter(User.id == user_id).first()
+            user_obj = await context.get_db_user()
             if not user_obj:
                 await update.message.reply_text("Пользователь не найден.")
                 return
@@ -666,10 +785,11 @@ class TelegramBot:
                     return
                 user_obj.role = text.strip()
             
-            db.commit()
+            await db.commit()
+            context.user_changed(user_obj)
             
             # Очищаем состояние редактирования
-            del self.edit_states[user.id]
+            await self.edit_states.delete(user.id)
             
             # Показываем обновленный профиль
             message = "✅ Профиль успешно обновлен!\n\n"
@@ -686,27 +806,26 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"Ошибка при обновлении профиля: {e}")
             await update.message.reply_text("Произошла ошибка при обновлении профиля.")
-        finally:
-            db.close()
     
-    async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def handle_message(self, update: Update, context: BotContext):
         """Обработка текстовых сообщений"""
         user = update.effective_user
         text = update.message.text
         
         # Проверяем, находится ли пользователь в процессе редактирования профиля
-        if hasattr(self, 'edit_states') and user.id in self.edit_states:
-            await self.handle_profile_edit_input(update, context)
+        edit_state = await self.edit_states.get(user.id)
+        if edit_state is not None:
+            await self.handle_profile_edit_input(update, context, edit_state)
             return
         
         # Проверяем, находится ли пользователь в процессе регистрации
-        if self.registration_flow.is_user_registering(user.id):
-            message, reply_markup = self.registration_flow.process_step(user.id, text)
+        if await self.registration_flow.is_user_registering(user.id):
+            message, reply_markup = await self.registration_flow.process_step(user.id, text)
             
-            if self.registration_flow.is_registration_complete(user.id):
+            if await self.registration_flow.is_registration_complete(user.id):
                 # Завершаем регистрацию в базе данных
-                await self.complete_registration(user)
-                self.registration_flow.clear_user_state(user.id)
+                await self.complete_registration(user, context)
+                await self.registration_flow.clear_user_state(user.id)
             
             await update.message.reply_text(message, reply_markup=reply_markup)
         else:
@@ -718,22 +837,21 @@ class TelegramBot:
                 "/help - Помощь"
             )
     
-    async def handle_ai_experience_selection(self, query, user, data):
+    async def handle_ai_experience_selection(self, query, context, option):
         """Обработка выбора опыта с ИИ"""
+        user = query.from_user
+        
         # Проверяем, находится ли пользователь в процессе редактирования профиля
-        if hasattr(self, 'edit_states') and user.id in self.edit_states:
-            await self.handle_ai_experience_edit(query, user, data)
+        edit_state = await self.edit_states.get(user.id)
+        if edit_state is not None:
+            await self.handle_ai_experience_edit(query, context, option, edit_state)
         else:
             # Обычная регистрация
-            message, reply_markup = self.registration_flow.process_ai_experience_callback(user.id, data)
+            message, reply_markup = await self.registration_flow.process_ai_experience_callback(user.id, option)
             await query.edit_message_text(message, reply_markup=reply_markup)
     
-    async def handle_ai_experience_edit(self, query, user, data):
+    async def handle_ai_experience_edit(self, query, context, experience_level, edit_state):
         """Обработка выбора опыта с ИИ при редактировании профиля"""
-        experience_level = data.split("_", 1)[1]  # Получаем уровень опыта
-        edit_state = self.edit_states[user.id]
-        user_id = edit_state['user_id']
-        
         # Маппинг уровней опыта
         experience_mapping = {
             'novice': 'Новичок',
@@ -743,20 +861,21 @@ class TelegramBot:
             'expert': 'Эксперт'
         }
         
-        db = next(get_db())
+        db = context.db
         
         try:
-            user_obj = db.query(User).filter(User.id == user_id).first()
+            user_obj = await context.get_db_user()
             if not user_obj:
                 await query.edit_message_text("Пользователь не найден.")
                 return
             
             # Обновляем опыт с ИИ
             user_obj.ai_experience = experience_mapping.get(experience_level, experience_level)
-            db.commit()
+            await db.commit()
+            context.user_changed(user_obj)
             
             # Очищаем состояние редактирования
-            del self.edit_states[user.id]
+            await self.edit_states.delete(query.from_user.id)
             
             # Показываем обновленный профиль
             message = "✅ Профиль успешно обновлен!\n\n"
@@ -773,17 +892,15 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"Ошибка при обновлении опыта с ИИ: {e}")
             await query.edit_message_text("Произошла ошибка при обновлении профиля.")
-        finally:
-            db.close()
     
-    async def complete_registration(self, user):
+    async def complete_registration(self, user, context: BotContext):
         """Завершение регистрации пользователя в базе данных"""
-        db = next(get_db())
+        db = context.db
         try:
-            user_data = self.registration_flow.get_user_data(user.id)
+            user_data = await self.registration_flow.get_user_data(user.id)
             
             # Создаем или обновляем пользователя
-            existing_user = db.query(User).filter(User.telegram_id == user.id).first()
+            existing_user = await context.get_db_user()
             
             if existing_user:
                 # Обновляем существующего пользователя
@@ -808,23 +925,20 @@ class TelegramBot:
                     is_profile_complete=1
                 )
                 db.add(new_user)
+                existing_user = new_user
             
-            db.commit()
+            await db.commit()
+            context.user_changed(existing_user)
             logger.info(f"Пользователь {user.id} успешно зарегистрирован")
             
         except Exception as e:
             logger.error(f"Ошибка при завершении регистрации: {e}")
-            db.rollback()
-        finally:
-            db.close()
+            await db.rollback()
     
-    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def profile_command(self, update: Update, context: BotContext):
         """Команда для просмотра профиля"""
-        user = update.effective_user
-        db = next(get_db())
-        
         try:
-            user_obj = db.query(User).filter(User.telegram_id == user.id).first()
+            user_obj = context.user_profile
             if not user_obj:
                 await update.message.reply_text("Вы не зарегистрированы. Используйте /start")
                 return
@@ -846,16 +960,11 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"Ошибка при получении профиля: {e}")
             await update.message.reply_text("Произошла ошибка при загрузке профиля.")
-        finally:
-            db.close()
     
-    async def edit_profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def edit_profile_command(self, update: Update, context: BotContext):
         """Команда для редактирования профиля"""
-        user = update.effective_user
-        db = next(get_db())
-        
         try:
-            user_obj = db.query(User).filter(User.telegram_id == user.id).first()
+            user_obj = context.user_profile
             if not user_obj:
                 await update.message.reply_text("Вы не зарегистрированы. Используйте /start")
                 return
@@ -870,15 +979,15 @@ class TelegramBot:
             # Создаем кнопки для редактирования полей
             keyboard = [
                 [
-                    InlineKeyboardButton("📝 Полное имя", callback_data="edit_full_name"),
-                    InlineKeyboardButton("🏢 Компания", callback_data="edit_company")
+                    InlineKeyboardButton("📝 Полное имя", callback_data=callbacks.encode('edit', 'full_name')),
+                    InlineKeyboardButton("🏢 Компания", callback_data=callbacks.encode('edit', 'company'))
                 ],
                 [
-                    InlineKeyboardButton("💼 Роль", callback_data="edit_role"),
-                    InlineKeyboardButton("🤖 Опыт с ИИ", callback_data="edit_ai_experience")
+                    InlineKeyboardButton("💼 Роль", callback_data=callbacks.encode('edit', 'role')),
+                    InlineKeyboardButton("🤖 Опыт с ИИ", callback_data=callbacks.encode('edit', 'ai_experience'))
                 ],
                 [
-                    InlineKeyboardButton("📧 Email", callback_data="edit_email")
+                    InlineKeyboardButton("📧 Email", callback_data=callbacks.encode('edit', 'email'))
                 ]
             ]
             
@@ -888,16 +997,13 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"Ошибка при редактировании профиля: {e}")
             await update.message.reply_text("Произошла ошибка при редактировании профиля.")
-        finally:
-            db.close()
     
-    async def timezone_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def timezone_command(self, update: Update, context: BotContext):
         """Команда для настройки часового пояса"""
-        user = update.effective_user
-        db = next(get_db())
+        db = context.db
         
         try:
-            user_obj = db.query(User).filter(User.telegram_id == user.id).first()
+            user_obj = context.user_profile
             if not user_obj:
                 await update.message.reply_text("Вы не зарегистрированы. Используйте /start")
                 return
@@ -914,8 +1020,10 @@ class TelegramBot:
                     pytz.timezone(new_timezone)
                     
                     # Обновляем часовой пояс пользователя
-                    user_obj.timezone = new_timezone
-                    db.commit()
+                    db_user = await context.get_db_user()
+                    db_user.timezone = new_timezone
+                    await db.commit()
+                    context.user_changed(db_user)
                     
                     message = f"✅ Ваш часовой пояс обновлен на: {new_timezone}\n\n"
                     message += "Теперь время мероприятий будет отображаться в вашем часовом поясе."
@@ -936,23 +1044,23 @@ class TelegramBot:
                 # Создаем кнопки для популярных часовых поясов
                 keyboard = [
                     [
-                        InlineKeyboardButton("🇷🇺 Москва (MSK)", callback_data="timezone_Europe/Moscow"),
-                        InlineKeyboardButton("🇬🇧 Лондон (GMT)", callback_data="timezone_Europe/London")
+                        InlineKeyboardButton("🇷🇺 Москва (MSK)", callback_data=callbacks.encode('timezone', 'Europe/Moscow')),
+                        InlineKeyboardButton("🇬🇧 Лондон (GMT)", callback_data=callbacks.encode('timezone', 'Europe/London'))
                     ],
                     [
-                        InlineKeyboardButton("🇺🇸 Нью-Йорк (EST)", callback_data="timezone_America/New_York"),
-                        InlineKeyboardButton("🇺🇸 Лос-Анджелес (PST)", callback_data="timezone_America/Los_Angeles")
+                        InlineKeyboardButton("🇺🇸 Нью-Йорк (EST)", callback_data=callbacks.encode('timezone', 'America/New_York')),
+                        InlineKeyboardButton("🇺🇸 Лос-Анджелес (PST)", callback_data=callbacks.encode('timezone', 'America/Los_Angeles'))
                     ],
                     [
-                        InlineKeyboardButton("🇯🇵 Токио (JST)", callback_data="timezone_Asia/Tokyo"),
-                        InlineKeyboardButton("🇨🇳 Пекин (CST)", callback_data="timezone_Asia/Shanghai")
+                        InlineKeyboardButton("🇯🇵 Токио (JST)", callback_data=callbacks.encode('timezone', 'Asia/Tokyo')),
+                        InlineKeyboardButton("🇨🇳 Пекин (CST)", callback_data=callbacks.encode('timezone', 'Asia/Shanghai'))
                     ],
                     [
-                        InlineKeyboardButton("🇦🇺 Сидней (AEST)", callback_data="timezone_Australia/Sydney"),
-                        InlineKeyboardButton("🇮🇳 Мумбаи (IST)", callback_data="timezone_Asia/Kolkata")
+                        InlineKeyboardButton("🇦🇺 Сидней (AEST)", callback_data=callbacks.encode('timezone', 'Australia/Sydney')),
+                        InlineKeyboardButton("🇮🇳 Мумбаи (IST)", callback_data=callbacks.encode('timezone', 'Asia/Kolkata'))
                     ],
                     [
-                        InlineKeyboardButton("🌍 UTC (Всемирное время)", callback_data="timezone_UTC")
+                        InlineKeyboardButton("🌍 UTC (Всемирное время)", callback_data=callbacks.encode('timezone', 'UTC'))
                     ]
                 ]
                 
@@ -962,10 +1070,13 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"Ошибка при настройке часового пояса: {e}")
             await update.message.reply_text("Произошла ошибка при настройке часового пояса.")
-        finally:
-            db.close()
     
     def run(self):
-        """Запуск бота"""
-        logger.info("Запуск Telegram бота...")
-        self.app.run_polling() 
\ No newline at end of file
+        """Запуск бота в режиме, заданном Config.BOT_MODE"""
+        if Config.BOT_MODE == 'webhook':
+            from bot.webhook import run_webhook
+            logger.info("Запуск Telegram бота (webhook)...")
+            asyncio.run(run_webhook(self.app))
+        else:
+            logger.info("Запуск Telegram бота (polling)...")
+            self.app.run_polling()
@@ -0,0 +1,90 @@
+"""
+Кэш профилей пользователей бота
+
+Почти каждая команда начинается с проверки is_profile_complete и часового пояса
+пользователя. UserProfile - легкая проекция строки users без связи с сессией;
+UserProfileCache хранит их в памяти процесса с TTL и ограничением размера (LRU).
+Обработчики, изменяющие пользователя, сбрасывают его запись после commit;
+TTL ограничивает устаревание, если пользователя изменили в другом процессе.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import Config
+
+class UserProfile:
+    """Проекция пользователя: идентификаторы, флаг завершения профиля, часовой пояс и поля для отображения"""
+    __slots__ = (
+        'id', 'telegram_id', 'is_profile_complete', 'timezone', 'full_name',
+        'company', 'role', 'ai_experience', 'email', 'registration_date', 'cached_at'
+    )
+    
+    def __init__(self, user):
+        self.id = user.id
+        self.telegram_id = user.telegram_id
+        self.is_profile_complete = user.is_profile_complete
+        self.timezone = user.timezone
+        self.full_name = user.full_name
+        self.company = user.company
+        self.role = user.role
+        self.ai_experience = user.ai_experience
+        self.email = user.email
+        self.registration_date = user.registration_date
+        self.cached_at = time.monotonic()
+    
+    def __repr__(self):
+        return f"<UserProfile {self.telegram_id}>"
+
+class UserProfileCache:
+    """Профили по telegram_id с вытеснением по TTL и размеру"""
+    
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._profiles: "OrderedDict[int, UserProfile]" = OrderedDict()
+    
+    def __len__(self):
+        return len(self._profiles)
+    
+    def get(self, telegram_id: int) -> Optional[UserProfile]:
+        profile = self._profiles.get(telegram_id)
+        if profile is not None and time.monotonic() - profile.cached_at > self.ttl:
+            del self._profiles[telegram_id]
+            profile = None
+        
+        if profile is None:
+            self.misses += 1
+            return None
+        
+        self._profiles.move_to_end(telegram_id)
+        self.hits += 1
+        return profile
+    
+    def put(self, profile: UserProfile):
+        if self.max_size <= 0:
+            return
+        self._profiles[profile.telegram_id] = profile
+        self._profiles.move_to_end(profile.telegram_id)
+        while len(self._profiles) > self.max_size:
+            self._profiles.popitem(last=False)
+    
+    def invalidate(self, telegram_id: int):
+        self._profiles.pop(telegram_id, None)
+    
+    def clear(self):
+        self._profiles.clear()
+    
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._profiles),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+# Общий кэш процесса бота
+user_profile_cache = UserProfileCache(Config.USER_CACHE_SIZE, Config.USER_CACHE_TTL_SECONDS)
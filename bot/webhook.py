@@ -0,0 +1,129 @@
+"""
+Приём обновлений Telegram через webhook (aiohttp) как альтернатива run_polling
+
+Приёмник проверяет секретный токен, разбирает JSON и кладёт Update в очередь
+PTB Application. Обработка идёт тем же Application, что и в режиме polling.
+Несколько экземпляров за балансировщиком нагрузки требуют общего хранилища
+диалогов (STATE_STORE_BACKEND=database): обновления одного пользователя
+попадают на разные экземпляры.
+"""
+
+import asyncio
+import hmac
+import logging
+import signal
+from aiohttp import web
+from telegram import Update
+from config import Config
+from bot.instrumentation import handle_metrics
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+class WebhookReceiver:
+    """HTTP-приёмник обновлений для PTB Application"""
+    
+    def __init__(self, application, secret_token=None, path=None):
+        self.application = application
+        self.secret_token = secret_token
+        self.path = path or Config.WEBHOOK_PATH
+    
+    def build_web_app(self):
+        """Создание aiohttp приложения с маршрутами webhook, проверки здоровья и метрик"""
+        web_app = web.Application()
+        web_app.router.add_post(self.path, self.handle_update)
+        web_app.router.add_get('/healthz', self.handle_health)
+        web_app.router.add_get('/metrics', handle_metrics)
+        return web_app
+    
+    def _is_authorized(self, request):
+        # Без настроенного секрета обновления не принимаются: иначе любой, кто знает
+        # адрес, может отправить обновление от имени любого пользователя
+        if not self.secret_token:
+            return False
+        received = request.headers.get(SECRET_TOKEN_HEADER, '')
+        return hmac.compare_digest(received.encode(), self.secret_token.encode())
+    
+    async def handle_update(self, request):
+        """Приём одного обновления от Telegram"""
+        if not self._is_authorized(request):
+            logger.warning("Webhook: неверный секретный токен")
+            return web.Response(status=403)
+        
+        try:
+            data = await request.json()
+            update = Update.de_json(data, self.application.bot)
+        except Exception as e:
+            logger.warning(f"Webhook: некорректное обновление: {e}")
+            return web.Response(status=400)
+        
+        if update is None:
+            return web.Response(status=400)
+        
+        # Обработка асинхронная: Telegram получает ответ сразу после постановки в очередь
+        await self.application.update_queue.put(update)
+        return web.Response(status=200)
+    
+    async def handle_health(self, request):
+        return web.json_response({'status': 'ok', 'queue_size': self.application.update_queue.qsize()})
+
+async def run_webhook(application, stop_event=None):
+    """
+    Запуск бота в режиме webhook
+    
+    Args:
+        application (Application): PTB приложение с зарегистрированными обработчиками
+        stop_event (asyncio.Event): Событие остановки; по умолчанию - SIGINT/SIGTERM
+    """
+    if not Config.WEBHOOK_SECRET_TOKEN:
+        raise ValueError("WEBHOOK_SECRET_TOKEN не установлен - режим webhook без секрета не запускается")
+    
+    receiver = WebhookReceiver(application, secret_token=Config.WEBHOOK_SECRET_TOKEN)
+    runner = web.AppRunner(receiver.build_web_app())
+    
+    if Config.STATE_STORE_BACKEND != 'database':
+        logger.warning(
+            "Диалоги регистрации хранятся в памяти процесса (STATE_STORE_BACKEND=memory): "
+            "для нескольких экземпляров за балансировщиком нужен STATE_STORE_BACKEND=database"
+        )
+    
+    if stop_event is None:
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                # Не главный поток или платформа без поддержки сигналов
+                pass
+    
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    try:
+        if Config.WEBHOOK_URL:
+            webhook_url = Config.WEBHOOK_URL.rstrip('/') + receiver.path
+            await application.bot.set_webhook(
+                url=webhook_url,
+                secret_token=Config.WEBHOOK_SECRET_TOKEN,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=Config.WEBHOOK_MAX_CONNECTIONS
+            )
+            logger.info(f"Webhook установлен: {webhook_url}")
+        else:
+            logger.warning("WEBHOOK_URL не задан - setWebhook не вызывается")
+        
+        await runner.setup()
+        site = web.TCPSite(runner, Config.WEBHOOK_HOST, Config.WEBHOOK_PORT)
+        await site.start()
+        logger.info(f"Приём webhook на {Config.WEBHOOK_HOST}:{Config.WEBHOOK_PORT}{receiver.path}")
+        
+        await stop_event.wait()
+    finally:
+        await runner.cleanup()
+        await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
@@ -30,11 +30,9 @@ def main():
         logger.info("Запуск Telegram бота...")
         bot = TelegramBot()
         
-        # Запуск планировщика
-        bot.scheduler.start()
-        
-        # Запуск бота (run_polling создает свой event loop)
-        bot.app.run_polling()
+        # Планировщик напоминаний запускается в post_init на event loop бота
+        # Запуск бота: polling или webhook в зависимости от BOT_MODE (создает свой event loop)
+        bot.run()
         
     except Exception as e:
         logger.error(f"Критическая ошибка бота: {e}")
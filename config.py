@@ -7,15 +7,73 @@ class Config:
     # Telegram Bot
     BOT_TOKEN = os.getenv('BOT_TOKEN')
     
+    # Адрес Bot API (по умолчанию api.telegram.org), например локальный сервер Bot API
+    # или имитация из benchmarks/fake_bot_api.py: http://127.0.0.1:8081/bot
+    BOT_API_BASE_URL = os.getenv('BOT_API_BASE_URL')
+    
+    # Режим получения обновлений: polling (по умолчанию) или webhook
+    BOT_MODE = os.getenv('BOT_MODE', 'polling')
+    # Публичный базовый URL для setWebhook (например, https://bot.example.com)
+    WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram/webhook')
+    # Секрет, который Telegram передает в заголовке X-Telegram-Bot-Api-Secret-Token
+    WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN')
+    WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+    WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', os.getenv('PORT', 8443)))
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', 40))
+    
     # Database - автоматическое определение типа БД
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./test.db')
     
     # Flask
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
     
+    # Хранилище состояний диалогов: memory (по умолчанию) или database
+    STATE_STORE_BACKEND = os.getenv('STATE_STORE_BACKEND', 'memory')
+    STATE_TTL_SECONDS = int(os.getenv('STATE_TTL_SECONDS', 86400))
+    STATE_MAX_ENTRIES = int(os.getenv('STATE_MAX_ENTRIES', 10000))
+    
     # APScheduler
     SCHEDULER_API_ENABLED = True
     
+    # Исходящие запросы к Bot API: глобальный лимит и лимит на чат (сообщений в секунду)
+    SEND_GLOBAL_RATE = float(os.getenv('SEND_GLOBAL_RATE', 30))
+    SEND_PER_CHAT_RATE = float(os.getenv('SEND_PER_CHAT_RATE', 1))
+    SEND_PER_CHAT_BURST = int(os.getenv('SEND_PER_CHAT_BURST', 3))
+    SEND_MAX_RETRIES = int(os.getenv('SEND_MAX_RETRIES', 3))
+    
+    # Напоминания: участники читаются порциями, частоту отправки ограничивает SEND_GLOBAL_RATE
+    REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', 500))
+    REMINDER_CONCURRENCY = int(os.getenv('REMINDER_CONCURRENCY', 50))
+    # Как часто бот сверяет расписание напоминаний с БД (переносы и удаления мероприятий)
+    REMINDER_RECONCILE_SECONDS = int(os.getenv('REMINDER_RECONCILE_SECONDS', 300))
+    
+    # Сколько мероприятий показывать на одной странице /events
+    EVENTS_PAGE_SIZE = int(os.getenv('EVENTS_PAGE_SIZE', 5))
+    # Сколько отрисованных карточек мероприятий держать в кэше бота
+    EVENT_CARD_CACHE_SIZE = int(os.getenv('EVENT_CARD_CACHE_SIZE', 2000))
+    # Кэш профилей пользователей в боте: размер и время жизни записи (секунды)
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL_SECONDS = int(os.getenv('USER_CACHE_TTL_SECONDS', 300))
+    # Как часто бот перечитывает снимок ближайших мероприятий для /events (секунды);
+    # изменения из веб-интерфейса применяются сразу по уведомлениям
+    EVENTS_SNAPSHOT_REFRESH_SECONDS = int(os.getenv('EVENTS_SNAPSHOT_REFRESH_SECONDS', 300))
+    # Уведомления об изменениях из веб-интерфейса: интервал опроса журнала без LISTEN
+    # (SQLite) и срок хранения записей журнала
+    CHANGE_POLL_SECONDS = float(os.getenv('CHANGE_POLL_SECONDS', 5))
+    CHANGE_LOG_RETENTION_HOURS = int(os.getenv('CHANGE_LOG_RETENTION_HOURS', 24))
+    # Окно повторного чтения журнала (секунды): записи, зафиксированные позже более
+    # новых, не теряются, если транзакция веб-интерфейса короче окна
+    CHANGE_REPLAY_SECONDS = float(os.getenv('CHANGE_REPLAY_SECONDS', 60))
+    # /api/changes не отдает изменения моложе этого интервала: он должен быть больше
+    # самой долгой пишущей транзакции, иначе клиент синхронизации может пропустить строку
+    SYNC_SAFETY_LAG_SECONDS = float(os.getenv('SYNC_SAFETY_LAG_SECONDS', 5))
+    
+    # Метрики Prometheus (/metrics): запись значений и порт HTTP-сервера метрик бота
+    # в режиме polling (0 - не запускать; в режиме webhook /metrics на порту приёмника)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+    
     # Web interface
     WEB_HOST = os.getenv('WEB_HOST', '0.0.0.0')
     WEB_PORT = int(os.getenv('PORT', 5000))
@@ -0,0 +1,34 @@
+"""
+Уведомления об изменениях между процессами (веб-интерфейс -> бот)
+
+Веб-интерфейс и бот работают в разных процессах (Procfile: web и worker).
+Изменение публикуется записью в таблицу change_log в той же транзакции, что и
+само изменение, поэтому откат отменяет и уведомление. В PostgreSQL публикация
+дополнительно выполняет NOTIFY - его доставят подписчикам при commit, и бот
+перечитает журнал сразу (LISTEN). В SQLite бот опрашивает журнал по интервалу
+(CHANGE_POLL_SECONDS). Подписчик в боте - bot/change_listener.py.
+"""
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from database.models import ChangeRecord
+
+# Канал NOTIFY; полезной нагрузки нет - подписчик всегда перечитывает журнал
+CHANGE_CHANNEL = 'ai_community_changes'
+
+# Темы изменений
+TOPIC_EVENT = 'event'
+
+def publish_change(db: Session, topic: str, entity_id: int = None, action: str = 'updated'):
+    """
+    Публикация изменения в транзакции сессии db (вызывать до commit)
+    
+    Args:
+        db (Session): Сессия, в которой выполнено изменение
+        topic (str): Тема, например TOPIC_EVENT
+        entity_id (int): ID измененной записи
+        action (str): created, updated или deleted
+    """
+    db.add(ChangeRecord(topic=topic, entity_id=entity_id, action=action))
+    if db.get_bind().dialect.name == 'postgresql':
+        db.execute(select(func.pg_notify(CHANGE_CHANNEL, topic)))
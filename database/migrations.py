@@ -0,0 +1,24 @@
+"""
+Вспомогательные функции для скриптов миграции (SQLite и PostgreSQL)
+"""
+
+from sqlalchemy import inspect, text
+
+def column_exists(connection, table, column):
+    """Проверка наличия колонки в таблице"""
+    return column in {info['name'] for info in inspect(connection).get_columns(table)}
+
+def add_column_if_missing(connection, table, column, column_type):
+    """
+    Добавление колонки, если ее еще нет
+    
+    Returns:
+        bool: True, если колонка была добавлена
+    """
+    if column_exists(connection, table, column):
+        print(f"✅ Колонка {table}.{column} уже существует")
+        return False
+    
+    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+    print(f"➕ Колонка {table}.{column} добавлена")
+    return True
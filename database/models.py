@@ -1,7 +1,9 @@
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, BigInteger, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, BigInteger, ForeignKey, Index, event, update, insert, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from contextlib import asynccontextmanager
 import os
 from config import Config
 
@@ -9,6 +11,12 @@ Base = declarative_base()
 
 class User(Base):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Keyset-пагинация списка пользователей в веб-интерфейсе
+        Index('ix_users_registration_date_id', 'registration_date', 'id'),
+        # Инкрементальная синхронизация (/api/changes)
+        Index('ix_users_updated_at_id', 'updated_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     telegram_id = Column(BigInteger, unique=True, nullable=False, index=True)
@@ -25,6 +33,8 @@ class User(Base):
     ai_experience = Column(String(100), nullable=True)  # Опыт с ИИ
     is_profile_complete = Column(Integer, default=0)  # Завершен ли профиль (0/1)
     timezone = Column(String(50), nullable=True, default='UTC')  # Часовой пояс пользователя
+    # Время последнего изменения строки (ORM и Core UPDATE через SQLAlchemy)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Связь с регистрациями
     registrations = relationship("Registration", back_populates="user")
@@ -34,6 +44,11 @@ class User(Base):
 
 class Event(Base):
     __tablename__ = 'events'
+    __table_args__ = (
+        # Курсорная пагинация /api/events и выборка ближайших мероприятий
+        Index('ix_events_datetime_id', 'event_datetime', 'id'),
+        Index('ix_events_updated_at_id', 'updated_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     title = Column(String(255), nullable=False)
@@ -42,6 +57,16 @@ class Event(Base):
     webinar_link = Column(String(500), nullable=True)
     max_participants = Column(Integer, default=100)
     image_url = Column(String(500), nullable=True)  # URL изображения мероприятия
+    # file_id изображения на серверах Telegram после первой отправки по image_url; сбрасывается при смене URL
+    image_file_id = Column(String(255), nullable=True)
+    # Денормализованный счетчик регистраций, обновляется в той же транзакции, что и регистрации
+    registered_count = Column(Integer, nullable=False, default=0, server_default='0')
+    # Когда разослано напоминание; NULL - напоминание еще предстоит (по нему бот восстанавливает расписание)
+    reminder_sent_at = Column(DateTime, nullable=True)
+    # Версия содержимого, увеличивается при каждом редактировании (ключ кэша карточек в боте)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    # Время последнего изменения, в том числе счетчика registered_count
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Связь с регистрациями
     registrations = relationship("Registration", back_populates="event")
@@ -49,23 +74,32 @@ class Event(Base):
     @property
     def available_spots(self):
         """Количество доступных мест"""
-        return self.max_participants - len(self.registrations)
+        return self.max_participants - (self.registered_count or 0)
     
     @property
     def is_full(self):
         """Проверка заполненности мероприятия"""
-        return len(self.registrations) >= self.max_participants
+        return (self.registered_count or 0) >= self.max_participants
     
     def __repr__(self):
         return f"<Event {self.id} - {self.title}>"
 
 class Registration(Base):
     __tablename__ = 'registrations'
+    __table_args__ = (
+        # Один пользователь - одна регистрация на мероприятие
+        Index('uq_registrations_user_event', 'user_id', 'event_id', unique=True),
+        # Список регистраций в веб-интерфейсе: новые сверху, в том числе по одному мероприятию
+        Index('ix_registrations_time_id', 'registration_time', 'id'),
+        Index('ix_registrations_event_time_id', 'event_id', 'registration_time', 'id'),
+        Index('ix_registrations_updated_at_id', 'updated_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     event_id = Column(Integer, ForeignKey('events.id'), nullable=False)
     registration_time = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Связи
     user = relationship("User", back_populates="registrations")
@@ -74,6 +108,91 @@ class Registration(Base):
     def __repr__(self):
         return f"<Registration {self.id} - User {self.user_id} -> Event {self.event_id}>"
 
+class FlowStateRecord(Base):
+    """Состояние пошагового диалога пользователя (регистрация, редактирование профиля)"""
+    __tablename__ = 'flow_states'
+    
+    namespace = Column(String(32), primary_key=True)
+    user_id = Column(BigInteger, primary_key=True)  # Telegram ID
+    step = Column(String(50), nullable=False)
+    data = Column(Text, nullable=True)  # JSON
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<FlowState {self.namespace}:{self.user_id} - {self.step}>"
+
+class ChangeRecord(Base):
+    """Запись журнала изменений для других процессов (см. database/changes.py)"""
+    __tablename__ = 'change_log'
+    
+    id = Column(Integer, primary_key=True)
+    topic = Column(String(32), nullable=False)
+    entity_id = Column(Integer, nullable=True)
+    action = Column(String(16), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<ChangeRecord {self.id} - {self.topic}:{self.entity_id} {self.action}>"
+
+class Tombstone(Base):
+    """Удаленная запись: по ней клиенты инкрементальной синхронизации удаляют свою копию"""
+    __tablename__ = 'tombstones'
+    __table_args__ = (
+        Index('ix_tombstones_deleted_at_id', 'deleted_at', 'id'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    entity = Column(String(32), nullable=False)  # user, event или registration
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<Tombstone {self.id} - {self.entity}:{self.entity_id}>"
+
+# Имена сущностей в tombstones и в /api/changes
+ENTITY_USER = 'user'
+ENTITY_EVENT = 'event'
+ENTITY_REGISTRATION = 'registration'
+
+def _record_tombstone(connection, entity, entity_id):
+    """Запись об удалении на том же соединении (в той же транзакции)"""
+    connection.execute(insert(Tombstone.__table__).values(entity=entity, entity_id=entity_id))
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _record_tombstone(connection, ENTITY_USER, target.id)
+
+@event.listens_for(Event, 'after_delete')
+def _event_deleted(mapper, connection, target):
+    _record_tombstone(connection, ENTITY_EVENT, target.id)
+
+def _change_registered_count(connection, event_id, delta):
+    """Изменение счетчика регистраций мероприятия на том же соединении (в той же транзакции)"""
+    events_table = Event.__table__
+    connection.execute(
+        update(events_table)
+        .where(events_table.c.id == event_id)
+        .values(registered_count=events_table.c.registered_count + delta)
+    )
+
+@event.listens_for(Registration, 'after_insert')
+def _registration_inserted(mapper, connection, target):
+    _change_registered_count(connection, target.event_id, 1)
+
+@event.listens_for(Registration, 'after_delete')
+def _registration_deleted(mapper, connection, target):
+    _change_registered_count(connection, target.event_id, -1)
+    _record_tombstone(connection, ENTITY_REGISTRATION, target.id)
+
+def backfill_registered_count(connection):
+    """Пересчет registered_count по фактическим регистрациям"""
+    connection.execute(text("""
+        UPDATE events
+        SET registered_count = (
+            SELECT COUNT(*) FROM registrations WHERE registrations.event_id = events.id
+        )
+    """))
+
 def get_database_url():
     """Получение URL базы данных с правильной обработкой для Heroku"""
     database_url = Config.DATABASE_URL
@@ -91,6 +210,16 @@ def get_database_url():
     print(f"🔗 Подключение к базе данных: {database_url.split('@')[0]}@***")
     return database_url
 
+def get_async_database_url(database_url):
+    """URL для асинхронного драйвера: sqlite -> aiosqlite, postgresql -> asyncpg"""
+    if database_url.startswith('sqlite://'):
+        return database_url.replace('sqlite://', 'sqlite+aiosqlite://', 1)
+    if database_url.startswith('postgresql+psycopg2://'):
+        return database_url.replace('postgresql+psycopg2://', 'postgresql+asyncpg://', 1)
+    if database_url.startswith('postgresql://'):
+        return database_url.replace('postgresql://', 'postgresql+asyncpg://', 1)
+    return database_url
+
 # Создание engine с правильной обработкой URL
 database_url = get_database_url()
 
@@ -112,6 +241,26 @@ else:
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный engine для обработчиков бота: запросы не блокируют event loop
+async_database_url = get_async_database_url(database_url)
+
+if async_database_url.startswith('sqlite'):
+    async_engine = create_async_engine(
+        async_database_url,
+        connect_args={'timeout': 30},  # Ожидание блокировки записи при одновременных регистрациях
+        echo=False
+    )
+else:
+    async_engine = create_async_engine(
+        async_database_url,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        echo=False
+    )
+
+# expire_on_commit=False - объекты остаются доступны после commit без повторной загрузки
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 def init_db():
     """Инициализация базы данных"""
     print("📋 Создание таблиц...")
@@ -129,3 +278,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+@asynccontextmanager
+async def get_async_db():
+    """Получение асинхронной сессии базы данных"""
+    db = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -0,0 +1,109 @@
+"""
+Атомарная запись на мероприятие
+
+Вместо цепочки "найти пользователя -> найти мероприятие -> проверить регистрацию ->
+проверить заполненность -> вставить" запись выполняется в одной транзакции:
+условный UPDATE счетчика (он же блокировка строки мероприятия) и INSERT ... SELECT
+регистрации. Переполнение исключено условием registered_count < max_participants,
+повторная запись - уникальным индексом (user_id, event_id).
+"""
+
+from datetime import datetime
+from enum import Enum
+from sqlalchemy import select, update, insert, exists, literal, Integer, DateTime
+from sqlalchemy.exc import IntegrityError
+from database.models import User, Event, Registration
+
+class RegistrationOutcome(Enum):
+    """Результат попытки записи на мероприятие"""
+    REGISTERED = "registered"
+    ALREADY_REGISTERED = "already_registered"
+    EVENT_FULL = "event_full"
+    EVENT_NOT_FOUND = "event_not_found"
+    USER_NOT_FOUND = "user_not_found"
+
+async def register_user_for_event(db, telegram_id, event_id):
+    """
+    Записывает пользователя на мероприятие
+    
+    Args:
+        db (AsyncSession): Асинхронная сессия базы данных
+        telegram_id (int): Telegram ID пользователя
+        event_id (int): ID мероприятия
+    
+    Returns:
+        tuple: (RegistrationOutcome, строка мероприятия или None)
+    """
+    events_table = Event.__table__
+    registrations_table = Registration.__table__
+    
+    # Занимаем место: условный UPDATE блокирует строку мероприятия до конца транзакции
+    result = await db.execute(
+        update(events_table)
+        .where(
+            events_table.c.id == event_id,
+            events_table.c.registered_count < events_table.c.max_participants
+        )
+        .values(registered_count=events_table.c.registered_count + 1)
+        .returning(
+            events_table.c.id,
+            events_table.c.title,
+            events_table.c.description,
+            events_table.c.event_datetime,
+            events_table.c.webinar_link,
+            events_table.c.max_participants,
+            events_table.c.registered_count
+        )
+    )
+    event_row = result.first()
+    
+    if event_row is None:
+        await db.rollback()
+        return await _explain_rejection(db, telegram_id, event_id), None
+    
+    # Вставка напрямую в таблицу: счетчик уже увеличен, слушатель after_insert не срабатывает
+    try:
+        result = await db.execute(
+            insert(registrations_table)
+            .from_select(
+                ['user_id', 'event_id', 'registration_time'],
+                select(
+                    User.id,
+                    literal(event_id, Integer),
+                    literal(datetime.utcnow(), DateTime)
+                ).where(User.telegram_id == telegram_id)
+            )
+            .returning(registrations_table.c.id)
+        )
+        registration_id = result.scalar()
+    except IntegrityError:
+        # Уникальный индекс (user_id, event_id): откат возвращает занятое место
+        await db.rollback()
+        return RegistrationOutcome.ALREADY_REGISTERED, event_row
+    
+    if registration_id is None:
+        await db.rollback()
+        return RegistrationOutcome.USER_NOT_FOUND, None
+    
+    await db.commit()
+    return RegistrationOutcome.REGISTERED, event_row
+
+async def _explain_rejection(db, telegram_id, event_id):
+    """Уточнение причины отказа (выполняется только когда место занять не удалось)"""
+    already_registered = (
+        exists()
+        .where(
+            Registration.event_id == Event.id,
+            Registration.user_id == User.id,
+            User.telegram_id == telegram_id
+        )
+    )
+    result = await db.execute(
+        select(Event.id, already_registered).where(Event.id == event_id)
+    )
+    row = result.first()
+    if row is None:
+        return RegistrationOutcome.EVENT_NOT_FOUND
+    if row[1]:
+        return RegistrationOutcome.ALREADY_REGISTERED
+    return RegistrationOutcome.EVENT_FULL
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Генератор больших объемов тестовых данных для нагрузочных тестов и оценки емкости
+
+В отличие от seed_data.py строки вставляются пачками: executemany в SQLite и
+COPY в PostgreSQL. Распределения приближены к реальным: опыт с ИИ и часовые
+пояса - по весам, популярность мероприятий - по закону Ципфа (несколько
+мероприятий собирают большую часть регистраций), большая часть мероприятий
+уже прошла.
+
+Запуск (данные добавляются к уже существующим):
+    python generate_bulk_data.py --users 500000 --events 5000 --registrations 5000000
+
+Пакетная вставка обходит слушатели ORM, поэтому events.registered_count
+пересчитывается в конце через backfill_registered_count.
+"""
+
+import argparse
+import csv
+import io
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from database.models import User, Event, Registration, engine, init_db, backfill_registered_count
+from bot.registration_flow import AIExperienceOption
+
+# Опыт с ИИ: доли среди пользователей с завершенным профилем
+AI_EXPERIENCE_WEIGHTS = {
+    AIExperienceOption.NO_AI_NO_NEED: 6,
+    AIExperienceOption.NO_AI_WANT_TO: 22,
+    AIExperienceOption.BASIC_AI: 45,
+    AIExperienceOption.AI_AGENTS: 12,
+    AIExperienceOption.AI_PRODUCT: 7,
+    AIExperienceOption.INDUSTRIAL_AI: 3,
+    AIExperienceOption.OTHER: 5,
+}
+
+# Часовые пояса: UTC - пользователи, не менявшие значение по умолчанию
+TIMEZONE_WEIGHTS = {
+    'Europe/Moscow': 48,
+    'UTC': 30,
+    'Europe/London': 5,
+    'America/New_York': 4,
+    'Asia/Kolkata': 3,
+    'Asia/Shanghai': 3,
+    'America/Los_Angeles': 3,
+    'Asia/Tokyo': 2,
+    'Australia/Sydney': 2,
+}
+
+COMPANIES = ["Яндекс", "Сбер", "Тинькофф", "VK", "Ozon", "Avito", "Kaspersky", "Стартап", "Фриланс", "Университет"]
+ROLES = ["Разработчик", "Data Scientist", "ML Engineer", "Аналитик", "Продакт-менеджер", "CTO", "Студент", "Исследователь"]
+TOPICS = ["LLM", "RAG", "ИИ-агенты", "Компьютерное зрение", "MLOps", "Промпт-инжиниринг", "Рекомендательные системы"]
+FORMATS = ["Вебинар", "Мастер-класс", "Разбор кейсов", "Встреча сообщества", "Лекция"]
+
+def weighted_choices(rng, weights: dict, count: int) -> list:
+    return rng.choices(list(weights), weights=list(weights.values()), k=count)
+
+def insert_rows(connection, table, columns, rows):
+    """Пачка строк: COPY в PostgreSQL, executemany в остальных БД"""
+    if not rows:
+        return
+    if connection.dialect.name == 'postgresql':
+        buffer = io.StringIO()
+        # В формате CSV пустое значение без кавычек - NULL
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+    else:
+        connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+def insert_batched(connection, table, columns, rows, batch_size, label):
+    """Вставка из итератора пачками по batch_size с выводом прогресса"""
+    started = time.perf_counter()
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            insert_rows(connection, table, columns, batch)
+            total += len(batch)
+            batch = []
+            print(f"  {label}: {total}", end='\r', flush=True)
+    insert_rows(connection, table, columns, batch)
+    total += len(batch)
+    
+    elapsed = time.perf_counter() - started
+    print(f"✅ {label}: {total} за {elapsed:.1f} с ({total / elapsed if elapsed else 0:.0f} строк/с)")
+    return total
+
+def generate_users(rng, count, telegram_id_base, now):
+    columns = (
+        'telegram_id', 'username', 'first_name', 'last_name', 'email', 'registration_date',
+        'full_name', 'company', 'role', 'ai_experience', 'is_profile_complete', 'timezone', 'updated_at'
+    )
+    experiences = weighted_choices(rng, AI_EXPERIENCE_WEIGHTS, count)
+    timezones = weighted_choices(rng, TIMEZONE_WEIGHTS, count)
+    
+    def rows():
+        for i in range(count):
+            telegram_id = telegram_id_base + i
+            # Около 10% пользователей не завершили регистрацию
+            complete = rng.random() < 0.9
+            registration_date = now - timedelta(days=rng.uniform(0, 730))
+            yield (
+                telegram_id,
+                f"user{telegram_id}",
+                f"Имя{i}",
+                f"Фамилия{i}",
+                f"user{telegram_id}@example.com" if complete else None,
+                registration_date,
+                f"Имя{i} Фамилия{i}" if complete else None,
+                rng.choice(COMPANIES) if complete else None,
+                rng.choice(ROLES) if complete else None,
+                experiences[i].value if complete else None,
+                1 if complete else 0,
+                timezones[i],
+                registration_date
+            )
+    
+    return columns, rows()
+
+def event_popularity(rng, count, skew):
+    """Веса мероприятий по закону Ципфа в случайном порядке"""
+    weights = [1 / (rank ** skew) for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return weights
+
+def plan_registrations(popularity, users_count, registrations):
+    """Число регистраций на каждое мероприятие пропорционально популярности"""
+    total_weight = sum(popularity)
+    counts = [min(users_count, int(registrations * weight / total_weight)) for weight in popularity]
+    # Остаток от округления - самым популярным мероприятиям, пока в них есть свободные пользователи
+    remainder = registrations - sum(counts)
+    for index in sorted(range(len(counts)), key=lambda i: popularity[i], reverse=True):
+        if remainder <= 0:
+            break
+        extra = min(remainder, users_count - counts[index])
+        counts[index] += extra
+        remainder -= extra
+    return counts
+
+def generate_events(rng, count, planned, past_share, now):
+    columns = (
+        'title', 'description', 'event_datetime', 'webinar_link', 'max_participants',
+        'registered_count', 'reminder_sent_at', 'version', 'updated_at'
+    )
+    starts = []
+    
+    def rows():
+        for i in range(count):
+            if rng.random() < past_share:
+                start = now - timedelta(days=rng.uniform(1, 365))
+            else:
+                start = now + timedelta(days=rng.uniform(1, 90))
+            start = start.replace(minute=0, second=0, microsecond=0)
+            starts.append(start)
+            # Вместимость с запасом к запланированным регистрациям, не меньше 30 мест
+            capacity = max(30, int(planned[i] * rng.uniform(1.0, 1.3)) + 1)
+            yield (
+                f"{rng.choice(FORMATS)}: {rng.choice(TOPICS)} #{i + 1}",
+                "Сгенерированное мероприятие для нагрузочного тестирования",
+                start,
+                f"https://zoom.us/j/{9_000_000_000 + i}",
+                capacity,
+                0,
+                start - timedelta(days=1) if start < now else None,
+                1,
+                now
+            )
+    
+    return columns, rows(), starts
+
+def generate_registrations(rng, user_ids, event_ids, planned, starts, now):
+    columns = ('user_id', 'event_id', 'registration_time', 'updated_at')
+    
+    def rows():
+        for event_id, count, start in zip(event_ids, planned, starts):
+            # Уникальные пользователи на мероприятие: индекс (user_id, event_id)
+            for user_id in rng.sample(user_ids, count):
+                # До начала мероприятия, но не в будущем
+                registration_time = min(now, start - timedelta(hours=rng.uniform(1, 24 * 30)))
+                yield user_id, event_id, registration_time, registration_time
+    
+    return columns, rows()
+
+def generate(args):
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    init_db()
+    started = time.perf_counter()
+    
+    with engine.connect() as connection:
+        last_user_id = connection.scalar(select(func.coalesce(func.max(User.id), 0)))
+        last_event_id = connection.scalar(select(func.coalesce(func.max(Event.id), 0)))
+        telegram_id_base = max(
+            1_000_000,
+            connection.scalar(select(func.coalesce(func.max(User.telegram_id), 0))) + 1
+        )
+        
+        print(f"👥 Создание {args.users} пользователей...")
+        columns, rows = generate_users(rng, args.users, telegram_id_base, now)
+        insert_batched(connection, User.__table__, columns, rows, args.batch_size, "пользователи")
+        connection.commit()
+        user_ids = list(connection.scalars(select(User.id).where(User.id > last_user_id).order_by(User.id)))
+        
+        print(f"📅 Создание {args.events} мероприятий...")
+        popularity = event_popularity(rng, args.events, args.skew)
+        planned = plan_registrations(popularity, len(user_ids), args.registrations)
+        columns, rows, starts = generate_events(rng, args.events, planned, args.past_share, now)
+        insert_batched(connection, Event.__table__, columns, rows, args.batch_size, "мероприятия")
+        connection.commit()
+        event_ids = list(connection.scalars(select(Event.id).where(Event.id > last_event_id).order_by(Event.id)))
+        
+        print(f"📝 Создание {sum(planned)} регистраций...")
+        columns, rows = generate_registrations(rng, user_ids, event_ids, planned, starts, now)
+        insert_batched(connection, Registration.__table__, columns, rows, args.batch_size, "регистрации")
+        connection.commit()
+        
+        print("🔄 Пересчет счетчиков регистраций...")
+        backfill_registered_count(connection)
+        connection.commit()
+    
+    print(f"✅ Готово за {time.perf_counter() - started:.1f} с")
+    if planned:
+        top = sorted(planned, reverse=True)
+        print(f"📊 Регистраций на мероприятие: максимум {top[0]}, медиана {top[len(top) // 2]}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500_000)
+    parser.add_argument('--events', type=int, default=5_000)
+    parser.add_argument('--registrations', type=int, default=5_000_000)
+    parser.add_argument('--past-share', type=float, default=0.7, help="Доля прошедших мероприятий")
+    parser.add_argument('--skew', type=float, default=1.1, help="Показатель закона Ципфа для популярности мероприятий")
+    parser.add_argument('--batch-size', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    if args.users <= 0 or args.events <= 0:
+        parser.error("--users и --events должны быть больше нуля")
+    if args.registrations > args.users * args.events:
+        parser.error("--registrations больше, чем возможно уникальных пар пользователь-мероприятие")
+    
+    try:
+        generate(args)
+    except Exception as e:
+        print(f"❌ Ошибка генерации данных: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,51 @@ def create_production_data():
             print("❌ Ошибка миграции базы данных")
             sys.exit(1)
         
+        from add_registered_count_migration import run_migration as migrate_registered_count
+        if not migrate_registered_count():
+            print("❌ Ошибка миграции счетчика регистраций")
+            sys.exit(1)
+        
+        from add_registration_unique_migration import run_migration as migrate_registration_unique
+        if not migrate_registration_unique():
+            print("❌ Ошибка миграции уникальности регистраций")
+            sys.exit(1)
+        
+        from add_reminder_sent_migration import run_migration as migrate_reminder_sent
+        if not migrate_reminder_sent():
+            print("❌ Ошибка миграции расписания напоминаний")
+            sys.exit(1)
+        
+        from add_event_version_migration import run_migration as migrate_event_version
+        if not migrate_event_version():
+            print("❌ Ошибка миграции версии мероприятий")
+            sys.exit(1)
+        
+        from add_event_image_file_id_migration import run_migration as migrate_event_image_file_id
+        if not migrate_event_image_file_id():
+            print("❌ Ошибка миграции file_id изображений мероприятий")
+            sys.exit(1)
+        
+        from add_user_list_index_migration import run_migration as migrate_user_list_index
+        if not migrate_user_list_index():
+            print("❌ Ошибка миграции индекса списка пользователей")
+            sys.exit(1)
+        
+        from add_registration_list_indexes_migration import run_migration as migrate_registration_list_indexes
+        if not migrate_registration_list_indexes():
+            print("❌ Ошибка миграции индексов списка регистраций")
+            sys.exit(1)
+        
+        from add_event_list_index_migration import run_migration as migrate_event_list_index
+        if not migrate_event_list_index():
+            print("❌ Ошибка миграции индекса списка мероприятий")
+            sys.exit(1)
+        
+        from add_updated_at_migration import run_migration as migrate_updated_at
+        if not migrate_updated_at():
+            print("❌ Ошибка миграции времени изменения записей")
+            sys.exit(1)
+        
         db = SessionLocal()
         
         try:
@@ -0,0 +1,234 @@
+"""
+Метрики процесса в текстовом формате Prometheus
+
+Counter и Histogram хранят значения в памяти процесса (общий registry) и
+выводятся render() для маршрута /metrics. Наблюдение - несколько операций со
+словарем под блокировкой, поэтому инструментирование остается включенным в
+продакшне; METRICS_ENABLED=false отключает запись значений.
+
+Числа запросов к БД и время в БД считаются на единицу работы (обновление бота,
+HTTP-запрос веб-интерфейса): track_queries(engine) подключает слушатели к
+engine, measure_queries() задает счетчик текущей единицы работы через contextvar.
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+from sqlalchemy import event
+from config import Config
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Границы корзин гистограмм по умолчанию (секунды)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Корзины для числа запросов к БД на единицу работы
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Метрика с набором меток; значения - по кортежу значений меток"""
+    kind = ''
+    
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+    
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+    
+    def _render_samples(self, items) -> list:
+        raise NotImplementedError
+
+class Counter(Metric):
+    """Монотонный счетчик"""
+    kind = 'counter'
+    
+    def inc(self, *labels, amount: float = 1):
+        if not Config.METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+    
+    def total(self) -> float:
+        """Сумма по всем значениям меток"""
+        with self._lock:
+            return sum(self._values.values())
+    
+    def _render_samples(self, items) -> list:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+class Histogram(Metric):
+    """Гистограмма с фиксированными корзинами: счетчики корзин, сумма и количество"""
+    kind = 'histogram'
+    
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+    
+    def observe(self, value: float, *labels):
+        if not Config.METRICS_ENABLED:
+            return
+        # Корзина - первая граница, не меньшая значения; за последней границей - +Inf
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+    
+    def count(self, *labels) -> int:
+        state = self._values.get(labels)
+        return state[2] if state else 0
+    
+    def _render_samples(self, items) -> list:
+        lines = []
+        for labels, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _format_value(float(bound))
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class Registry:
+    """Метрики процесса и сборщики значений на момент запроса /metrics"""
+    
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: dict[str, Callable[[], dict]] = {}
+    
+    def register(self, metric: Metric) -> Metric:
+        """Регистрация метрики; повторная регистрация имени возвращает уже созданную"""
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+    
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+    
+    def register_collector(self, prefix: str, collect: Callable[[], dict]):
+        """
+        Сборщик gauge-метрик: collect() возвращает вложенный словарь с числами,
+        например TelegramBot.metrics(); путь к значению становится именем метрики
+        """
+        self._collectors[prefix] = collect
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for prefix, collect in self._collectors.items():
+            for name, value in _flatten(prefix, collect()):
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+def _flatten(prefix: str, values: dict):
+    """Числовые листья вложенного словаря: (имя_метрики, значение)"""
+    for key, value in values.items():
+        name = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', str(key))}"
+        if isinstance(value, dict):
+            yield from _flatten(name, value)
+        elif isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+
+# Общий registry процесса
+registry = Registry()
+
+class QueryStats:
+    """Запросы к БД в рамках одной единицы работы"""
+    __slots__ = ('queries', 'db_time', '_started')
+    
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self._started = None
+
+_current_queries: ContextVar[Optional[QueryStats]] = ContextVar('query_stats', default=None)
+
+def begin_queries():
+    """
+    Начало подсчета запросов для текущего контекста (когда начало и конец - в разных
+    функциях, как в хуках Flask)
+    
+    Returns:
+        tuple: (QueryStats, токен для end_queries)
+    """
+    stats = QueryStats()
+    return stats, _current_queries.set(stats)
+
+def end_queries(token):
+    _current_queries.reset(token)
+
+@contextmanager
+def measure_queries():
+    """Счетчик запросов к БД для кода внутри блока (в том же контексте)"""
+    stats, token = begin_queries()
+    try:
+        yield stats
+    finally:
+        end_queries(token)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_queries.get()
+    if stats is not None:
+        stats._started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_queries.get()
+    if stats is not None and stats._started is not None:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - stats._started
+        stats._started = None
+
+def track_queries(engine):
+    """Подключение подсчета запросов к engine (sync или async_engine.sync_engine)"""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
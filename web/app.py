@@ -1,11 +1,51 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from datetime import datetime
-from database.models import User, Event, Registration, get_db
+from flask import Flask, render_template, stream_template, request, redirect, url_for, flash, jsonify, g
+from datetime import datetime, timedelta
+import time
+from database.models import (
+    User, Event, Registration, Tombstone, ENTITY_USER, ENTITY_EVENT, ENTITY_REGISTRATION, get_db, engine
+)
+from monitoring.metrics import CONTENT_TYPE, QUERY_COUNT_BUCKETS, registry, track_queries, begin_queries, end_queries
+from database.changes import publish_change, TOPIC_EVENT
+from web.pagination import Keyset, InvalidCursor, fetch_page, fetch_window
+from bot.registration_flow import AIExperienceOption
+from web.sync import DELETED, collect_changes
+from web.export import export_response
+from sqlalchemy import func, insert, literal, or_, select
 from sqlalchemy.orm import joinedload
 from config import Config
 import base64
 from functools import wraps
 
+REQUEST_DURATION = registry.histogram(
+    'web_request_duration_seconds', 'Время обработки HTTP-запроса', ('endpoint', 'method')
+)
+REQUEST_ERRORS = registry.counter(
+    'web_request_errors_total', 'HTTP-запросы с ответом 5xx или исключением', ('endpoint',)
+)
+REQUEST_DB_QUERIES = registry.histogram(
+    'web_request_db_queries', 'Запросов к БД на один HTTP-запрос', ('endpoint',), buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_TIME = registry.histogram(
+    'web_request_db_seconds', 'Время запросов к БД на один HTTP-запрос', ('endpoint',)
+)
+
+# Сортировки списка пользователей; ключи опираются на индекс ix_users_registration_date_id
+USER_SORTS = {
+    'newest': Keyset(User.registration_date, User.id, descending=True),
+    'oldest': Keyset(User.registration_date, User.id),
+}
+USER_FILTERS = ('company', 'role', 'ai_experience', 'status')
+USERS_PER_PAGE = 50
+MAX_USERS_PER_PAGE = 200
+
+# Список регистраций: индексы ix_registrations_time_id и ix_registrations_event_time_id
+REGISTRATION_KEYSET = Keyset(Registration.registration_time, Registration.id, descending=True)
+REGISTRATIONS_PER_PAGE = 100
+MAX_REGISTRATIONS_PER_PAGE = 500
+
+# Курсорный режим /api/events: индекс ix_events_datetime_id
+EVENT_KEYSET = Keyset(Event.event_datetime, Event.id, descending=True)
+
 def create_app():
     import os
     # Указываем путь к шаблонам относительно корня проекта
@@ -31,6 +71,32 @@ def create_app():
             return f(*args, **kwargs)
         return decorated
     
+    # Метрики запросов: время, запросы к БД и ошибки по маршруту (endpoint Flask)
+    track_queries(engine)
+    
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_queries, g.metrics_queries_token = begin_queries()
+    
+    @app.teardown_request
+    def finish_request_metrics(error=None):
+        stats = g.pop('metrics_queries', None)
+        if stats is None:
+            return
+        end_queries(g.pop('metrics_queries_token'))
+        endpoint = request.endpoint or 'unknown'
+        REQUEST_DURATION.observe(time.perf_counter() - g.pop('metrics_started'), endpoint, request.method)
+        REQUEST_DB_QUERIES.observe(stats.queries, endpoint)
+        REQUEST_DB_TIME.observe(stats.db_time, endpoint)
+        if error is not None or g.pop('metrics_status', 200) >= 500:
+            REQUEST_ERRORS.inc(endpoint)
+    
+    @app.after_request
+    def record_response_status(response):
+        g.metrics_status = response.status_code
+        return response
+    
     @app.route('/')
     def index():
         """Главная страница"""
@@ -55,13 +121,116 @@ def create_app():
         finally:
             db.close()
     
+    def user_to_dict(user):
+        return {
+            'id': user.id,
+            'telegram_id': user.telegram_id,
+            'username': user.username,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'full_name': user.full_name,
+            'company': user.company,
+            'role': user.role,
+            'ai_experience': user.ai_experience,
+            'email': user.email,
+            'is_profile_complete': bool(user.is_profile_complete),
+            'timezone': user.timezone,
+            'registration_date': user.registration_date.isoformat() if user.registration_date else None,
+            'updated_at': user.updated_at.isoformat() if user.updated_at else None
+        }
+    
+    def user_conditions(filters):
+        """Условия WHERE по фильтрам списка пользователей (общие для страницы, API и выгрузки)"""
+        conditions = []
+        if filters['company']:
+            conditions.append(User.company.icontains(filters['company'], autoescape=True))
+        if filters['role']:
+            conditions.append(User.role.icontains(filters['role'], autoescape=True))
+        if filters['ai_experience']:
+            conditions.append(User.ai_experience == filters['ai_experience'])
+        if filters['status'] == 'complete':
+            conditions.append(User.is_profile_complete == 1)
+        elif filters['status'] == 'incomplete':
+            conditions.append(or_(User.is_profile_complete == 0, User.is_profile_complete.is_(None)))
+        return conditions
+    
+    def query_users(db):
+        """
+        Страница пользователей по параметрам запроса: фильтры, сортировка, курсор
+        
+        Returns:
+            tuple: (пользователи, {user_id: число регистраций}, курсор следующей страницы, параметры списка)
+        """
+        filters = {name: request.args.get(name, '').strip() for name in USER_FILTERS}
+        sort = request.args.get('sort', 'newest')
+        if sort not in USER_SORTS:
+            sort = 'newest'
+        per_page = min(max(request.args.get('per_page', USERS_PER_PAGE, type=int), 1), MAX_USERS_PER_PAGE)
+        
+        statement = select(User).where(*user_conditions(filters))
+        users_page, next_cursor = fetch_page(db, statement, USER_SORTS[sort], request.args.get('cursor'), per_page)
+        
+        # Счетчики регистраций одним GROUP BY по пользователям страницы (индекс (user_id, event_id))
+        registration_counts = {}
+        if users_page:
+            registration_counts = dict(db.execute(
+                select(Registration.user_id, func.count(Registration.id))
+                .where(Registration.user_id.in_([user.id for user in users_page]))
+                .group_by(Registration.user_id)
+            ).all())
+        
+        list_args = {name: value for name, value in filters.items() if value}
+        list_args['sort'] = sort
+        if per_page != USERS_PER_PAGE:
+            list_args['per_page'] = per_page
+        return users_page, registration_counts, next_cursor, list_args
+    
     @app.route('/users')
     def users():
-        """Страница пользователей"""
+        """Страница пользователей (keyset-пагинация)"""
+        db = next(get_db())
+        try:
+            try:
+                users_page, registration_counts, next_cursor, list_args = query_users(db)
+            except InvalidCursor:
+                flash('Ссылка на страницу устарела, показана первая страница', 'error')
+                return redirect(url_for('users', **{name: value for name, value in request.args.items() if name != 'cursor'}))
+            
+            return render_template('users.html',
+                                 users=users_page,
+                                 registration_counts=registration_counts,
+                                 next_cursor=next_cursor,
+                                 list_args=list_args,
+                                 is_first_page=not request.args.get('cursor'),
+                                 ai_experience_options=[option.value for option in AIExperienceOption])
+        finally:
+            db.close()
+    
+    @app.route('/api/users')
+    @requires_auth
+    def api_users():
+        """API списка пользователей: те же фильтры и курсор, что у /users"""
         db = next(get_db())
         try:
-            users_list = db.query(User).order_by(User.registration_date.desc()).all()
-            return render_template('users.html', users=users_list)
+            try:
+                users_page, registration_counts, next_cursor, list_args = query_users(db)
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            
+            users_data = []
+            for user in users_page:
+                user_data = user_to_dict(user)
+                user_data['registrations_count'] = registration_counts.get(user.id, 0)
+                users_data.append(user_data)
+            
+            return jsonify({
+                'users': users_data,
+                'pagination': {
+                    'per_page': list_args.get('per_page', USERS_PER_PAGE),
+                    'sort': list_args['sort'],
+                    'next_cursor': next_cursor
+                }
+            })
         finally:
             db.close()
     
@@ -90,6 +259,8 @@ def create_app():
                     image_url=request.form.get('image_url') if request.form.get('image_url') else None
                 )
                 db.add(event)
+                db.flush()
+                publish_change(db, TOPIC_EVENT, event.id, 'created')
                 db.commit()
                 flash('Мероприятие создано успешно!', 'success')
                 return redirect(url_for('events'))
@@ -123,18 +294,41 @@ def create_app():
         """Редактирование мероприятия"""
         db = next(get_db())
         try:
-            event = db.query(Event).filter(Event.id == event_id).first()
+            query = db.query(Event).filter(Event.id == event_id)
+            if request.method == 'POST':
+                # Блокировка строки (PostgreSQL): регистрация не увеличит registered_count
+                # между проверкой числа мест и commit
+                query = query.with_for_update()
+            event = query.first()
             if not event:
                 flash('Мероприятие не найдено', 'error')
                 return redirect(url_for('events'))
             
             if request.method == 'POST':
+                max_participants = int(request.form.get('max_participants', 100))
+                if max_participants < (event.registered_count or 0):
+                    flash(f'Мест не может быть меньше, чем уже зарегистрировано участников ({event.registered_count})', 'error')
+                    return render_template('edit_event.html', event=event)
+                
+                new_datetime = datetime.strptime(request.form['event_datetime'], '%Y-%m-%dT%H:%M')
+                if new_datetime != event.event_datetime:
+                    # Мероприятие перенесено - напоминание нужно отправить заново
+                    event.reminder_sent_at = None
+                
                 event.title = request.form['title']
                 event.description = request.form['description']
-                event.event_datetime = datetime.strptime(request.form['event_datetime'], '%Y-%m-%dT%H:%M')
+                event.event_datetime = new_datetime
                 event.webinar_link = request.form.get('webinar_link')
-                event.max_participants = int(request.form.get('max_participants', 100))
-                event.image_url = request.form.get('image_url') if request.form.get('image_url') else None
+                event.max_participants = max_participants
+                new_image_url = request.form.get('image_url') if request.form.get('image_url') else None
+                if new_image_url != event.image_url:
+                    # Изображение заменено - бот загрузит его заново по новому URL
+                    event.image_file_id = None
+                event.image_url = new_image_url
+                # Новая версия делает устаревшими закэшированные в боте карточки
+                event.version = (event.version or 0) + 1
+                # Бот сбросит карточки, снимок мероприятий и расписание напоминаний
+                publish_change(db, TOPIC_EVENT, event_id, 'updated')
                 
                 db.commit()
                 flash('Мероприятие обновлено успешно!', 'success')
@@ -154,9 +348,15 @@ def create_app():
                 flash('Мероприятие не найдено', 'error')
                 return redirect(url_for('events'))
             
-            # Удаляем все регистрации
+            # Удаляем все регистрации; массовое удаление минует слушатели ORM,
+            # поэтому отметки об удалении для синхронизации записываем сами
+            db.execute(insert(Tombstone).from_select(
+                ['entity', 'entity_id'],
+                select(literal(ENTITY_REGISTRATION), Registration.id).where(Registration.event_id == event_id)
+            ))
             db.query(Registration).filter(Registration.event_id == event_id).delete()
             db.delete(event)
+            publish_change(db, TOPIC_EVENT, event_id, 'deleted')
             db.commit()
             
             flash('Мероприятие удалено успешно!', 'success')
@@ -164,19 +364,70 @@ def create_app():
         finally:
             db.close()
     
+    def parse_date(value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d') if value else None
+        except ValueError:
+            return None
+    
+    def registration_conditions(event_id, date_from, date_to):
+        """Условия WHERE по фильтрам списка регистраций"""
+        conditions = []
+        if event_id:
+            conditions.append(Registration.event_id == event_id)
+        if date_from:
+            conditions.append(Registration.registration_time >= date_from)
+        if date_to:
+            # Дата "по" включительно
+            conditions.append(Registration.registration_time < date_to + timedelta(days=1))
+        return conditions
+    
     @app.route('/registrations')
     def registrations():
-        """Страница регистраций"""
+        """Страница регистраций (keyset-пагинация, потоковая отрисовка)"""
+        event_id = request.args.get('event_id', type=int)
+        date_from = parse_date(request.args.get('date_from'))
+        date_to = parse_date(request.args.get('date_to'))
+        per_page = min(max(request.args.get('per_page', REGISTRATIONS_PER_PAGE, type=int), 1), MAX_REGISTRATIONS_PER_PAGE)
+        
+        statement = select(Registration).options(
+            joinedload(Registration.user),
+            joinedload(Registration.event)
+        ).where(*registration_conditions(event_id, date_from, date_to))
+        
+        list_args = {
+            'event_id': event_id,
+            'date_from': date_from.strftime('%Y-%m-%d') if date_from else None,
+            'date_to': date_to.strftime('%Y-%m-%d') if date_to else None,
+            'per_page': per_page if per_page != REGISTRATIONS_PER_PAGE else None
+        }
+        list_args = {name: value for name, value in list_args.items() if value}
+        
         db = next(get_db())
         try:
-            registrations_list = db.query(Registration).options(
-                joinedload(Registration.user),
-                joinedload(Registration.event)
-            ).order_by(Registration.registration_time.desc()).all()
+            try:
+                registrations_page, next_cursor = fetch_page(
+                    db, statement, REGISTRATION_KEYSET, request.args.get('cursor'), per_page
+                )
+            except InvalidCursor:
+                flash('Ссылка на страницу устарела, показана первая страница', 'error')
+                return redirect(url_for('registrations', **list_args))
             
-            return render_template('registrations.html', registrations=registrations_list)
+            # Для фильтра нужны только id, название и дата - без загрузки описаний
+            event_options = db.execute(
+                select(Event.id, Event.title, Event.event_datetime).order_by(Event.event_datetime.desc())
+            ).all()
         finally:
+            # Страница и связанные пользователь/мероприятие загружены - сессия больше не нужна
             db.close()
+        
+        # Строки отдаются клиенту по мере отрисовки; объем страницы ограничен per_page
+        return stream_template('registrations.html',
+                               registrations=registrations_page,
+                               next_cursor=next_cursor,
+                               list_args=list_args,
+                               is_first_page=not request.args.get('cursor'),
+                               event_options=event_options)
     
     @app.route('/api/stats')
     def api_stats():
@@ -195,55 +446,199 @@ def create_app():
         finally:
             db.close()
     
+    def event_to_dict(event):
+        # Занятость - из денормализованного счетчика registered_count, без загрузки регистраций
+        return {
+            'id': event.id,
+            'title': event.title,
+            'description': event.description,
+            'event_datetime': event.event_datetime.isoformat() if event.event_datetime else None,
+            'webinar_link': event.webinar_link,
+            'max_participants': event.max_participants,
+            'image_url': event.image_url,
+            'registered_participants': event.registered_count,
+            'available_spots': event.available_spots,
+            'is_full': event.is_full,
+            'updated_at': event.updated_at.isoformat() if event.updated_at else None
+        }
+    
+    def registration_to_dict(registration):
+        return {
+            'id': registration.id,
+            'user_id': registration.user_id,
+            'event_id': registration.event_id,
+            'registration_time': registration.registration_time.isoformat() if registration.registration_time else None,
+            'updated_at': registration.updated_at.isoformat() if registration.updated_at else None
+        }
+    
     @app.route('/api/events')
     @requires_auth
     def api_events():
-        """API для получения списка событий с Basic авторизацией"""
+        """
+        API для получения списка событий с Basic авторизацией
+        
+        Два режима пагинации:
+        - ?page=N&per_page=M - по номеру страницы (OFFSET), как раньше;
+        - ?cursor=&per_page=M - по курсору: пустой cursor - первая страница, далее
+          next_cursor/prev_cursor из ответа. Стоимость страницы не зависит от глубины.
+        Общее число событий: include_total=1/0 (по умолчанию только в режиме page).
+        """
         db = next(get_db())
         try:
-            events_query = db.query(Event).order_by(Event.event_datetime.desc())
-            
-            # Поддержка пагинации
-            page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 50, type=int)
             
             # Ограничиваем количество событий на страницу
             if per_page > 100:
                 per_page = 100
+            if per_page < 1:
+                per_page = 1
             
-            offset = (page - 1) * per_page
-            events_list = events_query.offset(offset).limit(per_page).all()
-            total_events = events_query.count()
+            cursor_mode = 'cursor' in request.args
+            include_total = request.args.get('include_total', 0 if cursor_mode else 1, type=int)
             
-            # Преобразуем события в JSON
-            events_data = []
-            for event in events_list:
-                event_data = {
-                    'id': event.id,
-                    'title': event.title,
-                    'description': event.description,
-                    'event_datetime': event.event_datetime.isoformat() if event.event_datetime else None,
-                    'webinar_link': event.webinar_link,
-                    'max_participants': event.max_participants,
-                    'image_url': event.image_url,
-                    'registered_participants': len(event.registrations),
-                    'available_spots': event.available_spots,
-                    'is_full': event.is_full
+            if cursor_mode:
+                try:
+                    events_list, next_cursor, prev_cursor = fetch_window(
+                        db, select(Event), EVENT_KEYSET, request.args.get('cursor'), per_page
+                    )
+                except InvalidCursor:
+                    return jsonify({'error': 'Invalid cursor'}), 400
+                pagination = {
+                    'per_page': per_page,
+                    'next_cursor': next_cursor,
+                    'prev_cursor': prev_cursor
                 }
-                events_data.append(event_data)
-            
-            return jsonify({
-                'events': events_data,
-                'pagination': {
+            else:
+                page = max(request.args.get('page', 1, type=int), 1)
+                offset = (page - 1) * per_page
+                events_list = db.scalars(
+                    select(Event).order_by(*EVENT_KEYSET.order_by()).offset(offset).limit(per_page)
+                ).all()
+                pagination = {
                     'page': page,
-                    'per_page': per_page,
-                    'total': total_events,
-                    'pages': (total_events + per_page - 1) // per_page
+                    'per_page': per_page
                 }
+            
+            if include_total:
+                total_events = db.scalar(select(func.count(Event.id)))
+                pagination['total'] = total_events
+                if not cursor_mode:
+                    pagination['pages'] = (total_events + per_page - 1) // per_page
+            
+            return jsonify({
+                'events': [event_to_dict(event) for event in events_list],
+                'pagination': pagination
             })
         finally:
             db.close()
     
+    @app.route('/api/changes')
+    @requires_auth
+    def api_changes():
+        """
+        Лента изменений для инкрементальной синхронизации с Basic авторизацией
+        
+        Возвращает пользователей, мероприятия и регистрации, измененные после
+        позиции since, и удаления. Первый запрос без since - полная выгрузка
+        порциями; next_cursor передается как since в следующем запросе.
+        """
+        limit = min(max(request.args.get('limit', 1000, type=int), 1), 5000)
+        serializers = {
+            ENTITY_USER: user_to_dict,
+            ENTITY_EVENT: event_to_dict,
+            ENTITY_REGISTRATION: registration_to_dict
+        }
+        
+        db = next(get_db())
+        try:
+            try:
+                changes, next_cursor, has_more = collect_changes(db, request.args.get('since'), limit)
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            
+            changes_data = []
+            for name, row in changes:
+                if name == DELETED:
+                    changes_data.append({
+                        'type': row.entity,
+                        'op': 'delete',
+                        'id': row.entity_id,
+                        'at': row.deleted_at.isoformat()
+                    })
+                else:
+                    changes_data.append({
+                        'type': name,
+                        'op': 'upsert',
+                        'id': row.id,
+                        'at': row.updated_at.isoformat(),
+                        'data': serializers[name](row)
+                    })
+            
+            return jsonify({
+                'changes': changes_data,
+                'next_cursor': next_cursor,
+                'has_more': has_more
+            })
+        finally:
+            db.close()
+    
+    # Выгрузки: строки читаются из БД порциями и отдаются по мере чтения (web/export.py)
+    @app.route('/export/users.<any(csv, ndjson):fmt>')
+    @requires_auth
+    def export_users(fmt):
+        """Выгрузка пользователей с фильтрами страницы /users"""
+        filters = {name: request.args.get(name, '').strip() for name in USER_FILTERS}
+        statement = select(
+            User.id, User.telegram_id, User.username, User.first_name, User.last_name,
+            User.full_name, User.company, User.role, User.ai_experience, User.email,
+            User.is_profile_complete, User.timezone, User.registration_date, User.updated_at
+        ).where(*user_conditions(filters)).order_by(User.registration_date, User.id)
+        return export_response(statement, fmt, 'users')
+    
+    @app.route('/export/registrations.<any(csv, ndjson):fmt>')
+    @requires_auth
+    def export_registrations(fmt):
+        """Выгрузка регистраций с фильтрами страницы /registrations"""
+        conditions = registration_conditions(
+            request.args.get('event_id', type=int),
+            parse_date(request.args.get('date_from')),
+            parse_date(request.args.get('date_to'))
+        )
+        # Столбцы через JOIN вместо ORM-объектов: без identity map и ленивых загрузок
+        statement = select(
+            Registration.id, Registration.registration_time,
+            Registration.event_id, Event.title.label('event_title'), Event.event_datetime,
+            Registration.user_id, User.telegram_id, User.username, User.full_name, User.email, User.company
+        ).join(Registration.user).join(Registration.event).where(*conditions).order_by(
+            Registration.registration_time, Registration.id
+        )
+        return export_response(statement, fmt, 'registrations')
+    
+    @app.route('/export/events/<int:event_id>/attendees.<any(csv, ndjson):fmt>')
+    @requires_auth
+    def export_event_attendees(event_id, fmt):
+        """Выгрузка участников мероприятия в порядке регистрации"""
+        db = next(get_db())
+        try:
+            if db.get(Event, event_id) is None:
+                return jsonify({'error': 'Event not found'}), 404
+        finally:
+            db.close()
+        
+        statement = select(
+            User.id.label('user_id'), User.telegram_id, User.username, User.full_name,
+            User.company, User.role, User.ai_experience, User.email, Registration.registration_time
+        ).join(Registration.user).where(Registration.event_id == event_id).order_by(
+            Registration.registration_time, Registration.id
+        )
+        return export_response(statement, fmt, f'event_{event_id}_attendees')
+    
+    @app.route('/metrics')
+    @requires_auth
+    def metrics():
+        """Метрики процесса веб-интерфейса в формате Prometheus"""
+        return registry.render(), 200, {'Content-Type': CONTENT_TYPE}
+    
     # Фильтры для шаблонов
     @app.template_filter('datetime_format')
     def datetime_format(value, format='%d.%m.%Y %H:%M'):
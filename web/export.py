@@ -0,0 +1,94 @@
+"""
+Потоковая выгрузка таблиц в CSV и NDJSON
+
+Строки читаются из БД порциями (yield_per: в PostgreSQL - серверный курсор) и
+сразу уходят клиенту, поэтому память процесса не растет с размером выгрузки, а
+первые байты (заголовок CSV) отправляются сразу после начала запроса.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from flask import Response, stream_with_context
+from database.models import get_db
+
+# Строк из БД за одно обращение к курсору и строк в одной порции ответа
+YIELD_PER = 1000
+CHUNK_ROWS = 500
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+# Значения, которые Excel исполняет как формулу (имена и компании вводят пользователи бота)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _drain(buffer: io.StringIO) -> str:
+    """Содержимое буфера с его очисткой"""
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
+
+def iter_csv(result):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM - чтобы Excel открыл кириллицу в UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(result.keys())
+    yield _drain(buffer)
+    
+    for index, row in enumerate(result, 1):
+        writer.writerow([_csv_value(value) for value in row])
+        if index % CHUNK_ROWS == 0:
+            yield _drain(buffer)
+    yield _drain(buffer)
+
+def iter_ndjson(result):
+    keys = list(result.keys())
+    lines = []
+    for row in result:
+        lines.append(json.dumps(dict(zip(keys, map(_json_value, row))), ensure_ascii=False))
+        if len(lines) >= CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def export_response(statement, fmt: str, filename: str) -> Response:
+    """
+    Потоковый ответ с результатом statement (select столбцов с метками)
+    
+    Args:
+        statement: Запрос; имена столбцов станут заголовками CSV / ключами NDJSON
+        fmt (str): csv или ndjson
+        filename (str): Имя файла без расширения
+    """
+    writer = iter_csv if fmt == 'csv' else iter_ndjson
+    
+    def generate():
+        # Сессия живет, пока клиент читает ответ
+        db = next(get_db())
+        try:
+            result = db.execute(statement.execution_options(yield_per=YIELD_PER))
+            yield from writer(result)
+        finally:
+            db.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{fmt}"'}
+    )
@@ -0,0 +1,183 @@
+"""
+Keyset-пагинация для списков веб-интерфейса
+
+Вместо OFFSET следующая страница выбирается условием "после последней строки
+предыдущей" по ключу сортировки: (registration_date, id) < (:date, :id). С
+индексом по ключу стоимость страницы не зависит от ее номера и размера таблицы.
+Позиция передается клиенту непрозрачным курсором (base64 от JSON значений ключа).
+
+NULL в столбце ключа считается больше любого значения - как в индексах
+PostgreSQL (по возрастанию NULLS LAST, по убыванию NULLS FIRST), поэтому индекс
+по ключу по-прежнему обслуживает сортировку, а строки с NULL не теряются на
+границе страниц.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import and_, false, or_
+
+class InvalidCursor(ValueError):
+    """Курсор поврежден или выдан для другой сортировки"""
+
+def encode_token(payload) -> str:
+    """Непрозрачный курсор из JSON-совместимого значения (base64 без '=')"""
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+def decode_token(cursor: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(str(e)) from e
+
+class Keyset:
+    """
+    Ключ сортировки из нескольких столбцов с общим направлением
+    
+    Последний столбец должен быть уникальным и NOT NULL (обычно первичный ключ),
+    чтобы порядок строк был однозначным; остальные столбцы могут содержать NULL.
+    """
+    
+    def __init__(self, *columns, descending: bool = False):
+        if columns[-1].nullable:
+            raise ValueError(f"последний столбец ключа {columns[-1].key} может быть NULL")
+        self.columns = columns
+        self.descending = descending
+    
+    def order_by(self) -> list:
+        order = []
+        for column in self.columns:
+            if self.descending:
+                order.append(column.desc().nulls_first() if column.nullable else column.desc())
+            else:
+                order.append(column.asc().nulls_last() if column.nullable else column.asc())
+        return order
+    
+    def after(self, values: Sequence):
+        """Условие "строка после позиции values" в порядке сортировки"""
+        # Раскрытая форма (a < x) OR (a = x AND b < y): в отличие от сравнения
+        # кортежей одинаково работает в SQLite и PostgreSQL и использует индекс по a
+        clauses = []
+        for index, column in enumerate(self.columns):
+            equal = [self._equal(self.columns[i], values[i]) for i in range(index)]
+            clauses.append(and_(*equal, self._beyond(column, values[index])))
+        return or_(*clauses)
+    
+    @staticmethod
+    def _equal(column, value):
+        return column.is_(None) if value is None else column == value
+    
+    def _beyond(self, column, value):
+        """Значения столбца после value в порядке сортировки (NULL - наибольшее)"""
+        if self.descending:
+            # NULL идут первыми: после NULL - любые значения, после значения - меньшие
+            return column.is_not(None) if value is None else column < value
+        if value is None:
+            # NULL идут последними - после них ничего нет
+            return false()
+        beyond = column > value
+        return or_(beyond, column.is_(None)) if column.nullable else beyond
+    
+    def reversed(self) -> 'Keyset':
+        """Тот же ключ в обратном порядке (для перехода на предыдущую страницу)"""
+        return Keyset(*self.columns, descending=not self.descending)
+    
+    def encode(self, values: Sequence, backward: bool = False) -> str:
+        """Курсор позиции values; backward - курсор страницы перед позицией"""
+        payload = self.dump(values)
+        if backward:
+            payload = {'before': payload}
+        return encode_token(payload)
+    
+    def decode(self, cursor: str) -> list:
+        values, backward = self.decode_directed(cursor)
+        if backward:
+            raise InvalidCursor("курсор предыдущей страницы не поддерживается")
+        return values
+    
+    def decode_directed(self, cursor: str) -> Tuple[list, bool]:
+        """
+        Разбор курсора
+        
+        Returns:
+            tuple: (значения ключа, True для курсора предыдущей страницы)
+        """
+        payload = decode_token(cursor)
+        backward = isinstance(payload, dict)
+        if backward:
+            payload = payload.get('before')
+        return self.load(payload), backward
+    
+    def dump(self, values: Sequence) -> list:
+        """Значения ключа в виде, пригодном для JSON"""
+        return [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    
+    def load(self, payload) -> list:
+        """Значения ключа из результата dump()"""
+        if not isinstance(payload, list) or len(payload) != len(self.columns):
+            raise InvalidCursor("неверное число значений ключа")
+        
+        values = []
+        for column, value in zip(self.columns, payload):
+            python_type = column.type.python_type
+            try:
+                if value is None:
+                    values.append(None)
+                elif python_type is datetime:
+                    values.append(datetime.fromisoformat(value))
+                else:
+                    values.append(python_type(value))
+            except (TypeError, ValueError) as e:
+                raise InvalidCursor(str(e)) from e
+        return values
+    
+    def key_of(self, entity) -> list:
+        """Значения ключа ORM-объекта (столбцы ключа - его атрибуты)"""
+        return [getattr(entity, column.key) for column in self.columns]
+
+def fetch_page(db, statement, keyset: Keyset, cursor: Optional[str], limit: int) -> Tuple[List, Optional[str]]:
+    """
+    Страница ORM-объектов select(Model) после позиции cursor
+    
+    Returns:
+        tuple: (объекты страницы, курсор следующей страницы или None)
+    """
+    if cursor:
+        statement = statement.where(keyset.after(keyset.decode(cursor)))
+    items = db.scalars(statement.order_by(*keyset.order_by()).limit(limit + 1)).all()
+    
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = keyset.encode(keyset.key_of(items[-1]))
+    return items, next_cursor
+
+def fetch_window(db, statement, keyset: Keyset, cursor: Optional[str], limit: int) -> Tuple[List, Optional[str], Optional[str]]:
+    """
+    Страница ORM-объектов с курсорами в обе стороны
+    
+    Курсор предыдущей страницы выбирает строки перед позицией обратным порядком
+    ключа (тот же индекс), затем страница разворачивается.
+    
+    Returns:
+        tuple: (объекты страницы, курсор следующей страницы, курсор предыдущей страницы)
+    """
+    values, backward = keyset.decode_directed(cursor) if cursor else (None, False)
+    direction = keyset.reversed() if backward else keyset
+    if values is not None:
+        statement = statement.where(direction.after(values))
+    items = db.scalars(statement.order_by(*direction.order_by()).limit(limit + 1)).all()
+    
+    has_more = len(items) > limit
+    items = items[:limit]
+    if backward:
+        items.reverse()
+    # При переходе назад следующая страница есть всегда - с нее пришли
+    has_next = values is not None if backward else has_more
+    has_prev = has_more if backward else values is not None
+    
+    next_cursor = keyset.encode(keyset.key_of(items[-1])) if items and has_next else None
+    prev_cursor = keyset.encode(keyset.key_of(items[0]), backward=True) if items and has_prev else None
+    return items, next_cursor, prev_cursor